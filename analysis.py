@@ -1,168 +1,594 @@
 from flask import Blueprint, render_template
+from collections import Counter
+import json
 import MySQLdb.cursors
+import numpy as np
 import pandas as pd
+from cache import get_data_version
+from snapshots import snapshot_store
+
+# Columns of a sem_N table that are not subject marks
+STANDARD_COLUMNS = ['id', 'student_name', 'usn', 'sgpa', 'result', 'overall_grade']
+
+# SGPA histogram bands; both ends are inclusive, matching SQL BETWEEN
+SGPA_BANDS = [
+    ('low', 0, 2),
+    ('low_mid', 2, 4),
+    ('mid', 4, 6),
+    ('mid_high', 6, 7),
+    ('high', 7, 8),
+    ('very_high', 8, 9),
+    ('excellent', 9, 10),
+]
+
+SUBJECT_PASS_MARK = 40
+TOP_K = 5
+
+# Rows of the sem_N_summary table; per-subject rows live in sem_N_subject_summary
+SUMMARY_METRICS = [
+    'total_students',
+    'passed_students',
+    'failed_students',
+    'top_performers',
+    'grade_distribution',
+    'sgpa_distribution',
+]
+
+
+def summary_table_names(table_name):
+    """Names of the summary tables that belong to a sem_N table."""
+    return f"{table_name}_summary", f"{table_name}_subject_summary"
+
+
+def _to_python(value):
+    """Convert numpy scalars and NaN into JSON-friendly Python values."""
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
 
 class StudentAnalysis:
     def __init__(self, mysql):
         self.mysql = mysql
 
     def get_semester_analysis(self, semester_number):
-        """Get comprehensive analysis for a specific semester."""
-        cursor = self.mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        """Get comprehensive analysis for a specific semester.
+
+        The analysis is read from the summary tables materialized at upload
+        time (O(subjects) rows). Semesters uploaded before summaries existed
+        are computed by build_analysis from the columnar snapshot of sem_N.
+        """
+        cursor = self.mysql.connection.cursor()
         table_name = f"sem_{semester_number}"
-        
+
         try:
-            # Get basic statistics with consistent counting
+            summary = self.read_summary_tables(cursor, table_name)
+            if summary is not None:
+                return self.assemble_analysis(*summary)
+
+            return self.build_analysis(self.snapshot_frame(cursor, table_name))
+
+        except Exception as e:
+            print(f"Error in analysis: {str(e)}")
+            return None
+        finally:
+            cursor.close()
+
+    def snapshot_frame(self, cursor, table_name):
+        """
+        Rows of table_name from its snapshot at the current data version.
+
+        A missing snapshot is built with one scan of the table and written
+        for the next reader.
+        """
+        version = get_data_version(self.mysql, table_name)
+        df = snapshot_store.read_frame(table_name, version)
+        if df is None:
+            df = self.fetch_table(cursor, table_name)
+            snapshot_store.write_frame(table_name, version, df)
+        return df
+
+    @staticmethod
+    def fetch_table(cursor, table_name):
+        cursor.execute(f"SELECT * FROM {table_name}")
+        columns = [desc[0] for desc in cursor.description]
+        return pd.DataFrame(list(cursor.fetchall()), columns=columns)
+
+    @staticmethod
+    def iter_table(cursor, table_name, chunk_size):
+        """
+        Rows of table_name in id order, chunk_size rows at a time (keyset on id).
+
+        An empty table yields one empty frame, so callers still see the columns.
+        """
+        last_id = None
+        while True:
+            if last_id is None:
+                cursor.execute(f"SELECT * FROM {table_name} ORDER BY id LIMIT %s", (chunk_size,))
+            else:
+                cursor.execute(f"SELECT * FROM {table_name} WHERE id > %s ORDER BY id LIMIT %s",
+                               (last_id, chunk_size))
+            columns = [desc[0] for desc in cursor.description]
+            rows = list(cursor.fetchall())
+            if rows or last_id is None:
+                yield pd.DataFrame(rows, columns=columns)
+            if len(rows) < chunk_size:
+                return
+            last_id = rows[-1][columns.index('id')]
+
+    @staticmethod
+    def create_summary_tables(cursor, table_name):
+        """Create empty {table_name}_summary and {table_name}_subject_summary tables."""
+        summary_table, subject_summary_table = summary_table_names(table_name)
+        cursor.execute(f"DROP TABLE IF EXISTS {summary_table}")
+        cursor.execute(f"""
+            CREATE TABLE {summary_table} (
+                metric VARCHAR(32) PRIMARY KEY,
+                value MEDIUMTEXT
+            )
+        """)
+        cursor.execute(f"DROP TABLE IF EXISTS {subject_summary_table}")
+        cursor.execute(f"""
+            CREATE TABLE {subject_summary_table} (
+                position INT PRIMARY KEY,
+                subject VARCHAR(64),
+                average DOUBLE,
+                pass_count INT,
+                fail_count INT,
+                pass_rate DOUBLE,
+                top_performers TEXT,
+                mark_sum DOUBLE,
+                mark_count INT
+            )
+        """)
+
+    @staticmethod
+    def upgrade_summary_tables(cursor, table_name):
+        """
+        Add the mark_sum/mark_count columns to a subject summary table created before they existed.
+
+        ALTER TABLE commits implicitly, so call it before any data writes.
+        The new columns are NULL until the summaries are rewritten.
+        """
+        subject_summary_table = summary_table_names(table_name)[1]
+        cursor.execute(f"SHOW COLUMNS FROM {subject_summary_table} LIKE 'mark_sum'")
+        if cursor.fetchone() is None:
             cursor.execute(f"""
-                SELECT 
-                    COUNT(*) as total_students,
-                    SUM(CASE WHEN result = 'Pass' THEN 1 ELSE 0 END) as passed_students,
-                    SUM(CASE WHEN result = 'Fail' OR overall_grade = 'F' THEN 1 ELSE 0 END) as failed_students,
-                    AVG(CASE WHEN result = 'Pass' THEN sgpa ELSE 0 END) as average_sgpa,
-                    MAX(CASE WHEN result = 'Pass' THEN sgpa ELSE 0 END) as highest_sgpa,
-                    MIN(CASE WHEN result = 'Pass' THEN sgpa ELSE 0 END) as lowest_sgpa
-                FROM {table_name}
+                ALTER TABLE {subject_summary_table}
+                ADD COLUMN mark_sum DOUBLE, ADD COLUMN mark_count INT
             """)
-            basic_stats = cursor.fetchone()
-            total_students = basic_stats['total_students']
-            passed_students = basic_stats['passed_students']
-            failed_students = basic_stats['failed_students']
-            pass_percentage = round((passed_students / total_students) * 100, 2) if total_students > 0 else 0
 
-            # Get top performers overall
+    def write_summary_tables(self, cursor, table_name, df=None, chunk_size=None):
+        """
+        Materialize the analysis of table_name into its summary tables.
+
+        Runs inside the caller's transaction, so the summaries commit together
+        with the rows they describe. df may pass rows of table_name that the
+        caller already fetched; otherwise the table is read chunk_size rows at
+        a time (all at once if None) and summarized chunk by chunk.
+        """
+        if df is not None:
+            summary = self.summarize(df)
+        elif chunk_size is None:
+            summary = self.summarize(self.fetch_table(cursor, table_name))
+        else:
+            summary = self.summarize_chunks(self.iter_table(cursor, table_name, chunk_size))
+        self._store_summary(cursor, table_name, *summary)
+
+    @staticmethod
+    def _store_summary(cursor, table_name, overall, subjects):
+        summary_table, subject_summary_table = summary_table_names(table_name)
+        cursor.execute(f"DELETE FROM {summary_table}")
+        cursor.execute(f"DELETE FROM {subject_summary_table}")
+        cursor.executemany(
+            f"INSERT INTO {summary_table} (metric, value) VALUES (%s, %s)",
+            [(metric, json.dumps(value)) for metric, value in overall.items()]
+        )
+        cursor.executemany(f"""
+            INSERT INTO {subject_summary_table}
+            (position, subject, average, pass_count, fail_count, pass_rate, top_performers,
+             mark_sum, mark_count)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+        """, [
+            (position, subj['name'], subj['average'], subj['pass_count'], subj['fail_count'],
+             subj['pass_rate'], json.dumps(subj['top_performers']), subj['mark_sum'], subj['mark_count'])
+            for position, subj in enumerate(subjects)
+        ])
+
+    @staticmethod
+    def read_summary_tables(cursor, table_name):
+        """Return (overall, subjects) from the summary tables, or None if they do not exist."""
+        summary_table, subject_summary_table = summary_table_names(table_name)
+        try:
+            cursor.execute(f"SELECT metric, value FROM {summary_table}")
+            overall = {metric: json.loads(value) for metric, value in cursor.fetchall()}
             cursor.execute(f"""
-                SELECT student_name as name, usn, sgpa, result
-                FROM {table_name}
-                WHERE result = 'Pass'
-                ORDER BY sgpa DESC
-                LIMIT 5
+                SELECT subject, average, pass_count, fail_count, pass_rate, top_performers
+                FROM {subject_summary_table}
+                ORDER BY position
             """)
-            top_performers = cursor.fetchall()
-
-            # Get subject names (excluding standard columns)
-            cursor.execute(f"SHOW COLUMNS FROM {table_name}")
-            all_columns = cursor.fetchall()
-            subject_columns = [col['Field'] for col in all_columns 
-                             if col['Field'] not in ['id', 'student_name', 'usn', 'sgpa', 'result', 'overall_grade']]
-
-            # Get subject-wise analysis
-            subjects_analysis = []
-            for subject in subject_columns:
-                # Get top performers in each subject
-                cursor.execute(f"""
-                    SELECT student_name as name, usn, {subject} as marks
-                    FROM {table_name}
-                    WHERE {subject} >= 40
-                    ORDER BY {subject} DESC
-                    LIMIT 5
-                """)
-                subject_top_performers = cursor.fetchall()
-
-                # Get pass/fail count for subject
-                cursor.execute(f"""
-                    SELECT 
-                        COUNT(CASE WHEN {subject} >= 40 THEN 1 END) as pass_count,
-                        COUNT(CASE WHEN {subject} < 40 THEN 1 END) as fail_count
-                    FROM {table_name}
-                """)
-                subject_stats = cursor.fetchone()
-
-                subjects_analysis.append({
+            subjects = [
+                {
                     'name': subject,
-                    'top_performers': subject_top_performers,
-                    'pass_count': subject_stats['pass_count'],
-                    'fail_count': subject_stats['fail_count']
-                })
+                    'top_performers': json.loads(top_performers),
+                    'pass_count': pass_count,
+                    'fail_count': fail_count,
+                    'average': average,
+                    'pass_rate': pass_rate
+                }
+                for subject, average, pass_count, fail_count, pass_rate, top_performers in cursor.fetchall()
+            ]
+        except MySQLdb.Error:
+            return None  # Uploaded before summary tables existed
+        if set(overall) != set(SUMMARY_METRICS):
+            return None
+        return overall, subjects
 
-            # Get grade distribution
-            cursor.execute(f"""
-                SELECT overall_grade, COUNT(*) as count
-                FROM {table_name}
-                GROUP BY overall_grade
-                ORDER BY overall_grade
-            """)
-            grade_distribution = {row['overall_grade']: row['count'] 
-                                for row in cursor.fetchall()}
-
-            # Prepare chart data
-            pass_fail_chart = {
-                'labels': ['Pass', 'Fail'],
-                'data': [
-                    passed_students,
-                    failed_students
-                ]
-            }
+    @staticmethod
+    def read_subject_sums(cursor, table_name):
+        """
+        [(mark_sum, mark_count), ...] of each subject in position order, or
+        None if the summaries predate these columns or were not rewritten since.
+        """
+        subject_summary_table = summary_table_names(table_name)[1]
+        try:
+            cursor.execute(f"SELECT mark_sum, mark_count FROM {subject_summary_table} ORDER BY position")
+            sums = list(cursor.fetchall())
+        except MySQLdb.Error:
+            return None
+        if any(mark_sum is None or mark_count is None for mark_sum, mark_count in sums):
+            return None
+        return sums
 
-            subject_pass_fail = {
-                'labels': [subj['name'] for subj in subjects_analysis],
-                'pass_data': [subj['pass_count'] for subj in subjects_analysis],
-                'fail_data': [subj['fail_count'] for subj in subjects_analysis]
-            }
+    def apply_summary_delta(self, cursor, table_name, old_rows, new_rows, df):
+        """
+        Update the summaries of table_name after a delta upload, inside the caller's transaction.
 
-            # Add SGPA distribution
-            cursor.execute(f"""
-                SELECT 
-                    COUNT(CASE WHEN sgpa BETWEEN 0 AND 2 THEN 1 END) as low,
-                    COUNT(CASE WHEN sgpa BETWEEN 2 AND 4 THEN 1 END) as low_mid,
-                    COUNT(CASE WHEN sgpa BETWEEN 4 AND 6 THEN 1 END) as mid,
-                    COUNT(CASE WHEN sgpa BETWEEN 6 AND 7 THEN 1 END) as mid_high,
-                    COUNT(CASE WHEN sgpa BETWEEN 7 AND 8 THEN 1 END) as high,
-                    COUNT(CASE WHEN sgpa BETWEEN 8 AND 9 THEN 1 END) as very_high,
-                    COUNT(CASE WHEN sgpa BETWEEN 9 AND 10 THEN 1 END) as excellent
-                FROM {table_name}
-            """)
-            sgpa_distribution = cursor.fetchone()
+        Args:
+            old_rows: Previous rows of the students the delta updated
+            new_rows: Rows of every student in the delta, as written
+            df: All rows of table_name after the delta, in table order
 
-            # Add subject performance analysis - Fix the AVG query
-            subject_performance = {
-                'labels': [],
-                'averages': []
+        Counts, distributions and mark sums are updated by adding the stats
+        of new_rows and subtracting those of old_rows, so the cost depends
+        on the delta, not the class. A top performer list is merged with
+        new_rows, or recomputed from df when one of its students changed.
+        Summaries without mark sums are rewritten from df.
+        """
+        subject_columns = [col for col in df.columns if col not in STANDARD_COLUMNS]
+        stored = self.read_summary_tables(cursor, table_name)
+        sums = self.read_subject_sums(cursor, table_name) if stored is not None else None
+        if sums is None or len(sums) != len(subject_columns):
+            self.write_summary_tables(cursor, table_name, df)
+            return
+        overall, subjects = stored
+
+        # Rows are ranked by position in df on ties, like a full summarize()
+        position_of = {usn: i for i, usn in enumerate(df['usn'].tolist())}
+        new_rows = new_rows.iloc[np.argsort([position_of[usn] for usn in new_rows['usn'].tolist()], kind='stable')]
+        new_columns = self._summary_columns(new_rows, subject_columns)
+        added = self._additive_stats(new_columns)
+        removed = self._additive_stats(self._summary_columns(old_rows, subject_columns))
+        stats = {
+            'total_students': overall['total_students'],
+            'passed_students': overall['passed_students'],
+            'failed_students': overall['failed_students'],
+            'grade_counts': Counter({grade: count for grade, count in overall['grade_distribution']}),
+            'sgpa_distribution': Counter(overall['sgpa_distribution']),
+            'pass_counts': np.array([subj['pass_count'] for subj in subjects], dtype=np.int64),
+            'fail_counts': np.array([subj['fail_count'] for subj in subjects], dtype=np.int64),
+            'mark_sums': np.array([mark_sum for mark_sum, _ in sums], dtype=float),
+            'mark_counts': np.array([mark_count for _, mark_count in sums], dtype=np.int64),
+        }
+        for key in stats:
+            if isinstance(stats[key], Counter):
+                stats[key].update(added[key])
+                stats[key].subtract(removed[key])
+            else:
+                stats[key] = stats[key] + added[key] - removed[key]
+
+        changed = set(new_rows['usn'].tolist())
+        columns = None
+
+        def merged(current, candidates, value_key):
+            """Top TOP_K of current and candidates by value, or None if current has a changed student."""
+            if any(entry['usn'] in changed for entry in current):
+                return None
+            return sorted(current + candidates, key=lambda entry: (
+                -entry[value_key] if entry[value_key] is not None else np.inf, position_of[entry['usn']]))[:TOP_K]
+
+        top_performers = merged(overall['top_performers'], self._top_performers(new_columns), 'sgpa')
+        if top_performers is None:
+            columns = self._summary_columns(df, subject_columns)
+            top_performers = self._top_performers(columns)
+        subject_top_performers = []
+        for j, subj in enumerate(subjects):
+            top = merged(subj['top_performers'], self._subject_top_performers(new_columns, j), 'marks')
+            if top is None:
+                if columns is None:
+                    columns = self._summary_columns(df, subject_columns)
+                top = self._subject_top_performers(columns, j)
+            subject_top_performers.append(top)
+
+        self._store_summary(cursor, table_name,
+                            *self._summary(stats, subject_columns, top_performers, subject_top_performers))
+
+    def check_summary_consistency(self, semester_number):
+        """
+        Recompute the summaries from sem_N and diff them against the stored ones.
+
+        Returns:
+            List of human-readable differences (empty when consistent), or
+            None if the semester has no summary tables.
+        """
+        cursor = self.mysql.connection.cursor()
+        table_name = f"sem_{semester_number}"
+
+        try:
+            stored = self.read_summary_tables(cursor, table_name)
+            if stored is None:
+                return None
+            sums = self.read_subject_sums(cursor, table_name)
+            computed = self.summarize(self.fetch_table(cursor, table_name))
+            # Round-trip through JSON so both sides use the stored representation
+            computed = json.loads(json.dumps(computed))
+        finally:
+            cursor.close()
+
+        (stored_overall, stored_subjects), (overall, subjects) = stored, computed
+        differences = [
+            f"{metric}: stored {stored_overall.get(metric)!r}, computed {overall[metric]!r}"
+            for metric in SUMMARY_METRICS if stored_overall.get(metric) != overall[metric]
+        ]
+        if len(stored_subjects) != len(subjects):
+            differences.append(f"subjects: stored {len(stored_subjects)}, computed {len(subjects)}")
+        for position, (stored_subject, subject) in enumerate(zip(stored_subjects, subjects)):
+            if sums is not None and position < len(sums):
+                stored_subject['mark_sum'], stored_subject['mark_count'] = sums[position]
+            for field, value in subject.items():
+                # Summaries written before mark sums existed have none to compare
+                if field in stored_subject and stored_subject[field] != value:
+                    differences.append(
+                        f"{subject['name']}.{field}: stored {stored_subject[field]!r}, computed {value!r}"
+                    )
+        return differences
+
+    @classmethod
+    def build_analysis(cls, df):
+        """Compute the semester analysis from the rows of a sem_N table.
+
+        Args:
+            df: DataFrame with the sem_N columns (subject columns in table order)
+
+        Returns:
+            The dict rendered by analysis.html.
+        """
+        return cls.assemble_analysis(*cls.summarize(df))
+
+    @classmethod
+    def summarize(cls, df):
+        """Compute the aggregates behind the analysis page in one vectorized pass.
+
+        Returns:
+            (overall, subjects): overall has the SUMMARY_METRICS keys; subjects
+            has one dict per subject column with its top performers, pass and
+            fail counts, average, pass rate and the mark sum and count the
+            average is derived from.
+        """
+        subject_columns = [col for col in df.columns if col not in STANDARD_COLUMNS]
+        columns = cls._summary_columns(df, subject_columns)
+        return cls._summary(
+            cls._additive_stats(columns),
+            subject_columns,
+            cls._top_performers(columns),
+            [cls._subject_top_performers(columns, j) for j in range(len(subject_columns))]
+        )
+
+    @classmethod
+    def summarize_chunks(cls, chunks):
+        """
+        summarize() of the concatenation of chunks, holding one chunk at a time.
+
+        Additive stats are summed and each top performer list is merged with
+        the chunk's own; earlier chunks come first in the stable sort, so
+        ties stay in row order as in summarize().
+        """
+        stats = top_performers = subject_top_performers = subject_columns = None
+        for df in chunks:
+            if subject_columns is None:
+                subject_columns = [col for col in df.columns if col not in STANDARD_COLUMNS]
+            columns = cls._summary_columns(df, subject_columns)
+            chunk_stats = cls._additive_stats(columns)
+            chunk_top = cls._top_performers(columns)
+            chunk_subject_top = [cls._subject_top_performers(columns, j) for j in range(len(subject_columns))]
+            if stats is None:
+                stats, top_performers, subject_top_performers = chunk_stats, chunk_top, chunk_subject_top
+                continue
+            for key, value in chunk_stats.items():
+                if isinstance(value, Counter):
+                    stats[key].update(value)
+                else:
+                    stats[key] = stats[key] + value
+            top_performers = cls._merge_top(top_performers, chunk_top, 'sgpa')
+            subject_top_performers = [cls._merge_top(current, chunk, 'marks')
+                                      for current, chunk in zip(subject_top_performers, chunk_subject_top)]
+        return cls._summary(stats, subject_columns, top_performers, subject_top_performers)
+
+    @staticmethod
+    def _merge_top(current, candidates, value_key):
+        """Top TOP_K of two lists in row order (current first), highest value first and None last."""
+        return sorted(current + candidates, key=lambda entry: (
+            -entry[value_key] if entry[value_key] is not None else np.inf))[:TOP_K]
+
+    @staticmethod
+    def _summary_columns(df, subject_columns):
+        """The columns of df that summarize() reads, as numpy arrays."""
+        marks = np.empty((len(df), len(subject_columns)))
+        for j, column in enumerate(subject_columns):
+            marks[:, j] = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=float)
+        return {
+            'names': df['student_name'].to_numpy(dtype=object),
+            'usns': df['usn'].to_numpy(dtype=object),
+            'results': df['result'].to_numpy(dtype=object),
+            # NULL grades may arrive as None or NaN; treat both as SQL NULL
+            'grades': df['overall_grade'].astype(object).where(df['overall_grade'].notna(), None).to_numpy(dtype=object),
+            'sgpa': pd.to_numeric(df['sgpa'], errors='coerce').to_numpy(dtype=float),
+            'marks': marks,
+        }
+
+    @staticmethod
+    def _additive_stats(columns):
+        """
+        The aggregates of summarize() that are sums over students.
+
+        A delta upload updates them by adding the stats of the new rows and
+        subtracting those of the rows they replace.
+        """
+        results, grades, sgpa, marks = columns['results'], columns['grades'], columns['sgpa'], columns['marks']
+        has_marks = ~np.isnan(marks)
+        return {
+            'total_students': len(results),
+            'passed_students': int((results == 'Pass').sum()),
+            'failed_students': int(((results == 'Fail') | (grades == 'F')).sum()),
+            'grade_counts': Counter(grades.tolist()),
+            'sgpa_distribution': Counter({
+                band: int(((sgpa >= low) & (sgpa <= high)).sum())
+                for band, low, high in SGPA_BANDS
+            }),
+            'pass_counts': (marks >= SUBJECT_PASS_MARK).sum(axis=0),
+            'fail_counts': (marks < SUBJECT_PASS_MARK).sum(axis=0),
+            'mark_sums': np.where(has_marks, marks, 0).sum(axis=0),
+            'mark_counts': has_marks.sum(axis=0),
+        }
+
+    @staticmethod
+    def _top_performers(columns):
+        """Top TOP_K passed students by SGPA, NULLs last and ties in row order."""
+        names, usns, results, sgpa = columns['names'], columns['usns'], columns['results'], columns['sgpa']
+        passed_mask = results == 'Pass'
+        ranked_sgpa = np.where(passed_mask & ~np.isnan(sgpa), sgpa, -np.inf)
+        order = np.argsort(-ranked_sgpa, kind='stable')
+        order = order[passed_mask[order]][:TOP_K]
+        return [
+            {
+                'name': names[i],
+                'usn': usns[i],
+                'sgpa': _to_python(sgpa[i]),
+                'result': results[i]
             }
-            
-            for subject in subject_columns:
-                subject_performance['labels'].append(subject.replace('_', ' ').title())
-                cursor.execute(f"SELECT ROUND(AVG(`{subject}`), 2) as avg_marks FROM {table_name}")
-                result = cursor.fetchone()
-                subject_performance['averages'].append(float(result['avg_marks'] or 0))
-
-            # Add subject pass percentage
-            subject_pass_percentage = {
-                'labels': [col.replace('_', ' ').title() for col in subject_columns],
-                'percentages': [],
-                'colors': []
+            for i in order
+        ]
+
+    @staticmethod
+    def _subject_top_performers(columns, j):
+        """Top TOP_K students of subject column j among those who passed it, ties in row order."""
+        names, usns, marks = columns['names'], columns['usns'], columns['marks'][:, j]
+        subject_pass = marks >= SUBJECT_PASS_MARK
+        order = np.argsort(-np.where(subject_pass, marks, -np.inf), kind='stable')
+        order = order[subject_pass[order]][:TOP_K]
+        return [{'name': names[i], 'usn': usns[i], 'marks': _to_python(marks[i])} for i in order]
+
+    @staticmethod
+    def _summary(stats, subject_columns, top_performers, subject_top_performers):
+        """Build the (overall, subjects) pair of summarize() from additive stats and top performer lists."""
+        total_students = stats['total_students']
+        subjects = []
+        for j, subject in enumerate(subject_columns):
+            pass_count = int(stats['pass_counts'][j])
+            # Rounded so sums updated by deltas compare equal to a full recomputation
+            mark_sum = round(float(stats['mark_sums'][j]), 6)
+            mark_count = int(stats['mark_counts'][j])
+            subjects.append({
+                'name': subject,
+                'top_performers': subject_top_performers[j],
+                'pass_count': pass_count,
+                'fail_count': int(stats['fail_counts'][j]),
+                'average': round(mark_sum / mark_count, 2) if mark_count else 0.0,
+                'pass_rate': round(pass_count * 100.0 / total_students, 2) if total_students else 0.0,
+                'mark_sum': mark_sum,
+                'mark_count': mark_count
+            })
+
+        # Grade distribution as [grade, count] pairs, ordered like SQL ORDER BY (NULL first)
+        grade_counts = +stats['grade_counts']
+        grade_distribution = [
+            [grade, grade_counts[grade]]
+            for grade in sorted(grade_counts, key=lambda g: (g is not None, g or ''))
+        ]
+
+        overall = {
+            'total_students': total_students,
+            'passed_students': stats['passed_students'],
+            'failed_students': stats['failed_students'],
+            'top_performers': top_performers,
+            'grade_distribution': grade_distribution,
+            'sgpa_distribution': {band: stats['sgpa_distribution'][band] for band, _, _ in SGPA_BANDS}
+        }
+        return overall, subjects
+
+    @staticmethod
+    def assemble_analysis(overall, subjects):
+        """Shape summarize() output into the dict rendered by analysis.html."""
+        total_students = overall['total_students']
+        passed_students = overall['passed_students']
+        failed_students = overall['failed_students']
+        pass_percentage = round((passed_students / total_students) * 100, 2) if total_students > 0 else 0
+
+        subjects_analysis = [
+            {
+                'name': subj['name'],
+                'top_performers': subj['top_performers'],
+                'pass_count': subj['pass_count'],
+                'fail_count': subj['fail_count']
             }
+            for subj in subjects
+        ]
+        labels = [subj['name'].replace('_', ' ').title() for subj in subjects]
+        pass_rates = [subj['pass_rate'] for subj in subjects]
+
+        # Prepare chart data
+        pass_fail_chart = {
+            'labels': ['Pass', 'Fail'],
+            'data': [
+                passed_students,
+                failed_students
+            ]
+        }
+
+        subject_pass_fail = {
+            'labels': [subj['name'] for subj in subjects_analysis],
+            'pass_data': [subj['pass_count'] for subj in subjects_analysis],
+            'fail_data': [subj['fail_count'] for subj in subjects_analysis]
+        }
 
-            for subject in subject_columns:
-                cursor.execute(f"""
-                    SELECT 
-                        (COUNT(CASE WHEN {subject} >= 40 THEN 1 END) * 100.0 / COUNT(*)) as pass_rate
-                    FROM {table_name}
-                """)
-                pass_rate = round(cursor.fetchone()['pass_rate'], 2)
-                subject_pass_percentage['percentages'].append(pass_rate)
+        subject_performance = {
+            'labels': labels,
+            'averages': [subj['average'] for subj in subjects]
+        }
+
+        subject_pass_percentage = {
+            'labels': labels,
+            'percentages': pass_rates,
+            'colors': [
                 # Color based on pass rate
-                color = (
-                    'rgba(76, 175, 80, 0.6)' if pass_rate >= 75 else
-                    'rgba(255, 152, 0, 0.6)' if pass_rate >= 60 else
-                    'rgba(244, 67, 54, 0.6)'
-                )
-                subject_pass_percentage['colors'].append(color)
-
-            return {
-                'total_students': total_students,
-                'pass_percentage': pass_percentage,
-                'top_performers': {'overall': top_performers},
-                'subjects': subjects_analysis,
-                'overall_grade_distribution': grade_distribution,
-                'pass_fail_chart': pass_fail_chart,
-                'subject_pass_fail_chart': subject_pass_fail,
-                'sgpa_distribution': sgpa_distribution,
-                'subject_performance': subject_performance,
-                'subject_pass_percentage': subject_pass_percentage
-            }
+                'rgba(76, 175, 80, 0.6)' if pass_rate >= 75 else
+                'rgba(255, 152, 0, 0.6)' if pass_rate >= 60 else
+                'rgba(244, 67, 54, 0.6)'
+                for pass_rate in pass_rates
+            ]
+        }
 
-        except Exception as e:
-            print(f"Error in analysis: {str(e)}")
-            return None
-        finally:
-            cursor.close()
\ No newline at end of file
+        return {
+            'total_students': total_students,
+            'pass_percentage': pass_percentage,
+            'top_performers': {'overall': overall['top_performers']},
+            'subjects': subjects_analysis,
+            'overall_grade_distribution': {grade: count for grade, count in overall['grade_distribution']},
+            'pass_fail_chart': pass_fail_chart,
+            'subject_pass_fail_chart': subject_pass_fail,
+            'sgpa_distribution': overall['sgpa_distribution'],
+            'subject_performance': subject_performance,
+            'subject_pass_percentage': subject_pass_percentage
+        }
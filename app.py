@@ -1,39 +1,195 @@
 from flask import Flask, render_template
-from flask_mysqldb import MySQL
+from flask.cli import with_appcontext
 from flask_bcrypt import Bcrypt
 import os
-from routes.auth_routes import auth_bp, init_mysql, init_bcrypt  # Added init_bcrypt
+import click
+from routes.auth_routes import auth_bp
+from cache import analysis_cache
+from jobs import upload_jobs
+from db import PooledMySQL, mysql
+from catalog import semester_catalog
+from snapshots import snapshot_store
+from metrics import metrics
+import http_cache
 
-app = Flask(__name__)
-bcrypt = Bcrypt(app)  # Initialize Bcrypt
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-app.secret_key = os.urandom(24)
+# mysql resolves to the pool of the app serving the scrape
+metrics.add_gauges(lambda: [
+    (f"db_pool_{key}", f"Connection pool {key.replace('_', ' ')}.", value)
+    for key, value in (mysql.stats() or {}).items()
+])
+metrics.add_gauges(lambda: [
+    (f"analysis_cache_{key}", f"Analysis cache {key.replace('_', ' ')}.", value)
+    for key, value in analysis_cache.stats().items() if isinstance(value, (int, float))
+])
 
-# Configure upload folder
-UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
+def create_app(config=None):
+    """
+    Build the application; config overrides the defaults below.
 
-# MySQL Configuration
-app.config['MYSQL_HOST'] = '127.0.0.1'
-app.config['MYSQL_USER'] = 'root'
-app.config['MYSQL_PASSWORD'] = 'admin@555'
-app.config['MYSQL_DB'] = 'user_database'
+    Run it with `flask --app app run` or a pre-fork server such as
+    `gunicorn 'app:create_app()'`. Nothing here opens a database
+    connection or starts a thread: the pool is created on first use in
+    each worker and upload workers on the first upload. pandas, numpy
+    and openpyxl are only imported by the views and jobs that need them.
+    """
+    app = Flask(__name__)
 
-mysql = MySQL(app)
+    # Set SECRET_KEY so sessions survive restarts and are shared by all workers
+    app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24)
 
-# Pass MySQL and Bcrypt instances to the blueprint
-init_mysql(mysql)
-init_bcrypt(bcrypt)
+    # Configure upload folder
+    app.config['UPLOAD_FOLDER'] = os.path.join(BASE_DIR, 'uploads')
 
-# Register Blueprint
-app.register_blueprint(auth_bp)
+    # Analysis cache configuration (set ANALYSIS_CACHE_DIR to share entries across workers)
+    app.config['ANALYSIS_CACHE_SIZE'] = 256
+    app.config['ANALYSIS_CACHE_DIR'] = None
+
+    # Seconds a worker trusts its in-memory semester catalog before re-reading it
+    app.config['CATALOG_TTL'] = 30.0
+
+    # Columnar snapshots of uploaded tables, memory-mapped by the analysis code (None disables them)
+    app.config['SNAPSHOT_DIR'] = os.path.join(BASE_DIR, 'snapshots')
+
+    # MySQL Configuration
+    app.config['MYSQL_HOST'] = '127.0.0.1'
+    app.config['MYSQL_USER'] = 'root'
+    app.config['MYSQL_PASSWORD'] = 'admin@555'
+    app.config['MYSQL_DB'] = 'user_database'
+
+    # Connection pool shared by requests and upload jobs in each worker process
+    app.config['MYSQL_POOL_MIN_SIZE'] = 2
+    app.config['MYSQL_POOL_MAX_SIZE'] = 10
+    app.config['MYSQL_POOL_TIMEOUT'] = 5.0
+    app.config['MYSQL_POOL_PRE_PING'] = True
+
+    # Uploaded workbooks are read and inserted this many rows at a time
+    app.config['INGEST_CHUNK_SIZE'] = 5000
+
+    # Students per page of the attendance register API
+    app.config['ATTENDANCE_PAGE_SIZE'] = 200
+
+    # Background upload workers and the maximum number of queued or running uploads
+    app.config['UPLOAD_WORKERS'] = 2
+    app.config['UPLOAD_QUEUE_SIZE'] = 16
+
+    # Bulk insert configuration; BULK_LOAD_DATA needs local_infile enabled on client and server
+    app.config['BULK_CHUNK_SIZE'] = 1000
+    app.config['BULK_LOAD_DATA'] = False
+
+    # Request/SQL metrics; statements slower than SLOW_QUERY_MS go to the 'slow_query' logger
+    # and statement shapes repeated N_PLUS_ONE_THRESHOLD times in one request to the
+    # 'n_plus_one' logger. /metrics is only served when METRICS_ENABLED is set (it exposes
+    # endpoint names and pool state); with METRICS_TOKEN set, scrapers must send
+    # `Authorization: Bearer <token>`
+    app.config['MYSQL_INSTRUMENT'] = True
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED') == '1'
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+    app.config['SLOW_QUERY_MS'] = 200
+    app.config['N_PLUS_ONE_THRESHOLD'] = 5
+
+    # HTML and JSON responses of at least COMPRESS_MIN_SIZE bytes are sent brotli (if the
+    # brotli package is installed) or gzip encoded
+    app.config['COMPRESS_MIN_SIZE'] = 1024
+    app.config['COMPRESS_GZIP_LEVEL'] = 6
+    app.config['COMPRESS_BROTLI_QUALITY'] = 4
+
+    if config:
+        app.config.update(config)
+    if app.config['BULK_LOAD_DATA']:
+        app.config['MYSQL_CUSTOM_OPTIONS'] = {'local_infile': 1}
+
+    if not os.path.exists(app.config['UPLOAD_FOLDER']):
+        os.makedirs(app.config['UPLOAD_FOLDER'])
+
+    analysis_cache.configure(max_entries=app.config['ANALYSIS_CACHE_SIZE'],
+                             shared_dir=app.config['ANALYSIS_CACHE_DIR'])
+    semester_catalog.configure(ttl=app.config['CATALOG_TTL'])
+    snapshot_store.configure(root=app.config['SNAPSHOT_DIR'])
+    upload_jobs.configure(max_workers=app.config['UPLOAD_WORKERS'],
+                          max_pending=app.config['UPLOAD_QUEUE_SIZE'])
+
+    metrics.init_app(app)
+    http_cache.init_app(app)  # after metrics, so request timings include compression
+    # Per-app extensions; views and commands reach them through current_app.extensions
+    PooledMySQL(app)
+    app.extensions['bcrypt'] = Bcrypt(app)
+
+    # Register Blueprint
+    app.register_blueprint(auth_bp)
+    app.add_url_rule('/', 'home', home)
+
+    for command in (add_indexes_command, build_catalog_command, migrate_attendance_command,
+                    check_summaries_command, refresh_cgpa_command, regrade_command):
+        app.cli.add_command(command)
+    return app
 
-@app.route('/')
 def home():
     return render_template('index.html')
 
+@click.command('add-indexes')
+@with_appcontext
+def add_indexes_command():
+    """Add usn/sgpa/result indexes to existing semester and attendance tables."""
+    from migrations import add_usn_indexes
+    for table_name, index_name, status in add_usn_indexes(mysql):
+        print(f"{table_name}.{index_name}: {status}")
+
+@click.command('build-catalog')
+@with_appcontext
+def build_catalog_command():
+    """Add semester_catalog rows for tables uploaded before the catalog existed."""
+    from migrations import build_catalog
+    for semester, kind, status in build_catalog(mysql):
+        print(f"{kind} semester {semester}: {status}")
+
+@click.command('migrate-attendance')
+@with_appcontext
+def migrate_attendance_command():
+    """Move one-column-per-date attendance tables into the long format and dedupe their rosters."""
+    from migrations import migrate_attendance_tables
+    for table_name, status in migrate_attendance_tables(mysql):
+        print(f"{table_name}: {status}")
+
+@click.command('check-summaries')
+@click.argument('semester')
+@with_appcontext
+def check_summaries_command(semester):
+    """Recompute a semester's summary tables from sem_N and report differences."""
+    from analysis import StudentAnalysis
+    differences = StudentAnalysis(mysql).check_summary_consistency(semester)
+    if differences is None:
+        print(f"Semester {semester} has no summary tables")
+    elif not differences:
+        print(f"Semester {semester} summaries are consistent")
+    else:
+        for difference in differences:
+            print(difference)
+        raise SystemExit(1)
+
+@click.command('refresh-cgpa')
+@click.argument('semesters', nargs=-1, required=True)
+@with_appcontext
+def refresh_cgpa_command(semesters):
+    """Rebuild the CGPA rollup of the given semesters from their credits tables."""
+    from cgpa import CGPAEngine
+    engine = CGPAEngine(mysql)
+    for semester in semesters:
+        success, message = engine.refresh_semester(semester)
+        print(f"Semester {semester}: {message}")
+
+@click.command('regrade')
+@click.argument('semesters', nargs=-1)
+@with_appcontext
+def regrade_command(semesters):
+    """Re-grade the given semesters (all if none) with their stored grading schemes."""
+    from utils import StudentPerformanceUtils
+    success, message = StudentPerformanceUtils(mysql).regrade_semesters(list(semesters) or None)
+    print(message)
+    if not success:
+        raise SystemExit(1)
+
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
@@ -1,14 +1,47 @@
-from flask import Blueprint, jsonify, current_app
+import MySQLdb.cursors
+import numpy as np
 import pandas as pd
-import os
-from werkzeug.utils import secure_filename
+from bulk_loader import BulkLoader
+from ingest import iter_excel_chunks
+from attendance_matrix import AttendanceMatrix
+from snapshots import snapshot_store
+from cache import analysis_cache, bump_data_version, create_version_table, get_data_version
+from catalog import ATTENDANCE, create_catalog_table, record_upload, semester_catalog
+
+# Upper bound on the students returned by one page of the attendance register
+MAX_PAGE_SIZE = 1000
+
+# Columns of an attendance_sem_N roster; any other column is a date of the old wide format
+ROSTER_COLUMNS = ['id', 'usn', 'student_name', 'classes_present']
+
+
+def legacy_date_columns(cursor, table_name):
+    """
+    Date columns of an attendance_sem_N table in the old one-column-per-date format, in table order.
+
+    Empty for long-format rosters; `flask migrate-attendance` moves the
+    columns into attendance_sem_N_dates and attendance_sem_N_marks.
+    """
+    cursor.execute(f"SHOW COLUMNS FROM {table_name}")
+    return [row[0] for row in cursor.fetchall() if row[0] not in ROSTER_COLUMNS]
+
 
 class AttendanceAnalyzer:
-    def __init__(self, mysql):
+    def __init__(self, mysql, bulk_loader=None):
         self.mysql = mysql
+        self.bulk_loader = bulk_loader or BulkLoader()
         self.ATTENDANCE_THRESHOLD = 80  # Updated to 80% attendance criteria
 
     def create_attendance_table(self, semester):
+        """Create the long-format attendance store for a semester.
+
+        attendance_sem_N holds one row per student with the running count of
+        classes attended, attendance_sem_N_dates one row per class (class_no
+        keeps the sheet's column order) and attendance_sem_N_marks one row
+        per student per class. Roster tables created before the running
+        count existed get the column, filled from the marks. A roster still in
+        the old one-column-per-date format is refused until it is migrated.
+        """
         cursor = self.mysql.connection.cursor()
         table_name = f"attendance_sem_{semester}"
         
@@ -16,123 +49,527 @@ class AttendanceAnalyzer:
             cursor.execute(f"""
                 CREATE TABLE IF NOT EXISTS {table_name} (
                     id INT AUTO_INCREMENT PRIMARY KEY,
-                    usn VARCHAR(20),
-                    student_name VARCHAR(100)
+                    usn VARCHAR(20) NOT NULL,
+                    student_name VARCHAR(100),
+                    classes_present INT NOT NULL DEFAULT 0,
+                    UNIQUE KEY uk_usn (usn)
                 )
             """)
-            
-            # Get all dates from the DataFrame to create dynamic columns
+            if legacy_date_columns(cursor, table_name):
+                return False, (f"{table_name} is still in the old one-column-per-date format; "
+                               f"run `flask migrate-attendance` before uploading to it")
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table_name}_dates (
+                    class_no INT PRIMARY KEY,
+                    class_date VARCHAR(64) NOT NULL,
+                    UNIQUE KEY uk_class_date (class_date)
+                )
+            """)
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table_name}_marks (
+                    usn VARCHAR(20) NOT NULL,
+                    class_no INT NOT NULL,
+                    status CHAR(1),
+                    PRIMARY KEY (usn, class_no),
+                    KEY idx_class_no (class_no)
+                )
+            """)
+            create_catalog_table(cursor)
+            create_version_table(cursor)
+            cursor.execute(f"SHOW COLUMNS FROM {table_name} LIKE 'classes_present'")
+            if cursor.fetchone() is None:
+                cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN classes_present INT NOT NULL DEFAULT 0")
+                cursor.execute(f"""
+                    UPDATE {table_name} s
+                    JOIN (SELECT usn, COUNT(*) AS present FROM {table_name}_marks
+                          WHERE status = 'P' GROUP BY usn) m ON m.usn = s.usn
+                    SET s.classes_present = m.present
+                """)
             self.mysql.connection.commit()
             return True, table_name
         except Exception as e:
             return False, str(e)
+        finally:
+            cursor.close()
+
+    def process_attendance_file(self, file, semester, chunk_size=5000, filename=None, progress=None):
+        """Merge an attendance sheet (path or file-like object) into the store.
+
+        The sheet may hold the whole term or only the latest dates. Marks are
+        merged by (USN, date): only new or changed marks are written, blank
+        cells leave stored marks alone, and each student's running count of
+        classes attended is adjusted by the marks that changed. A sheet that
+        writes nothing (such as the same file uploaded twice) rolls back
+        without bumping the data version; the version is bumped only once
+        the merge has written something.
 
-    def process_attendance_file(self, file_path, semester):
+        progress is an optional callback progress(phase, rows_processed).
+        """
+        progress = progress or (lambda phase, rows_processed=None: None)
         try:
-            df = pd.read_excel(file_path)
+            progress('parsing')
+            chunks = iter_excel_chunks(file, chunk_size, filename)
+            first_chunk = next(chunks, None)
             
             # Validate basic columns
-            if 'USN' not in df.columns or 'Student Name' not in df.columns:
+            if first_chunk is None or 'USN' not in first_chunk.columns or 'Student Name' not in first_chunk.columns:
                 return False, "Missing USN or Student Name columns"
             
-            # Create base table
+            # Create base tables
+            progress('creating_table')
             success, table_name = self.create_attendance_table(semester)
             if not success:
                 return False, table_name
             
             cursor = self.mysql.connection.cursor()
             
-            # Add date columns dynamically
-            date_columns = [col for col in df.columns if col not in ['USN', 'Student Name']]
-            for date_col in date_columns:
-                try:
-                    cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN `{date_col}` VARCHAR(1)")
-                except:
-                    pass  # Column might already exist
-            
-            # Insert data
-            for _, row in df.iterrows():
-                columns = ['usn', 'student_name'] + [f'`{date}`' for date in date_columns]
-                values = [row['USN'], row['Student Name']] + [row[date] for date in date_columns]
-                placeholders = ','.join(['%s'] * len(values))
-                
-                cursor.execute(f"""
-                    INSERT INTO {table_name} 
-                    ({','.join(columns)})
-                    VALUES ({placeholders})
-                """, values)
-            
-            self.mysql.connection.commit()
+            try:
+                previous_version = get_data_version(self.mysql, table_name)
+
+                # Register new dates after the ones already stored
+                date_columns = [col for col in first_chunk.columns if col not in ['USN', 'Student Name']]
+                cursor.execute(f"SELECT class_date, class_no FROM {table_name}_dates")
+                class_numbers = dict(cursor.fetchall())
+                next_class_no = max(class_numbers.values(), default=0) + 1
+                new_dates = []
+                for date_col in date_columns:
+                    label = str(date_col)
+                    if label not in class_numbers:
+                        class_numbers[label] = next_class_no
+                        new_dates.append((next_class_no, label))
+                        next_class_no += 1
+                if new_dates:
+                    self.bulk_loader.insert(cursor, f"{table_name}_dates", ['class_no', 'class_date'], new_dates)
+
+                progress('merging', 0)
+                students, changes = [], []
+                rows_processed, marks_written = self._merge_chunk(cursor, table_name, first_chunk, date_columns,
+                                                                  class_numbers, students, changes)
+                progress('merging', rows_processed)
+                for chunk in chunks:
+                    chunk_rows, chunk_marks = self._merge_chunk(cursor, table_name, chunk, date_columns,
+                                                                class_numbers, students, changes)
+                    rows_processed += chunk_rows
+                    marks_written += chunk_marks
+                    progress('merging', rows_processed)
+
+                if not (new_dates or students or marks_written):
+                    self.mysql.connection.rollback()
+                    return True, "Attendance is already up to date"
+
+                # Invalidate cached attendance matrices in the same transaction
+                version = bump_data_version(cursor, table_name)
+                record_upload(cursor, semester, ATTENDANCE, table_name)
+                progress('committing', rows_processed)
+                self.mysql.connection.commit()
+            except Exception:
+                self.mysql.connection.rollback()
+                raise
+            finally:
+                cursor.close()
+                semester_catalog.invalidate()
+
+            if snapshot_store.enabled:
+                progress('snapshotting', rows_processed)
+                self._update_attendance_matrix(table_name, previous_version, version,
+                                               [label for _, label in new_dates], students, changes)
+
             return True, "Attendance data processed successfully"
             
         except Exception as e:
             return False, str(e)
 
+    def _merge_chunk(self, cursor, table_name, df, date_columns, class_numbers, students_changed, changes):
+        """
+        Merge a chunk of the sheet by (USN, date).
+
+        New or renamed students are appended to students_changed as
+        (usn, student_name) and marks whose presence changed to changes as
+        (usn, class_date, present), for patching the attendance matrix.
+        Marks that changed without changing presence (e.g. 'A' to 'L') are
+        written but not appended.
+
+        Returns:
+            (student count, mark rows written)
+        """
+        students = df.dropna(subset=['USN'])
+        students = students.assign(USN=students['USN'].astype(str)).drop_duplicates(subset=['USN'], keep='last')
+        usns = students['USN'].tolist()
+        if not usns:
+            return 0, 0
+        usn_placeholders = ','.join(['%s'] * len(usns))
+        cursor.execute(f"SELECT usn, student_name FROM {table_name} WHERE usn IN ({usn_placeholders}) FOR UPDATE",
+                       usns)
+        stored_names = dict(cursor.fetchall())
+
+        # One row per student per class; blank cells are not stored
+        marks = students.melt(id_vars=['USN'], value_vars=date_columns,
+                              var_name='class_date', value_name='status')
+        marks = marks.dropna(subset=['status'])
+        marks['class_date'] = marks['class_date'].map(str)
+        marks['class_no'] = marks['class_date'].map(class_numbers).astype(np.int64)
+        marks['status'] = marks['status'].astype(str).str.strip().str.upper().str[:1].astype(object)
+
+        # Compare with the stored marks of these students and dates
+        class_nos = sorted({class_numbers[str(date)] for date in date_columns})
+        stored = []
+        if class_nos:
+            cursor.execute(f"""
+                SELECT usn, class_no, status FROM {table_name}_marks
+                WHERE usn IN ({usn_placeholders}) AND class_no IN ({','.join(['%s'] * len(class_nos))})
+            """, usns + class_nos)
+            stored = cursor.fetchall()
+        stored = pd.DataFrame(list(stored), columns=['USN', 'class_no', 'stored_status'])
+        stored = stored.astype({'USN': object, 'class_no': np.int64, 'stored_status': object})
+        marks = marks.astype({'USN': object}).merge(stored, on=['USN', 'class_no'], how='left')
+        changed = marks[marks['status'] != marks['stored_status']]
+
+        present = (changed['status'] == 'P').to_numpy()
+        was_present = (changed['stored_status'] == 'P').to_numpy()
+        present_delta = pd.Series(present.astype(np.int64) - was_present, index=changed['USN'].to_numpy())
+        present_delta = present_delta.groupby(level=0).sum()
+
+        # Upsert only new or renamed students and those whose count changed
+        names = students['Student Name'].astype(object).where(students['Student Name'].notna(), None)
+        roster = []
+        for usn, name in zip(usns, names.tolist()):
+            delta = int(present_delta.get(usn, 0))
+            renamed = usn not in stored_names or stored_names[usn] != name
+            if renamed:
+                students_changed.append((usn, name))
+            if renamed or delta:
+                roster.append((usn, name, delta))
+        self.bulk_loader.insert(cursor, table_name, ['usn', 'student_name', 'classes_present'], roster,
+                                update_columns=['student_name'], increment_columns=['classes_present'])
+        self.bulk_loader.insert(
+            cursor, f"{table_name}_marks", ['usn', 'class_no', 'status'],
+            self.bulk_loader.frame_rows(changed, ['USN', 'class_no', 'status']),
+            update_columns=['status']
+        )
+        flipped = present != was_present
+        changes.extend(zip(changed['USN'].to_numpy()[flipped].tolist(),
+                           changed['class_date'].to_numpy()[flipped].tolist(),
+                           present[flipped].tolist()))
+        return len(students), len(changed)
+
     def get_attendance_data(self, semester, usn=None):
+        """Return attendance rows shaped like the old one-column-per-date table.
+
+        Each record is {'id', 'usn', 'student_name', <date>: status, ...} with
+        dates in class order and None for classes without a mark.
+        """
         cursor = self.mysql.connection.cursor()
         table_name = f"attendance_sem_{semester}"
         
         try:
+            cursor.execute(f"SELECT class_no, class_date FROM {table_name}_dates ORDER BY class_no")
+            class_dates = dict(cursor.fetchall())
+
             if usn:
-                cursor.execute(f"SELECT * FROM {table_name} WHERE usn = %s", (usn,))
+                cursor.execute(f"SELECT id, usn, student_name FROM {table_name} WHERE usn = %s", (usn,))
+                students = cursor.fetchall()
+                cursor.execute(f"SELECT usn, class_no, status FROM {table_name}_marks WHERE usn = %s", (usn,))
             else:
-                cursor.execute(f"SELECT * FROM {table_name}")
-            
-            columns = [desc[0] for desc in cursor.description]
-            results = cursor.fetchall()
-            
-            # Convert to list of dictionaries
-            data = [dict(zip(columns, row)) for row in results]
-            
-            # Process attendance marks
-            for record in data:
-                for key in record:
-                    if key not in ['id', 'usn', 'student_name']:
-                        # Standardize attendance marks
-                        if record[key]:
-                            record[key] = record[key].strip().upper()
-            
-            return data
+                cursor.execute(f"SELECT id, usn, student_name FROM {table_name} ORDER BY id")
+                students = cursor.fetchall()
+                cursor.execute(f"SELECT usn, class_no, status FROM {table_name}_marks")
+            marks = cursor.fetchall()
+
+            return self._build_records(students, class_dates, marks)
         except Exception as e:
             print(f"Error fetching attendance data: {str(e)}")
             return None
         finally:
             cursor.close()
 
-    def calculate_attendance_stats(self, semester):
-        data = self.get_attendance_data(semester)
-        if not data:
+    @staticmethod
+    def _build_records(students, class_dates, marks):
+        """Pivot (usn, class_no, status) marks into one record per student with every date present."""
+        records = {}
+        for student_id, student_usn, student_name in students:
+            record = {'id': student_id, 'usn': student_usn, 'student_name': student_name}
+            record.update(dict.fromkeys(class_dates.values()))
+            records[student_usn] = record
+
+        for student_usn, class_no, status in marks:
+            record = records.get(student_usn)
+            if record is not None and class_no in class_dates:
+                record[class_dates[class_no]] = status
+
+        return list(records.values())
+
+    @staticmethod
+    def _class_dates(cursor, table_name, from_date=None, to_date=None):
+        """
+        Return {class_no: class_date} of the classes from from_date to to_date
+        inclusive, in class order.
+
+        Raises:
+            ValueError: If from_date or to_date is not a class date
+        """
+        cursor.execute(f"SELECT class_no, class_date FROM {table_name}_dates ORDER BY class_no")
+        classes = cursor.fetchall()
+        dates = [class_date for _, class_date in classes]
+        start = dates.index(from_date) if from_date is not None else 0
+        stop = dates.index(to_date) + 1 if to_date is not None else len(dates)
+        return dict(classes[start:max(start, stop)])
+
+    def get_attendance_page(self, semester, after_usn=None, limit=200, from_date=None, to_date=None):
+        """
+        One page of the attendance register, ordered by USN.
+
+        Keyset pagination: pass the previous page's next_after as after_usn,
+        so every page is a range read on the usn index however deep it is.
+        Only the classes from from_date to to_date (inclusive) are returned.
+
+        Returns:
+            {'dates', 'rows', 'next_after'} with rows shaped like
+            get_attendance_data and next_after None on the last page, or None
+            on a database error
+
+        Raises:
+            ValueError: If from_date or to_date is not a class date
+        """
+        cursor = self.mysql.connection.cursor()
+        table_name = f"attendance_sem_{semester}"
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+        try:
+            class_dates = self._class_dates(cursor, table_name, from_date, to_date)
+
+            if after_usn is None:
+                cursor.execute(f"SELECT id, usn, student_name FROM {table_name} ORDER BY usn LIMIT %s", (limit,))
+            else:
+                cursor.execute(f"""
+                    SELECT id, usn, student_name FROM {table_name}
+                    WHERE usn > %s ORDER BY usn LIMIT %s
+                """, (after_usn, limit))
+            students = cursor.fetchall()
+
+            marks = []
+            if students and class_dates:
+                usns = [student_usn for _, student_usn, _ in students]
+                placeholders = ','.join(['%s'] * len(usns))
+                cursor.execute(f"""
+                    SELECT usn, class_no, status FROM {table_name}_marks
+                    WHERE usn IN ({placeholders}) AND class_no BETWEEN %s AND %s
+                """, (*usns, min(class_dates), max(class_dates)))
+                marks = cursor.fetchall()
+
+            return {
+                'dates': list(class_dates.values()),
+                'rows': self._build_records(students, class_dates, marks),
+                'next_after': students[-1][1] if len(students) == limit else None
+            }
+        except MySQLdb.Error as e:
+            print(f"Error fetching attendance page: {str(e)}")
+            return None
+        finally:
+            cursor.close()
+
+    def iter_attendance_rows(self, semester, from_date=None, to_date=None):
+        """
+        Yield {'dates': [...]} and then one record per student, in USN order.
+
+        Rows are read through a server-side cursor and yielded as soon as
+        each student's marks have arrived, so the whole register is never
+        held in memory. The class dates are validated before the first
+        yield (ValueError if unknown).
+        """
+        table_name = f"attendance_sem_{semester}"
+        cursor = self.mysql.connection.cursor()
+        try:
+            class_dates = self._class_dates(cursor, table_name, from_date, to_date)
+        finally:
+            cursor.close()
+
+        yield {'dates': list(class_dates.values())}
+
+        first_class, last_class = (min(class_dates), max(class_dates)) if class_dates else (1, 0)
+        stream = self.mysql.connection.cursor(MySQLdb.cursors.SSCursor)
+        try:
+            # ORDER BY usn alone walks uk_usn, so rows stream without a filesort
+            stream.execute(f"""
+                SELECT s.id, s.usn, s.student_name, m.class_no, m.status
+                FROM {table_name} s
+                LEFT JOIN {table_name}_marks m
+                    ON m.usn = s.usn AND m.class_no BETWEEN %s AND %s
+                ORDER BY s.usn
+            """, (first_class, last_class))
+
+            record = None
+            for student_id, student_usn, student_name, class_no, status in stream:
+                if record is None or record['usn'] != student_usn:
+                    if record is not None:
+                        yield record
+                    record = {'id': student_id, 'usn': student_usn, 'student_name': student_name}
+                    record.update(dict.fromkeys(class_dates.values()))
+                if class_no in class_dates:
+                    record[class_dates[class_no]] = status
+            if record is not None:
+                yield record
+        finally:
+            stream.close()
+
+    def get_attendance_matrix(self, semester):
+        """Return the bit-packed AttendanceMatrix of a semester, or None on error.
+
+        The matrix is loaded once per attendance data version and cached,
+        from the memory-mapped snapshot when one exists.
+        """
+        table_name = f"attendance_sem_{semester}"
+        version = get_data_version(self.mysql, table_name)
+        return analysis_cache.get_or_compute(
+            ('attendance_matrix', semester),
+            version,
+            lambda: self._load_attendance_matrix(table_name, version)
+        )
+
+    def _load_attendance_matrix(self, table_name, version):
+        """Open the snapshot of table_name at version, building and writing it if missing."""
+        snapshot = snapshot_store.read(table_name, version)
+        if snapshot is not None:
+            arrays, meta = snapshot
+            return AttendanceMatrix(arrays['usns'].tolist(), meta['names'], meta['dates'], arrays['bits'])
+
+        matrix = self._build_attendance_matrix(table_name)
+        if matrix is not None:
+            snapshot_store.write(
+                table_name, version,
+                {'usns': np.array(matrix.usns, dtype=str), 'bits': matrix.bits},
+                {'names': matrix.names, 'dates': matrix.dates}
+            )
+        return matrix
+
+    def _update_attendance_matrix(self, table_name, previous_version, version, dates, students, changes):
+        """
+        Write the snapshot of version by patching the one of previous_version with an upload's changes.
+
+        Falls back to rebuilding from the store when the previous snapshot is
+        missing or another upload committed in between.
+        """
+        snapshot = snapshot_store.read(table_name, previous_version) if version == previous_version + 1 else None
+        if snapshot is None:
+            return self._load_attendance_matrix(table_name, version)
+        arrays, meta = snapshot
+        matrix = AttendanceMatrix(arrays['usns'].tolist(), meta['names'], meta['dates'], arrays['bits'])
+        matrix = matrix.updated(students, dates, changes)
+        snapshot_store.write(
+            table_name, version,
+            {'usns': np.array(matrix.usns, dtype=str), 'bits': matrix.bits},
+            {'names': matrix.names, 'dates': matrix.dates}
+        )
+        return matrix
+
+    def _build_attendance_matrix(self, table_name):
+        cursor = self.mysql.connection.cursor()
+
+        try:
+            cursor.execute(f"SELECT class_no, class_date FROM {table_name}_dates ORDER BY class_no")
+            class_dates = cursor.fetchall()
+            cursor.execute(f"SELECT usn, student_name FROM {table_name} ORDER BY id")
+            students = cursor.fetchall()
+            # Only present marks are needed to set bits
+            cursor.execute(f"SELECT usn, class_no FROM {table_name}_marks WHERE status = 'P'")
+            class_index = {class_no: i for i, (class_no, _) in enumerate(class_dates)}
+            present = ((usn, class_index[class_no]) for usn, class_no in cursor.fetchall()
+                       if class_no in class_index)
+
+            return AttendanceMatrix.from_present_marks(
+                students, [date for _, date in class_dates], present
+            )
+        except Exception as e:
+            print(f"Error building attendance matrix: {str(e)}")
             return None
+        finally:
+            cursor.close()
 
-        stats = []
-        for student in data:
-            attendance_dates = [key for key in student.keys() 
-                              if key not in ['id', 'usn', 'student_name']]
-            
-            total_classes = len(attendance_dates)
-            if total_classes == 0:
-                continue
+    def get_attendance_totals(self, semester):
+        """
+        Term totals from the running counts, or None on error (e.g. a roster
+        without them yet): {'usns', 'names', 'present_counts', 'total_classes'}.
 
-            # Count present marks (both 'P' and 'p' are considered)
-            present_count = sum(1 for date in attendance_dates 
-                              if student[date] and student[date].upper() == 'P')
-            
-            attendance_percentage = (present_count / total_classes) * 100 if total_classes > 0 else 0
-            
-            stats.append({
-                'usn': student['usn'],
-                'student_name': student['student_name'],
+        One row per student is read instead of the marks, and the result is
+        cached per attendance data version.
+        """
+        table_name = f"attendance_sem_{semester}"
+        version = get_data_version(self.mysql, table_name)
+        return analysis_cache.get_or_compute(
+            ('attendance_totals', semester),
+            version,
+            lambda: self._load_attendance_totals(table_name)
+        )
+
+    def _load_attendance_totals(self, table_name):
+        cursor = self.mysql.connection.cursor()
+        try:
+            cursor.execute(f"SELECT COUNT(*) FROM {table_name}_dates")
+            total_classes = cursor.fetchone()[0]
+            cursor.execute(f"SELECT usn, student_name, classes_present FROM {table_name} ORDER BY id")
+            rows = cursor.fetchall()
+        except MySQLdb.Error as e:
+            print(f"Error reading attendance totals: {str(e)}")
+            return None
+        finally:
+            cursor.close()
+        return {
+            'usns': [usn for usn, _, _ in rows],
+            'names': [name for _, name, _ in rows],
+            'present_counts': [present for _, _, present in rows],
+            'total_classes': total_classes
+        }
+
+    def calculate_attendance_stats(self, semester, from_date=None, to_date=None):
+        """Attendance percentage and shortage per student, optionally within a date range.
+
+        The whole term is answered from the running totals; a date range (or
+        a roster without totals) is counted from the attendance matrix.
+        Returns None when there is nothing to count.
+
+        Raises:
+            ValueError: If from_date or to_date is not a class date
+        """
+        totals = self.get_attendance_totals(semester) if from_date is None and to_date is None else None
+        if totals is not None:
+            if not totals['usns'] or totals['total_classes'] == 0:
+                return None
+            return self._attendance_stats(totals['usns'], totals['names'],
+                                          np.array(totals['present_counts'], dtype=np.int64),
+                                          totals['total_classes'])
+
+        matrix = self.get_attendance_matrix(semester)
+        if not matrix or not matrix.usns:
+            return None
+
+        start, stop = matrix.class_range(from_date, to_date)
+        total_classes = stop - start
+        if total_classes == 0:
+            return None
+        return self._attendance_stats(matrix.usns, matrix.names, matrix.present_counts(start, stop), total_classes)
+
+    def _attendance_stats(self, usns, names, present_counts, total_classes):
+        percentages = (present_counts / total_classes) * 100
+        shortages = (percentages < self.ATTENDANCE_THRESHOLD).tolist()
+        percentages = [round(p, 2) for p in percentages.tolist()]
+
+        stats = [
+            {
+                'usn': usn,
+                'student_name': name,
                 'total_classes': total_classes,
                 'classes_attended': present_count,
-                'attendance_percentage': round(attendance_percentage, 2),
-                'shortage': attendance_percentage < self.ATTENDANCE_THRESHOLD
-            })
+                'attendance_percentage': percentage,
+                'shortage': shortage
+            }
+            for usn, name, present_count, percentage, shortage
+            in zip(usns, names, present_counts.tolist(), percentages, shortages)
+        ]
 
         return {
             'student_stats': stats,
             'class_summary': {
                 'total_students': len(stats),
-                'students_with_shortage': sum(1 for s in stats if s['shortage']),
-                'average_attendance': round(sum(s['attendance_percentage'] for s in stats) / len(stats), 2)
+                'students_with_shortage': sum(shortages),
+                'average_attendance': round(sum(percentages) / len(stats), 2)
             }
-        }
\ No newline at end of file
+        }
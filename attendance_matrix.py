@@ -0,0 +1,112 @@
+import numpy as np
+
+# Number of set bits in every possible byte
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+class AttendanceMatrix:
+    """Bit-packed attendance of one semester.
+
+    Row i holds student i (usns[i], names[i]) and bit j of the row is set
+    when the student was present ('P') in class j (dates[j]). Rows are
+    packed with np.packbits, so a 500-student x 150-class term takes
+    500 x 19 bytes. Counts over any class range are popcounts of the rows
+    ANDed with a packed range mask.
+    """
+
+    def __init__(self, usns, names, dates, bits):
+        self.usns = list(usns)
+        self.names = list(names)
+        self.dates = list(dates)
+        self.bits = bits
+        self._rows = {usn: i for i, usn in enumerate(self.usns)}
+        self._columns = {date: j for j, date in enumerate(self.dates)}
+
+    @classmethod
+    def from_present_marks(cls, students, dates, present):
+        """
+        Build the matrix from the long-format store.
+
+        Args:
+            students: Sequence of (usn, student_name) in display order
+            dates: Class date labels in class order
+            present: Iterable of (usn, class_index) pairs where the student was present
+        """
+        usns = [usn for usn, _ in students]
+        names = [name for _, name in students]
+        rows = {usn: i for i, usn in enumerate(usns)}
+
+        dense = np.zeros((len(usns), len(dates)), dtype=bool)
+        pairs = [(rows[usn], class_index) for usn, class_index in present if usn in rows]
+        if pairs:
+            row_index, class_index = np.array(pairs).T
+            dense[row_index, class_index] = True
+        return cls(usns, names, dates, np.packbits(dense, axis=1))
+
+    def updated(self, students, dates, changes):
+        """
+        Return the matrix after an incremental upload, leaving this one untouched.
+
+        Args:
+            students: (usn, student_name) pairs that were added or renamed;
+                unknown USNs are appended in order, like new roster rows
+            dates: Class date labels added after the existing ones
+            changes: (usn, date, present) triples of marks whose presence changed
+        """
+        usns = list(self.usns)
+        names = list(self.names)
+        rows = dict(self._rows)
+        for usn, name in students:
+            i = rows.get(usn)
+            if i is None:
+                rows[usn] = len(usns)
+                usns.append(usn)
+                names.append(name)
+            else:
+                names[i] = name
+        all_dates = self.dates + list(dates)
+        columns = {date: j for j, date in enumerate(all_dates)}
+
+        dense = np.zeros((len(usns), len(all_dates)), dtype=bool)
+        dense[:len(self.usns), :len(self.dates)] = np.unpackbits(self.bits, axis=1, count=len(self.dates))
+        changes = list(changes)
+        if changes:
+            row_index = np.array([rows[usn] for usn, _, _ in changes], dtype=np.intp)
+            class_index = np.array([columns[date] for _, date, _ in changes], dtype=np.intp)
+            dense[row_index, class_index] = np.array([present for _, _, present in changes], dtype=bool)
+        return AttendanceMatrix(usns, names, all_dates, np.packbits(dense, axis=1))
+
+    @property
+    def total_classes(self):
+        return len(self.dates)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def class_range(self, from_date=None, to_date=None):
+        """
+        Return the (start, stop) class indexes covering from_date..to_date inclusive.
+
+        Raises:
+            ValueError: If from_date or to_date is not a class date
+        """
+        start = self._class_index(from_date) if from_date is not None else 0
+        stop = self._class_index(to_date) + 1 if to_date is not None else len(self.dates)
+        return start, max(start, stop)
+
+    def _class_index(self, date):
+        j = self._columns.get(date)
+        if j is None:
+            raise ValueError(f"Unknown class date: {date}")
+        return j
+
+    def present_counts(self, start=0, stop=None):
+        """Classes attended by every student within classes [start, stop)."""
+        stop = len(self.dates) if stop is None else stop
+        bits = self.bits
+        if start > 0 or stop < len(self.dates):
+            mask = np.zeros(len(self.dates), dtype=bool)
+            mask[start:stop] = True
+            bits = bits & np.packbits(mask)
+        return POPCOUNT[bits].sum(axis=1, dtype=np.int64)
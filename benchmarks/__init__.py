@@ -0,0 +1,5 @@
+"""Synthetic data generator and benchmark suite.
+
+Run `python -m benchmarks.run --help` for the benchmarks and
+`python -m benchmarks.compare BASELINE.json CURRENT.json` to diff two reports.
+"""
@@ -0,0 +1,180 @@
+"""
+Read paths as the app ran them before they were rewritten.
+
+Kept only so the benchmarks can time them against the current code on the
+same data: the per-query semester analysis (six class-wide queries plus
+four per subject, against StudentAnalysis.get_semester_analysis) and the
+attendance reads of the old one-column-per-date attendance_sem_N tables
+(against AttendanceAnalyzer on the long format).
+"""
+import MySQLdb.cursors
+
+STANDARD_COLUMNS = ['id', 'student_name', 'usn', 'sgpa', 'result', 'overall_grade']
+
+
+def semester_analysis(mysql, semester_number):
+    """The original per-query semester analysis of sem_<semester_number>."""
+    cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+    table_name = f"sem_{semester_number}"
+
+    try:
+        cursor.execute(f"""
+            SELECT
+                COUNT(*) as total_students,
+                SUM(CASE WHEN result = 'Pass' THEN 1 ELSE 0 END) as passed_students,
+                SUM(CASE WHEN result = 'Fail' OR overall_grade = 'F' THEN 1 ELSE 0 END) as failed_students,
+                AVG(CASE WHEN result = 'Pass' THEN sgpa ELSE 0 END) as average_sgpa,
+                MAX(CASE WHEN result = 'Pass' THEN sgpa ELSE 0 END) as highest_sgpa,
+                MIN(CASE WHEN result = 'Pass' THEN sgpa ELSE 0 END) as lowest_sgpa
+            FROM {table_name}
+        """)
+        basic_stats = cursor.fetchone()
+        total_students = basic_stats['total_students']
+        passed_students = basic_stats['passed_students']
+        failed_students = basic_stats['failed_students']
+        pass_percentage = round((passed_students / total_students) * 100, 2) if total_students > 0 else 0
+
+        cursor.execute(f"""
+            SELECT student_name as name, usn, sgpa, result
+            FROM {table_name}
+            WHERE result = 'Pass'
+            ORDER BY sgpa DESC
+            LIMIT 5
+        """)
+        top_performers = cursor.fetchall()
+
+        cursor.execute(f"SHOW COLUMNS FROM {table_name}")
+        subject_columns = [col['Field'] for col in cursor.fetchall() if col['Field'] not in STANDARD_COLUMNS]
+
+        subjects_analysis = []
+        for subject in subject_columns:
+            cursor.execute(f"""
+                SELECT student_name as name, usn, {subject} as marks
+                FROM {table_name}
+                WHERE {subject} >= 40
+                ORDER BY {subject} DESC
+                LIMIT 5
+            """)
+            subject_top_performers = cursor.fetchall()
+
+            cursor.execute(f"""
+                SELECT
+                    COUNT(CASE WHEN {subject} >= 40 THEN 1 END) as pass_count,
+                    COUNT(CASE WHEN {subject} < 40 THEN 1 END) as fail_count
+                FROM {table_name}
+            """)
+            subject_stats = cursor.fetchone()
+
+            subjects_analysis.append({
+                'name': subject,
+                'top_performers': subject_top_performers,
+                'pass_count': subject_stats['pass_count'],
+                'fail_count': subject_stats['fail_count']
+            })
+
+        cursor.execute(f"""
+            SELECT overall_grade, COUNT(*) as count
+            FROM {table_name}
+            GROUP BY overall_grade
+            ORDER BY overall_grade
+        """)
+        grade_distribution = {row['overall_grade']: row['count'] for row in cursor.fetchall()}
+
+        cursor.execute(f"""
+            SELECT
+                COUNT(CASE WHEN sgpa BETWEEN 0 AND 2 THEN 1 END) as low,
+                COUNT(CASE WHEN sgpa BETWEEN 2 AND 4 THEN 1 END) as low_mid,
+                COUNT(CASE WHEN sgpa BETWEEN 4 AND 6 THEN 1 END) as mid,
+                COUNT(CASE WHEN sgpa BETWEEN 6 AND 7 THEN 1 END) as mid_high,
+                COUNT(CASE WHEN sgpa BETWEEN 7 AND 8 THEN 1 END) as high,
+                COUNT(CASE WHEN sgpa BETWEEN 8 AND 9 THEN 1 END) as very_high,
+                COUNT(CASE WHEN sgpa BETWEEN 9 AND 10 THEN 1 END) as excellent
+            FROM {table_name}
+        """)
+        sgpa_distribution = cursor.fetchone()
+
+        subject_performance = {'labels': [], 'averages': []}
+        for subject in subject_columns:
+            subject_performance['labels'].append(subject.replace('_', ' ').title())
+            cursor.execute(f"SELECT ROUND(AVG(`{subject}`), 2) as avg_marks FROM {table_name}")
+            subject_performance['averages'].append(float(cursor.fetchone()['avg_marks'] or 0))
+
+        subject_pass_percentage = {
+            'labels': [col.replace('_', ' ').title() for col in subject_columns],
+            'percentages': [],
+            'colors': []
+        }
+        for subject in subject_columns:
+            cursor.execute(f"""
+                SELECT
+                    (COUNT(CASE WHEN {subject} >= 40 THEN 1 END) * 100.0 / COUNT(*)) as pass_rate
+                FROM {table_name}
+            """)
+            pass_rate = round(cursor.fetchone()['pass_rate'], 2)
+            subject_pass_percentage['percentages'].append(pass_rate)
+            subject_pass_percentage['colors'].append(
+                'rgba(76, 175, 80, 0.6)' if pass_rate >= 75 else
+                'rgba(255, 152, 0, 0.6)' if pass_rate >= 60 else
+                'rgba(244, 67, 54, 0.6)'
+            )
+
+        return {
+            'total_students': total_students,
+            'pass_percentage': pass_percentage,
+            'top_performers': {'overall': top_performers},
+            'subjects': subjects_analysis,
+            'overall_grade_distribution': grade_distribution,
+            'pass_fail_chart': {'labels': ['Pass', 'Fail'], 'data': [passed_students, failed_students]},
+            'subject_pass_fail_chart': {
+                'labels': [subj['name'] for subj in subjects_analysis],
+                'pass_data': [subj['pass_count'] for subj in subjects_analysis],
+                'fail_data': [subj['fail_count'] for subj in subjects_analysis]
+            },
+            'sgpa_distribution': sgpa_distribution,
+            'subject_performance': subject_performance,
+            'subject_pass_percentage': subject_pass_percentage
+        }
+    finally:
+        cursor.close()
+
+
+def attendance_data(mysql, semester, usn=None):
+    """Records of a one-column-per-date attendance_sem_<semester> table, marks upper-cased."""
+    cursor = mysql.connection.cursor()
+    table_name = f"attendance_sem_{semester}"
+
+    try:
+        if usn:
+            cursor.execute(f"SELECT * FROM {table_name} WHERE usn = %s", (usn,))
+        else:
+            cursor.execute(f"SELECT * FROM {table_name}")
+        columns = [desc[0] for desc in cursor.description]
+        data = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for record in data:
+            for key in record:
+                if key not in ['id', 'usn', 'student_name'] and record[key]:
+                    record[key] = record[key].strip().upper()
+        return data
+    finally:
+        cursor.close()
+
+
+def attendance_stats(mysql, semester, threshold=80):
+    """Attendance percentage and shortage per student, counted from attendance_data's records."""
+    stats = []
+    for student in attendance_data(mysql, semester):
+        attendance_dates = [key for key in student.keys() if key not in ['id', 'usn', 'student_name']]
+        total_classes = len(attendance_dates)
+        if total_classes == 0:
+            continue
+        present_count = sum(1 for date in attendance_dates if student[date] and student[date].upper() == 'P')
+        attendance_percentage = (present_count / total_classes) * 100
+        stats.append({
+            'usn': student['usn'],
+            'student_name': student['student_name'],
+            'total_classes': total_classes,
+            'classes_attended': present_count,
+            'attendance_percentage': round(attendance_percentage, 2),
+            'shortage': attendance_percentage < threshold
+        })
+    return stats
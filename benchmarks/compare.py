@@ -0,0 +1,61 @@
+"""
+Compare two benchmark reports and flag regressions.
+
+    python -m benchmarks.compare baseline.json current.json --threshold 0.2
+
+Benchmarks are matched by (name, size) on their median (or wall) time.
+Exits with status 1 when any benchmark is slower than the baseline by
+more than threshold (a fraction, 0.2 = 20%).
+"""
+import argparse
+import json
+import sys
+
+
+def _timings(report):
+    return {
+        (result['name'], result['size']): result.get('median_ms', result.get('wall_ms'))
+        for result in report['results']
+    }
+
+
+def compare(baseline, current, threshold):
+    """Return [(name, size, baseline_ms, current_ms, change)] for benchmarks present in both reports."""
+    baseline_timings = _timings(baseline)
+    rows = []
+    for key, current_ms in _timings(current).items():
+        baseline_ms = baseline_timings.get(key)
+        if baseline_ms is None or current_ms is None:
+            continue
+        change = (current_ms - baseline_ms) / baseline_ms if baseline_ms else 0.0
+        rows.append((*key, baseline_ms, current_ms, change))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    regressions = 0
+    for name, size, baseline_ms, current_ms, change in compare(baseline, current, args.threshold):
+        flag = ''
+        if change > args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{name:<32} {size:>8} {baseline_ms:>12.3f} {current_ms:>12.3f} {change:>+8.1%}{flag}")
+
+    if regressions:
+        print(f"{regressions} benchmark(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
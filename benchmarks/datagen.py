@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+
+# (subject, credits) pools; sheets use the 'Subject(credits)' headers calculate_sgpa expects
+SUBJECTS = [
+    ('Mathematics', 4),
+    ('Data Structures', 4),
+    ('Computer Networks', 3),
+    ('Operating Systems', 4),
+    ('Database Systems', 3),
+    ('Software Engineering', 3),
+    ('Theory of Computation', 3),
+    ('Compiler Design', 4),
+    ('Machine Learning', 3),
+    ('Web Technologies', 2),
+    ('Cloud Computing', 2),
+    ('Data Structures Lab', 1),
+]
+
+FIRST_NAMES = ['An', 'Binh', 'Chi', 'Dung', 'Giang', 'Hoa', 'Khanh', 'Linh', 'Minh', 'Nam', 'Phuong', 'Quang']
+LAST_NAMES = ['Nguyen', 'Tran', 'Le', 'Pham', 'Hoang', 'Phan', 'Vu', 'Dang', 'Bui', 'Do']
+
+
+def student_roster(students, seed=0):
+    """Return (usns, names) of a synthetic class of the given size."""
+    rng = np.random.default_rng(seed)
+    usns = [f"1BM21CS{i:04d}" for i in range(1, students + 1)]
+    names = [f"{rng.choice(LAST_NAMES)} {rng.choice(FIRST_NAMES)}" for _ in range(students)]
+    return usns, names
+
+
+def generate_semester_sheet(students, subjects=8, seed=0, fail_rate=0.05, missing_rate=0.01):
+    """
+    Build a result sheet like the ones teachers upload.
+
+    Marks are drawn per student around an ability level, so SGPAs spread
+    realistically; about fail_rate of the marks fall below the fail mark
+    and missing_rate are left blank.
+    """
+    rng = np.random.default_rng(seed)
+    usns, names = student_roster(students, seed)
+    sheet = {'Student Name': names, 'USN': usns}
+
+    ability = rng.normal(65, 12, students)
+    for subject, credits in SUBJECTS[:subjects]:
+        marks = np.clip(np.round(ability + rng.normal(0, 10, students)), 0, 100)
+        failing = rng.random(students) < fail_rate
+        marks[failing] = rng.integers(0, 28, failing.sum())
+        marks[rng.random(students) < missing_rate] = np.nan
+        sheet[f"{subject}({credits})"] = marks
+    return pd.DataFrame(sheet)
+
+
+def generate_attendance_sheet(students, classes, seed=0, start=date(2024, 1, 8)):
+    """
+    Build an attendance sheet: USN, Student Name and one 'P'/'A' column per class day.
+
+    Each student attends with their own probability, so some fall below
+    the shortage threshold.
+    """
+    rng = np.random.default_rng(seed)
+    usns, names = student_roster(students, seed)
+    sheet = {'USN': usns, 'Student Name': names}
+
+    propensity = np.clip(rng.beta(8, 1.5, students), 0, 1)
+    day = start
+    for _ in range(classes):
+        while day.weekday() >= 5:  # Classes run on weekdays
+            day += timedelta(days=1)
+        present = rng.random(students) < propensity
+        sheet[day.isoformat()] = np.where(present, 'P', 'A')
+        day += timedelta(days=1)
+    return pd.DataFrame(sheet)
+
+
+def write_workbook(df, target):
+    """Write a sheet to an .xlsx path or binary file object."""
+    df.to_excel(target, index=False, engine='openpyxl')
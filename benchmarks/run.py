@@ -0,0 +1,718 @@
+"""
+Benchmark the app's hot paths and write a JSON report.
+
+    python -m benchmarks.run --sizes 100,1000,10000 --output report.json
+    python -m benchmarks.run --mysql-user root --mysql-password ... --mysql-db bench_db
+
+Without MySQL options only worker cold start, the ingest memory probes and the in-memory
+paths run (SGPA, analysis, ranks, attendance matrix, export encoding over a stand-in cursor). With
+them, sheets are also uploaded through /upload and /upload_attendance
+and the database-backed reads are timed; benchmark tables are dropped
+afterwards unless --keep is given.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta, timezone
+from itertools import cycle
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datagen import generate_attendance_sheet, generate_semester_sheet, write_workbook
+
+REPORT_VERSION = 1
+
+# Statements per request in the instrumentation overhead benchmark (about one student page)
+STATEMENTS_PER_REQUEST = 20
+REQUESTS_PER_RUN = 200
+
+# Students corrected by the delta upload benchmark
+DELTA_ROWS = 10
+# Classes in the follow-up attendance sheet (one week)
+APPEND_CLASSES = 5
+# Alternative policy graded by the re-grade and what-if benchmarks: lower thresholds and fail mark
+LENIENT_SCHEME = {
+    'grade_thresholds': [35, 45, 55, 65, 75, 85],
+    'grade_points': [0, 4, 5, 6, 7, 8, 10],
+    'sgpa_thresholds': [4.0, 5.0, 6.0, 7.0, 8.0, 9.0],
+    'sgpa_grades': ['F', 'C', 'C+', 'B', 'B+', 'A', 'A+'],
+    'fail_mark': 25
+}
+
+# Run in a fresh interpreter per sample: import the app, build it and serve the landing page
+STARTUP_PROBE = """
+import json, resource, sys, time
+started = time.perf_counter()
+from app import create_app
+app = create_app()
+created = time.perf_counter()
+app.test_client().get('/')
+served = time.perf_counter()
+print(json.dumps({
+    'create_app_ms': (created - started) * 1000,
+    'first_request_ms': (served - created) * 1000,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'heavy_modules': sorted(name for name in ('pandas', 'numpy', 'openpyxl', 'plotly') if name in sys.modules)
+}))
+"""
+
+
+# Run in a fresh interpreter per sample: parse and grade a workbook the streaming way
+# (iter_excel_chunks, chunk by chunk) or the way uploads did before (pd.read_excel of the
+# whole sheet), and report how far it raised peak resident memory over the imports (Linux)
+INGEST_PROBE = """
+import json, sys, time
+import openpyxl, pandas as pd
+from ingest import iter_excel_chunks
+from utils import StudentPerformanceUtils
+
+def peak_rss_kb():
+    # VmHWM starts afresh with the new process image; ru_maxrss would carry over the parent's peak
+    with open('/proc/self/status') as f:
+        return next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+
+path, mode, chunk_size = sys.argv[1], sys.argv[2], int(sys.argv[3])
+utils = StudentPerformanceUtils(mysql=None)
+baseline = peak_rss_kb()
+started = time.perf_counter()
+if mode == 'stream':
+    rows = sum(len(utils.calculate_sgpa(chunk)) for chunk in iter_excel_chunks(path, chunk_size))
+else:
+    rows = len(utils.calculate_sgpa(pd.read_excel(path)))
+print(json.dumps({
+    'wall_ms': (time.perf_counter() - started) * 1000,
+    'added_rss_mb': (peak_rss_kb() - baseline) / 1024,
+    'rows': rows
+}))
+"""
+
+
+def timed(func, repeat):
+    """Run func repeat times and return its wall-clock statistics and median CPU time in milliseconds."""
+    samples = []
+    cpu_samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+        cpu_samples.append((time.process_time() - cpu_started) * 1000)
+    return {**sample_stats(samples), 'cpu_median_ms': round(statistics.median(cpu_samples), 3)}
+
+
+def sample_stats(samples):
+    return {
+        'runs': len(samples),
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'max_ms': round(max(samples), 3)
+    }
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux)."""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def allocated_bytes(build):
+    """Return build() and the bytes still allocated by it when it returns, as traced by tracemalloc."""
+    tracemalloc.start()
+    try:
+        value = build()
+        return value, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def statement_count(func):
+    """Statements func runs on the current app context's pool connection (instrumented by MYSQL_INSTRUMENT)."""
+    from flask import g
+    g.sql_statements = []
+    try:
+        func()
+        return len(g.sql_statements)
+    finally:
+        g.pop('sql_statements')
+
+
+class Report:
+    def __init__(self, args):
+        self.meta = {
+            'report_version': REPORT_VERSION,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'sizes': args.sizes,
+            'repeat': args.repeat,
+            'mysql': bool(args.mysql_db)
+        }
+        self.results = []
+
+    def add(self, name, size, stats, **extra):
+        result = {'name': name, 'size': size, **stats, **extra}
+        self.results.append(result)
+        print(f"{name:<32} {size:>8} {result.get('median_ms', result.get('wall_ms', '-')):>12} ms")
+
+    def to_dict(self):
+        return {'meta': self.meta, 'results': self.results}
+
+
+class _ListCursor:
+    """Stand-in for a server-side cursor over rows already in memory."""
+
+    def __init__(self, columns, rows):
+        self.description = [(column,) for column in columns]
+        self._rows = rows
+        self._position = 0
+
+    def execute(self, query, args=None):
+        self._position = 0
+
+    def fetchmany(self, size):
+        batch = self._rows[self._position:self._position + size]
+        self._position += len(batch)
+        return batch
+
+    def close(self):
+        pass
+
+
+class _ListMySQL:
+    def __init__(self, columns, rows):
+        self._columns = columns
+        self._rows = rows
+
+    @property
+    def connection(self):
+        return self
+
+    def cursor(self, *args):
+        return _ListCursor(self._columns, self._rows)
+
+
+def semester_rows(sheet):
+    """Shape a graded sheet like the rows of its sem_N table."""
+    from catalog import subject_columns
+    subjects = subject_columns(sheet.columns[2:-3])
+    rows = {
+        'id': np.arange(1, len(sheet) + 1),
+        'student_name': sheet['Student Name'],
+        'usn': sheet['USN'],
+    }
+    for subject, header in zip(subjects, sheet.columns[2:-3]):
+        rows[subject['column'].lower()] = sheet[header]
+    rows.update({'sgpa': sheet['SGPA'], 'result': sheet['Result'], 'overall_grade': sheet['Overall Grade']})
+    return pd.DataFrame(rows)
+
+
+def run_offline(report, args):
+    from analysis import StudentAnalysis
+    from attendance_matrix import AttendanceMatrix
+    from catalog import subject_columns
+    from export import SemesterExporter
+    from grading import GradingScheme, stored_marks
+    from ranks import competition_ranks
+    from utils import StudentPerformanceUtils
+
+    utils = StudentPerformanceUtils(mysql=None)
+    for size in args.sizes:
+        sheet = generate_semester_sheet(size, args.subjects)
+        report.add('calculate_sgpa', size, timed(lambda: utils.calculate_sgpa(sheet.copy()), args.repeat))
+        report.add('calculate_credits', size, timed(lambda: utils.calculate_credits(sheet), args.repeat))
+
+        rows = semester_rows(utils.calculate_sgpa(sheet.copy()))
+        credits, marks = stored_marks(rows, subject_columns(sheet.columns[2:]))
+        lenient = GradingScheme.from_dict(LENIENT_SCHEME)
+        report.add('regrade_grade', size, timed(lambda: lenient.grade(marks, credits), args.repeat))
+        report.add('build_analysis', size, timed(lambda: StudentAnalysis.build_analysis(rows), args.repeat))
+        report.add('competition_ranks', size,
+                   timed(lambda: competition_ranks(rows['sgpa'].to_numpy(dtype=float)), args.repeat))
+
+        columns = list(rows.columns)
+        records = [tuple(row) for row in rows.astype(object).itertuples(index=False)]
+        exporter = SemesterExporter(_ListMySQL(columns, records))
+        stats = timed(lambda: sum(len(chunk) for chunk in exporter.iter_csv('performance', size)), args.repeat)
+        report.add('export_csv_encode', size, stats,
+                   rows_per_second=round(size / (stats['median_ms'] / 1000)) if stats['median_ms'] else None)
+
+        attendance = generate_attendance_sheet(size, args.classes)
+        dates = list(attendance.columns[2:])
+        students = list(zip(attendance['USN'], attendance['Student Name']))
+        marks = attendance[dates].to_numpy()
+        present = [(attendance['USN'][i], j) for i, j in zip(*np.nonzero(marks == 'P'))]
+        report.add('attendance_matrix_build', size,
+                   timed(lambda: AttendanceMatrix.from_present_marks(students, dates, present), args.repeat))
+
+        # Shortage over the whole term: one {date: status} dict per student, as stats were
+        # counted before the bit matrix, against popcounts of the packed rows
+        records, records_bytes = allocated_bytes(lambda: attendance.to_dict('records'))
+        matrix, matrix_bytes = allocated_bytes(lambda: AttendanceMatrix.from_present_marks(students, dates, present))
+
+        def dict_shortage():
+            return [sum(1 for date in dates if record[date] == 'P') * 100 / len(dates) < 80 for record in records]
+
+        def matrix_shortage():
+            start, stop = matrix.class_range(dates[0], dates[-1])
+            return matrix.present_counts(start, stop) * 100 / (stop - start) < 80
+        report.add('attendance_dict_stats', size, timed(dict_shortage, args.repeat), allocated_bytes=records_bytes)
+        report.add('attendance_matrix_stats', size, timed(matrix_shortage, args.repeat),
+                   allocated_bytes=matrix_bytes, matrix_bytes=matrix.nbytes)
+
+
+def run_instrumentation(report, args):
+    """Time requests of STATEMENTS_PER_REQUEST trivial statements with and without metrics.
+
+    The stand-in cursor does no work, so the overhead reported is the
+    worst case; against real queries it is a smaller share.
+    """
+    from flask import Flask
+    from metrics import InstrumentedConnection, Metrics
+
+    def client(instrumented):
+        app = Flask(__name__)
+        connection = _ListMySQL(['usn'], [('1BM21CS0001',)])
+        if instrumented:
+            # Count shapes as usual but stay below the threshold so nothing is logged
+            app.config['N_PLUS_ONE_THRESHOLD'] = STATEMENTS_PER_REQUEST + 1
+            bench_metrics = Metrics()
+            bench_metrics.init_app(app)
+            connection = InstrumentedConnection(connection, bench_metrics)
+
+        @app.route('/page')
+        def page():
+            cursor = connection.cursor()
+            for i in range(STATEMENTS_PER_REQUEST):
+                cursor.execute("SELECT usn FROM sem_1 WHERE id = %s", (i,))
+                cursor.fetchmany(1)
+            return 'ok'
+        return app.test_client()
+
+    def requests(test_client):
+        for _ in range(REQUESTS_PER_RUN):
+            test_client.get('/page')
+
+    plain, instrumented = client(False), client(True)
+    requests(plain), requests(instrumented)  # Warm up
+    plain_stats = timed(lambda: requests(plain), args.repeat)
+    instrumented_stats = timed(lambda: requests(instrumented), args.repeat)
+    report.add('requests_uninstrumented', REQUESTS_PER_RUN, plain_stats)
+    report.add('requests_instrumented', REQUESTS_PER_RUN, instrumented_stats,
+               overhead_pct=round((instrumented_stats['median_ms'] / plain_stats['median_ms'] - 1) * 100, 2),
+               overhead_us_per_request=round(
+                   (instrumented_stats['median_ms'] - plain_stats['median_ms']) * 1000 / REQUESTS_PER_RUN, 2))
+
+
+def run_http(report, args):
+    """Render the semester analysis page and compress it as the app does: bytes on the wire and CPU."""
+    from flask import render_template
+    from analysis import StudentAnalysis
+    from app import create_app
+    from http_cache import compress_response
+    from utils import StudentPerformanceUtils
+
+    app = create_app({'SNAPSHOT_DIR': None})
+    utils = StudentPerformanceUtils(mysql=None)
+    for size in args.sizes:
+        analysis = StudentAnalysis.build_analysis(
+            semester_rows(utils.calculate_sgpa(generate_semester_sheet(size, args.subjects))))
+        with app.test_request_context():
+            render = lambda: render_template('analysis.html', analysis=analysis, semester=1)
+            html = render()
+            report.add('analysis_page_render', size, timed(render, args.repeat), wire_bytes=len(html.encode()))
+
+        for encoding in ('gzip', 'br'):
+            with app.test_request_context(headers={'Accept-Encoding': encoding}):
+                def compress():
+                    return compress_response(app.response_class(html, mimetype='text/html'))
+                response = compress()
+                if response.headers.get('Content-Encoding') != encoding:
+                    continue  # brotli not installed
+                report.add(f'analysis_page_{encoding}', size, timed(compress, args.repeat),
+                           wire_bytes=len(response.get_data()))
+
+
+def run_startup(report, args):
+    """Cold start of one worker: import and create_app time, first request and resident memory."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    probes = []
+    for _ in range(args.repeat):
+        output = subprocess.run([sys.executable, '-c', STARTUP_PROBE], cwd=root, capture_output=True,
+                                text=True, check=True).stdout
+        probes.append(json.loads(output.splitlines()[-1]))
+    report.add('cold_start_create_app', 1, sample_stats([probe['create_app_ms'] for probe in probes]),
+               rss_mb=round(statistics.median(probe['rss_mb'] for probe in probes), 1),
+               heavy_modules=probes[-1]['heavy_modules'])
+    report.add('cold_start_first_request', 1, sample_stats([probe['first_request_ms'] for probe in probes]))
+
+
+def run_ingest_memory(report, args):
+    """Memory of parsing and grading one upload, streamed against read whole, per --ingest-sizes.
+
+    Each sample runs in its own interpreter on a workbook written beforehand,
+    so generating the sheet and the other benchmarks do not count.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    for size in args.ingest_sizes:
+        fd, path = tempfile.mkstemp(suffix='.xlsx')
+        os.close(fd)
+        try:
+            write_workbook(generate_semester_sheet(size, args.subjects), path)
+            for mode, name in (('stream', 'ingest_memory_streaming'), ('whole', 'ingest_memory_read_excel')):
+                probes = []
+                for _ in range(args.repeat):
+                    output = subprocess.run(
+                        [sys.executable, '-c', INGEST_PROBE, path, mode, str(args.chunk_size)],
+                        cwd=root, capture_output=True, text=True, check=True
+                    ).stdout
+                    probes.append(json.loads(output.splitlines()[-1]))
+                report.add(name, size, sample_stats([probe['wall_ms'] for probe in probes]),
+                           added_rss_mb=round(statistics.median(probe['added_rss_mb'] for probe in probes), 1),
+                           chunk_size=args.chunk_size if mode == 'stream' else None)
+        finally:
+            os.remove(path)
+
+
+def run_mysql(report, args):
+    from app import create_app, mysql
+    from analysis import StudentAnalysis
+    from benchmarks.baseline import semester_analysis
+    from attendance import AttendanceAnalyzer
+    from cache import analysis_cache
+    from cgpa import CGPAEngine
+    from migrations import add_usn_indexes
+    from student_analysis import StudentAnalyzer
+    from utils import SEMESTER_INDEXES
+
+    app = create_app({
+        'MYSQL_HOST': args.mysql_host, 'MYSQL_PORT': args.mysql_port, 'MYSQL_USER': args.mysql_user,
+        'MYSQL_PASSWORD': args.mysql_password, 'MYSQL_DB': args.mysql_db
+    })
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['loggedin'] = True
+        session['role'] = 'Teacher'
+        session['username'] = 'benchmark'
+
+    for size in args.sizes:
+        semester = f"b{size}"
+        sheet = generate_semester_sheet(size, args.subjects)
+        job = _upload(client, '/upload', sheet, semester)
+        # Memory is measured per upload by run_ingest_memory; ru_maxrss here spans the whole run
+        report.add('ingest_semester', size, {'wall_ms': job['wall_ms']},
+                   status=job['status'], phase_timings=job['phase_timings'])
+
+        usns = cycle(sheet['USN'].sample(frac=1, random_state=0).tolist())
+        with app.app_context():
+            analysis = StudentAnalysis(mysql)
+
+            def cold_analysis():
+                analysis_cache.clear()
+                return analysis.get_semester_analysis(semester)
+            report.add('get_semester_analysis', size,
+                       timed(lambda: analysis.get_semester_analysis(semester), args.repeat))
+            report.add('get_semester_analysis_cold', size, timed(cold_analysis, args.repeat),
+                       statements=statement_count(cold_analysis))
+            # The per-request queries the analysis ran before the single-scan rewrite
+            report.add('get_semester_analysis_baseline', size,
+                       timed(lambda: semester_analysis(mysql, semester), args.repeat),
+                       statements=statement_count(lambda: semester_analysis(mysql, semester)))
+
+            def scan():
+                cursor = mysql.connection.cursor()
+                try:
+                    return StudentAnalysis.build_analysis(StudentAnalysis.fetch_table(cursor, f"sem_{semester}"))
+                finally:
+                    cursor.close()
+            report.add('get_semester_analysis_scan', size, timed(scan, args.repeat), statements=statement_count(scan))
+
+            student = StudentAnalyzer(mysql)
+            report.add('get_student_data', size,
+                       timed(lambda: student.get_student_data(semester, next(usns)), args.repeat * 10))
+
+            # The same lookup on a table as it was before add_usn_indexes, then after the migration
+            cursor = mysql.connection.cursor()
+            try:
+                for index_name, _ in SEMESTER_INDEXES:
+                    cursor.execute(f"ALTER TABLE sem_{semester} DROP INDEX {index_name}")
+            finally:
+                cursor.close()
+            report.add('get_student_data_before_usn_indexes', size,
+                       timed(lambda: student.get_student_data(semester, next(usns)), args.repeat * 10))
+            added = [index_name for table_name, index_name, status in add_usn_indexes(mysql)
+                     if table_name == f"sem_{semester}" and status == 'added']
+            report.add('get_student_data_after_usn_indexes', size,
+                       timed(lambda: student.get_student_data(semester, next(usns)), args.repeat * 10),
+                       indexes_added=added)
+            cgpa = CGPAEngine(mysql)
+            report.add('get_student_cgpa', size,
+                       timed(lambda: cgpa.get_student_cgpa(next(usns)), args.repeat * 10))
+
+        # Full page (analysis cached, so render and compress) against an ETag revalidation
+        page_url = f'/analysis/{semester}'
+        page_headers = {'Accept-Encoding': 'br, gzip'}
+        page = client.get(page_url, headers=page_headers)
+        report.add('analysis_page_full', size, timed(lambda: client.get(page_url, headers=page_headers), args.repeat),
+                   wire_bytes=len(page.get_data()), encoding=page.headers.get('Content-Encoding'))
+        revalidate_headers = {**page_headers, 'If-None-Match': page.headers.get('ETag', '')}
+        report.add('analysis_page_not_modified', size,
+                   timed(lambda: client.get(page_url, headers=revalidate_headers), args.repeat),
+                   status=client.get(page_url, headers=revalidate_headers).status_code)
+
+        # Late corrections: one subject of DELTA_ROWS students, upserted into the published semester
+        subject = sheet.columns[2]
+        delta = sheet[['USN', subject]].sample(n=min(DELTA_ROWS, size), random_state=1)
+        delta[subject] = (delta[subject] + 7) % 100
+        job = _upload(client, '/upload', delta, semester, mode='delta')
+        report.add('apply_semester_delta', size, {'wall_ms': job['wall_ms']},
+                   status=job['status'], phase_timings=job['phase_timings'], rows=len(delta))
+
+        # Re-grade from the stored marks with another policy, after comparing the two without writing
+        grading_request = {'semester': semester, 'scheme': LENIENT_SCHEME}
+        report.add('grading_what_if', size,
+                   timed(lambda: client.post('/grading_what_if', json=grading_request), args.repeat))
+        job = _run_job(client, '/regrade', json=grading_request)
+        report.add('regrade_semester', size, {'wall_ms': job['wall_ms']},
+                   status=job['status'], message=job['message'], phase_timings=job['phase_timings'])
+
+        attendance = generate_attendance_sheet(size, args.classes)
+        job = _upload(client, '/upload_attendance', attendance, semester)
+        report.add('ingest_attendance', size, {'wall_ms': job['wall_ms']},
+                   status=job['status'], phase_timings=job['phase_timings'], peak_rss_mb=peak_rss_mb())
+
+        # The same sheet again must change nothing; the next week's sheet only adds its dates
+        job = _upload(client, '/upload_attendance', attendance, semester)
+        report.add('ingest_attendance_repeat', size, {'wall_ms': job['wall_ms']},
+                   status=job['status'], message=job['message'], phase_timings=job['phase_timings'])
+        next_week = generate_attendance_sheet(
+            size, APPEND_CLASSES, start=date.fromisoformat(attendance.columns[-1]) + timedelta(days=1))
+        job = _upload(client, '/upload_attendance', next_week, semester)
+        report.add('ingest_attendance_append', size, {'wall_ms': job['wall_ms']},
+                   status=job['status'], phase_timings=job['phase_timings'], classes=APPEND_CLASSES)
+
+        with app.app_context():
+            analyzer = AttendanceAnalyzer(mysql)
+
+            def cold_stats():
+                analysis_cache.clear()
+                return analyzer.calculate_attendance_stats(semester)
+            report.add('calculate_attendance_stats_cold', size, timed(cold_stats, args.repeat))
+            report.add('calculate_attendance_stats_warm', size,
+                       timed(lambda: analyzer.calculate_attendance_stats(semester), args.repeat))
+
+        with app.app_context():
+            _attendance_formats(report, args, mysql, size)
+
+        report.add('attendance_register_ttfb', size,
+                   timed(lambda: _first_chunk(client, f'/attendance/{semester}/rows?stream=1'), args.repeat))
+        for fmt in ('csv', 'parquet'):
+            stats = timed(lambda: _drain(client, f'/export/{semester}?kind=performance&format={fmt}'), args.repeat)
+            report.add(f'export_{fmt}', size, stats,
+                       rows_per_second=round(size / (stats['median_ms'] / 1000)) if stats['median_ms'] else None,
+                       peak_rss_mb=peak_rss_mb())
+
+        if not args.keep:
+            with app.app_context():
+                _drop_semester(mysql, semester)
+
+
+def _attendance_formats(report, args, mysql, size):
+    """Time the attendance reads on a one-column-per-date table, migrate it, and time them on the long format."""
+    from attendance import AttendanceAnalyzer
+    from benchmarks.baseline import attendance_data, attendance_stats
+    from bulk_loader import BulkLoader
+    from cache import analysis_cache
+    from migrations import migrate_attendance_tables
+
+    semester = f"w{size}"
+    table_name = f"attendance_sem_{semester}"
+    sheet = generate_attendance_sheet(size, args.classes)
+    dates = list(sheet.columns[2:])
+    usns = cycle(sheet['USN'].sample(frac=1, random_state=0).tolist())
+
+    # The legacy fixture: the wide table the app created before the long format, without a usn index
+    cursor = mysql.connection.cursor()
+    try:
+        _drop_semester(mysql, semester)
+        date_columns = ', '.join(f"`{class_date}` VARCHAR(1)" for class_date in dates)
+        cursor.execute(f"""
+            CREATE TABLE {table_name} (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                usn VARCHAR(20),
+                student_name VARCHAR(100),
+                {date_columns}
+            )
+        """)
+        BulkLoader().insert(cursor, table_name, ['usn', 'student_name', *dates],
+                            sheet.itertuples(index=False, name=None))
+        mysql.connection.commit()
+        wide_bytes = _table_bytes(cursor, [table_name])
+    finally:
+        cursor.close()
+
+    report.add('attendance_wide_student_lookup', size,
+               timed(lambda: attendance_data(mysql, semester, next(usns)), args.repeat * 10))
+    report.add('attendance_wide_stats', size, timed(lambda: attendance_stats(mysql, semester), args.repeat),
+               table_bytes=wide_bytes)
+
+    started = time.perf_counter()
+    status = dict(migrate_attendance_tables(mysql)).get(table_name)
+    report.add('attendance_migrate', size, {'wall_ms': round((time.perf_counter() - started) * 1000, 3)},
+               status=status, classes=len(dates))
+
+    analyzer = AttendanceAnalyzer(mysql)
+
+    def cold_stats():
+        analysis_cache.clear()
+        return analyzer.calculate_attendance_stats(semester)
+    cursor = mysql.connection.cursor()
+    try:
+        long_bytes = _table_bytes(cursor, [table_name, f"{table_name}_dates", f"{table_name}_marks"])
+    finally:
+        cursor.close()
+    report.add('attendance_long_student_lookup', size,
+               timed(lambda: analyzer.get_attendance_data(semester, next(usns)), args.repeat * 10))
+    report.add('attendance_long_stats', size, timed(cold_stats, args.repeat), table_bytes=long_bytes)
+
+    if not args.keep:
+        _drop_semester(mysql, semester)
+
+
+def _table_bytes(cursor, tables):
+    """Data plus index bytes of tables, from freshly analyzed InnoDB statistics."""
+    cursor.execute("ANALYZE TABLE " + ", ".join(tables))
+    cursor.fetchall()
+    placeholders = ', '.join(['%s'] * len(tables))
+    cursor.execute(f"""
+        SELECT COALESCE(SUM(data_length + index_length), 0) FROM information_schema.tables
+        WHERE table_schema = DATABASE() AND table_name IN ({placeholders})
+    """, tuple(tables))
+    return int(cursor.fetchone()[0])
+
+
+def _upload(client, url, sheet, semester, **form):
+    """Upload a sheet (with extra form fields), wait for its job and return the job with its wall time."""
+    workbook = io.BytesIO()
+    write_workbook(sheet, workbook)
+    return _run_job(client, url, data={'file': (io.BytesIO(workbook.getvalue()), 'benchmark.xlsx'),
+                                       'semester': semester, **form}, content_type='multipart/form-data')
+
+
+def _run_job(client, url, **request):
+    """POST a request that starts a background job, wait for it and return the job with its wall time."""
+    started = time.perf_counter()
+    status_url = client.post(url, **request).get_json()['status_url']
+    while True:
+        job = client.get(status_url).get_json()['job']
+        if job['status'] in ('succeeded', 'failed'):
+            break
+        time.sleep(0.02)
+    job['wall_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    if job['status'] == 'failed':
+        print(f"{url} failed: {job['message']}", file=sys.stderr)
+    return job
+
+
+def _first_chunk(client, url):
+    response = client.get(url, buffered=False)
+    try:
+        return next(iter(response.response))
+    finally:
+        response.close()
+
+
+def _drain(client, url):
+    response = client.get(url, buffered=False)
+    try:
+        return sum(len(chunk) for chunk in response.response)
+    finally:
+        response.close()
+
+
+def _drop_semester(mysql, semester):
+    """Remove every table, catalog row and CGPA row created for a benchmark semester."""
+    from analysis import summary_table_names
+    from catalog import semester_catalog
+    from cgpa import CGPAEngine, credits_table_name
+    from grading import create_grading_table
+    from ranks import rank_table_name
+
+    cursor = mysql.connection.cursor()
+    try:
+        for table_name in (f"sem_{semester}", f"sem_{semester}_prev"):
+            for table in (table_name, *summary_table_names(table_name), credits_table_name(table_name),
+                          rank_table_name(table_name)):
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        for suffix in ('', '_dates', '_marks'):
+            # Tables replaced by migrate_attendance_tables are kept as _legacy*
+            for table in (f"attendance_sem_{semester}{suffix}", f"attendance_sem_{semester}_legacy{suffix}"):
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute("DELETE FROM semester_catalog WHERE semester = %s", (semester,))
+        create_grading_table(cursor)
+        cursor.execute("DELETE FROM grading_schemes WHERE semester = %s", (semester,))
+        cursor.execute("DELETE FROM data_versions WHERE table_name IN (%s, %s)",
+                       (f"sem_{semester}", f"attendance_sem_{semester}"))
+        mysql.connection.commit()
+    finally:
+        cursor.close()
+    semester_catalog.invalidate()
+    CGPAEngine(mysql).refresh_semester(semester)  # No credits table left, so its rows are removed
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=[100, 1000, 10000], help='Comma-separated student counts')
+    parser.add_argument('--ingest-sizes', type=lambda value: [int(size) for size in value.split(',')],
+                        default=[1000, 10000, 50000], help='Comma-separated student counts of the ingest memory probes')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='Rows per chunk of the streaming ingest probe')
+    parser.add_argument('--subjects', type=int, default=8, help='Subjects per semester sheet')
+    parser.add_argument('--classes', type=int, default=120, help='Class days per attendance sheet')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per timed benchmark')
+    parser.add_argument('--output', default='benchmark_report.json', help='Where to write the JSON report')
+    parser.add_argument('--mysql-host', default='127.0.0.1')
+    parser.add_argument('--mysql-port', type=int, default=3306)
+    parser.add_argument('--mysql-user', default='root')
+    parser.add_argument('--mysql-password', default=os.environ.get('BENCH_MYSQL_PASSWORD'))
+    parser.add_argument('--mysql-db', default=None, help='Database to benchmark against; omit for in-memory only')
+    parser.add_argument('--keep', action='store_true', help='Keep the benchmark semesters in the database')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = Report(args)
+    run_startup(report, args)
+    run_ingest_memory(report, args)
+    run_offline(report, args)
+    run_instrumentation(report, args)
+    run_http(report, args)
+    if args.mysql_db:
+        run_mysql(report, args)
+    report.meta['peak_rss_mb'] = peak_rss_mb()
+
+    with open(args.output, 'w') as f:
+        json.dump(report.to_dict(), f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import os
+import tempfile
+from itertools import islice
+
+import MySQLdb
+
+# MySQL error code of a duplicate key
+ER_DUP_ENTRY = 1062
+
+
+class BulkLoader:
+    """Chunked bulk inserts shared by the semester and attendance uploads.
+
+    Rows are written with executemany in chunks of chunk_size, or through
+    LOAD DATA LOCAL INFILE from a temporary CSV when use_load_data is set
+    (the MySQL client must allow local_infile). Both paths raise
+    MySQLdb.IntegrityError on a duplicate key unless replace or an update
+    rule says what to do with it. The loader never commits; callers wrap
+    all their inserts in one transaction.
+    """
+
+    def __init__(self, chunk_size=1000, use_load_data=False):
+        self.chunk_size = chunk_size
+        self.use_load_data = use_load_data
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(chunk_size=config.get('BULK_CHUNK_SIZE', 1000),
+                   use_load_data=config.get('BULK_LOAD_DATA', False))
+
+    @staticmethod
+    def frame_rows(df, columns):
+        """Build row tuples column by column, with NaN converted to None."""
+        import pandas as pd
+        values = []
+        for col in columns:
+            column = df[col].to_numpy(dtype=object, copy=True)
+            column[pd.isna(column)] = None
+            values.append(column.tolist())
+        return zip(*values)
+
+    def insert(self, cursor, table_name, columns, rows, replace=False, update_columns=None,
+               increment_columns=None):
+        """Insert rows into table_name and return the number of rows sent.
+
+        Args:
+            cursor: Cursor of the connection holding the caller's transaction
+            table_name: Target table
+            columns: Target column names, in row order
+            rows: Iterable of row tuples
+            replace: Replace rows that hit a duplicate key (REPLACE semantics)
+            update_columns: Columns to update on a duplicate key instead
+            increment_columns: Columns to add the row's value to on a duplicate key
+        """
+        if self.use_load_data and not update_columns and not increment_columns:
+            return self._load_data(cursor, table_name, columns, rows, replace)
+
+        column_list = ','.join(f'`{col}`' for col in columns)
+        placeholders = ','.join(['%s'] * len(columns))
+        verb = 'REPLACE' if replace else 'INSERT'
+        query = f"{verb} INTO {table_name} ({column_list}) VALUES ({placeholders})"
+        assignments = [f'`{col}` = VALUES(`{col}`)' for col in update_columns or []]
+        assignments += [f'`{col}` = `{col}` + VALUES(`{col}`)' for col in increment_columns or []]
+        if assignments:
+            query += " ON DUPLICATE KEY UPDATE " + ', '.join(assignments)
+
+        total = 0
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            cursor.executemany(query, chunk)
+            total += len(chunk)
+        return total
+
+    def _load_data(self, cursor, table_name, columns, rows, replace):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        total = 0
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                for row in rows:
+                    f.write(','.join(self._csv_field(value) for value in row))
+                    f.write('\n')
+                    total += 1
+            if total:
+                column_list = ','.join(f'`{col}`' for col in columns)
+                duplicate_rule = 'REPLACE' if replace else ''
+                # With an empty ESCAPED BY, an unquoted NULL is read as SQL NULL
+                cursor.execute(f"""
+                    LOAD DATA LOCAL INFILE %s {duplicate_rule} INTO TABLE {table_name}
+                    CHARACTER SET utf8mb4
+                    FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '"' ESCAPED BY ''
+                    LINES TERMINATED BY '\\n'
+                    ({column_list})
+                """, (path,))
+                # LOCAL turns duplicate-key errors into warnings and skips the rows, so
+                # fail like executemany would instead of losing them
+                loaded = cursor.rowcount
+                if not replace and loaded != total:
+                    cursor.execute("SHOW WARNINGS LIMIT 1")
+                    warning = cursor.fetchone()
+                    raise MySQLdb.IntegrityError(
+                        ER_DUP_ENTRY, warning[2] if warning else f"{total - loaded} of {total} rows were skipped"
+                    )
+            return total
+        finally:
+            os.remove(path)
+
+    @staticmethod
+    def _csv_field(value):
+        if value is None:
+            return 'NULL'
+        if isinstance(value, bool):
+            return str(int(value))
+        if isinstance(value, (int, float)):
+            return repr(value)
+        return '"' + str(value).replace('"', '""') + '"'
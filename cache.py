@@ -0,0 +1,187 @@
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+
+class AnalysisCache:
+    """Bounded LRU cache for analysis results keyed by semester data version.
+
+    Entries are stored under (key, data_version). Uploads bump the data
+    version of the table they load, so an entry computed from older data can
+    never be served again; it simply ages out of the LRU. When shared_dir is
+    set, entries are also written there so other worker processes on the
+    same host can reuse them.
+    """
+
+    def __init__(self, max_entries=256, shared_dir=None, max_shared_entries=1024):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.max_entries = max_entries
+        self.shared_dir = shared_dir
+        self.max_shared_entries = max_shared_entries
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.shared_evictions = 0
+
+    def configure(self, max_entries=None, shared_dir=None, max_shared_entries=None):
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_shared_entries is not None:
+                self.max_shared_entries = max_shared_entries
+            self.shared_dir = shared_dir
+            if shared_dir and not os.path.exists(shared_dir):
+                os.makedirs(shared_dir)
+            self._evict()
+
+    def get_or_compute(self, key, version, compute):
+        """Return the cached value for key at version, computing it on a miss.
+
+        A version of None means the data version could not be determined, so
+        the cache is bypassed. None results are never cached.
+        """
+        if version is None:
+            return compute()
+
+        cache_key = (key, version)
+        with self._lock:
+            if cache_key in self._entries:
+                self._entries.move_to_end(cache_key)
+                self.hits += 1
+                return self._entries[cache_key]
+
+        value = self._read_shared(cache_key)
+        if value is not None:
+            with self._lock:
+                self.shared_hits += 1
+                self._store(cache_key, value)
+            return value
+
+        with self._lock:
+            self.misses += 1
+        value = compute()
+        if value is not None:
+            with self._lock:
+                self._store(cache_key, value)
+            self._write_shared(cache_key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'shared_evictions': self.shared_evictions,
+                'shared_dir': self.shared_dir
+            }
+
+    def _store(self, cache_key, value):
+        self._entries[cache_key] = value
+        self._entries.move_to_end(cache_key)
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _shared_path(self, cache_key):
+        digest = hashlib.sha1(repr(cache_key).encode('utf-8')).hexdigest()
+        return os.path.join(self.shared_dir, f"{digest}.pkl")
+
+    def _read_shared(self, cache_key):
+        if not self.shared_dir:
+            return None
+        try:
+            with open(self._shared_path(cache_key), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def _write_shared(self, cache_key, value):
+        if not self.shared_dir:
+            return
+        path = self._shared_path(cache_key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)  # Atomic, so readers never see a partial file
+            self._prune_shared()
+        except OSError as e:
+            print(f"Error writing shared cache entry: {str(e)}")
+
+    def _prune_shared(self):
+        files = [os.path.join(self.shared_dir, name) for name in os.listdir(self.shared_dir)
+                 if name.endswith('.pkl')]
+        if len(files) <= self.max_shared_entries:
+            return
+        files.sort(key=lambda path: os.stat(path).st_mtime)
+        for path in files[:len(files) - self.max_shared_entries]:
+            try:
+                os.remove(path)
+                with self._lock:
+                    self.shared_evictions += 1
+            except OSError:
+                pass  # Another worker already pruned it
+
+
+analysis_cache = AnalysisCache()
+
+
+def get_data_version(mysql, table_name):
+    """Return the current data version of table_name.
+
+    A table that was never versioned is at version 0; None means the
+    version could not be read (e.g. data_versions does not exist yet), so
+    callers bypass the cache.
+    """
+    cursor = mysql.connection.cursor()
+    try:
+        cursor.execute("SELECT version FROM data_versions WHERE table_name = %s", (table_name,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+    except Exception as e:
+        print(f"Error reading data version: {str(e)}")
+        return None
+    finally:
+        cursor.close()
+
+
+def create_version_table(cursor):
+    """Create data_versions; commits implicitly, so call it before any data writes."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            table_name VARCHAR(64) PRIMARY KEY,
+            version INT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def bump_data_version(cursor, table_name):
+    """Increment the data version of table_name as part of the caller's transaction.
+
+    data_versions must exist (see create_version_table). The upsert is
+    transactional, so it can run before or after the data writes; returns
+    the new version, which the upsert holds the row lock on, so it is the
+    version this transaction commits.
+    """
+    cursor.execute("""
+        INSERT INTO data_versions (table_name, version) VALUES (%s, 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+    """, (table_name,))
+    cursor.execute("SELECT version FROM data_versions WHERE table_name = %s", (table_name,))
+    return cursor.fetchone()[0]
@@ -0,0 +1,217 @@
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from flask import current_app
+
+# Uploaded data kinds; '<kind>_prev' rows describe the tables kept for rollback
+PERFORMANCE = 'performance'
+ATTENDANCE = 'attendance'
+
+# Upload tables of a semester; sem_N_prev is the performance table kept for rollback
+SEMESTER_TABLE = re.compile(r'sem_[0-9A-Za-z]+(_prev)?')
+ATTENDANCE_TABLE = re.compile(r'attendance_sem_[0-9A-Za-z]+')
+
+
+class SemesterCatalog:
+    """In-process view of the semester_catalog table.
+
+    semester_catalog has one row per uploaded (semester, kind) with the
+    subject columns and credits, row count, data version and upload time.
+    The upload paths write it in their own transactions; request handlers
+    read it from memory instead of issuing SHOW TABLES / SHOW COLUMNS. The
+    whole table is small, so it is reloaded in one query once ttl seconds
+    have passed or after a local write; other worker processes see a new
+    upload within ttl seconds. A database with no catalog rows yet (before
+    the first upload or `flask build-catalog`) is read from its sem_N and
+    attendance_sem_N tables instead.
+    """
+
+    def __init__(self, ttl=30.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = None
+        self._loaded_at = 0.0
+        self.loads = 0
+
+    def configure(self, ttl=None):
+        with self._lock:
+            if ttl is not None:
+                self.ttl = ttl
+
+    def get(self, mysql, semester, kind=PERFORMANCE):
+        """Catalog entry of one semester upload, or None if it does not exist."""
+        return self._load(mysql).get((str(semester), kind))
+
+    def exists(self, mysql, semester, kind=PERFORMANCE):
+        return self.get(mysql, semester, kind) is not None
+
+    def semesters(self, mysql, kind=PERFORMANCE):
+        """Semesters that have data of kind, in semester order."""
+        return sorted((semester for semester, entry_kind in self._load(mysql) if entry_kind == kind),
+                      key=lambda semester: (len(semester), semester))
+
+    def invalidate(self):
+        with self._lock:
+            self._entries = None
+
+    def _load(self, mysql):
+        with self._lock:
+            if self._entries is not None and time.monotonic() - self._loaded_at < self.ttl:
+                return self._entries
+
+        cursor = mysql.connection.cursor()
+        try:
+            try:
+                cursor.execute("""
+                    SELECT semester, kind, subjects, row_count, data_version, UNIX_TIMESTAMP(uploaded_at)
+                    FROM semester_catalog
+                """)
+                rows = cursor.fetchall()
+            except Exception as e:
+                # Missing until the first upload or `flask build-catalog`
+                current_app.logger.warning("Error loading semester catalog, discovering semester tables: %s", e)
+                rows = ()
+            entries = {
+                (semester, kind): {
+                    'semester': semester,
+                    'kind': kind,
+                    'subjects': json.loads(subjects) if subjects else [],
+                    'row_count': row_count,
+                    'data_version': data_version,
+                    # Read as epoch seconds so the value does not depend on the session time zone
+                    'uploaded_at': datetime.fromtimestamp(int(uploaded_at), timezone.utc) if uploaded_at else None
+                }
+                for semester, kind, subjects, row_count, data_version, uploaded_at in rows
+            }
+            if not entries:
+                entries = self._discover(cursor)
+        except Exception:
+            current_app.logger.exception("Error discovering semester tables")
+            return {}  # Not cached, so the next request retries
+        finally:
+            cursor.close()
+
+        with self._lock:
+            self._entries = entries
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+        return entries
+
+    @staticmethod
+    def _discover(cursor):
+        """
+        Entries of the sem_N and attendance_sem_N tables, for a database whose
+        catalog is missing or empty.
+
+        Like build_catalog's backfill, subjects come from the table columns
+        with credits None; versions and upload times are unknown.
+        """
+        from analysis import STANDARD_COLUMNS
+
+        entries = {}
+        for table_pattern, prefix, kind in ((SEMESTER_TABLE, 'sem_', PERFORMANCE),
+                                            (ATTENDANCE_TABLE, 'attendance_sem_', ATTENDANCE)):
+            cursor.execute("SHOW TABLES LIKE %s", (prefix.replace('_', r'\_') + '%',))
+            for (table_name,) in cursor.fetchall():
+                if not table_pattern.fullmatch(table_name) or table_name.endswith('_prev'):
+                    continue
+                semester = table_name[len(prefix):]
+                subjects = []
+                if kind == PERFORMANCE:
+                    cursor.execute(f"SHOW COLUMNS FROM {table_name}")
+                    subjects = subject_columns([row[0] for row in cursor.fetchall()
+                                                if row[0] not in STANDARD_COLUMNS])
+                entries[(semester, kind)] = {
+                    'semester': semester,
+                    'kind': kind,
+                    'subjects': subjects,
+                    'row_count': None,
+                    'data_version': None,
+                    'uploaded_at': None
+                }
+        return entries
+
+
+semester_catalog = SemesterCatalog()
+
+
+def create_catalog_table(cursor):
+    """Create semester_catalog; commits implicitly, so call it before any data writes."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS semester_catalog (
+            semester VARCHAR(10) NOT NULL,
+            kind VARCHAR(20) NOT NULL,
+            subjects TEXT,
+            row_count INT NOT NULL DEFAULT 0,
+            data_version INT NOT NULL DEFAULT 0,
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (semester, kind)
+        )
+    """)
+
+
+def subject_columns(columns):
+    """
+    Catalog subjects of a result sheet: [{'column', 'name', 'credits'}, ...].
+
+    column is the sem_N column name and credits comes from the 'Name (4)'
+    header suffix, or is None when the header has none.
+    """
+    subjects = []
+    for header in columns:
+        match = re.search(r'\((\d+)\)', header)
+        name = re.sub(r'\(\d+\)', '', header).strip()
+        subjects.append({
+            'column': re.sub(r'[^a-zA-Z0-9_]', '_', name),
+            'name': name,
+            'credits': int(match.group(1)) if match else None
+        })
+    return subjects
+
+
+def record_upload(cursor, semester, kind, table_name, subjects=None, row_count=None):
+    """
+    Upsert the catalog row of a semester upload inside the caller's transaction.
+
+    The data version (and the row count, unless the caller knows it) are
+    read from data_versions and table_name, so call this after the data
+    writes and the version bump.
+    """
+    if row_count is None:
+        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+        row_count = cursor.fetchone()[0]
+    cursor.execute("""
+        INSERT INTO semester_catalog (semester, kind, subjects, row_count, data_version, uploaded_at)
+        VALUES (%s, %s, %s, %s,
+                COALESCE((SELECT version FROM data_versions WHERE table_name = %s), 0),
+                CURRENT_TIMESTAMP)
+        ON DUPLICATE KEY UPDATE
+            subjects = VALUES(subjects), row_count = VALUES(row_count),
+            data_version = VALUES(data_version), uploaded_at = VALUES(uploaded_at)
+    """, (str(semester), kind, json.dumps(subjects) if subjects is not None else None, row_count, table_name))
+
+
+def retire_upload(cursor, semester, kind):
+    """Move the catalog row of (semester, kind) to '<kind>_prev', replacing any older one."""
+    cursor.execute("DELETE FROM semester_catalog WHERE semester = %s AND kind = %s",
+                   (str(semester), f"{kind}_prev"))
+    cursor.execute("UPDATE semester_catalog SET kind = %s WHERE semester = %s AND kind = %s",
+                   (f"{kind}_prev", str(semester), kind))
+
+
+def swap_with_previous(cursor, semester, kind, table_name):
+    """
+    Exchange the catalog rows of (semester, kind) and (semester, '<kind>_prev'),
+    then stamp the live row with the current data version of table_name.
+    """
+    swap_kind = f"{kind}_swap"
+    for old_kind, new_kind in ((kind, swap_kind), (f"{kind}_prev", kind), (swap_kind, f"{kind}_prev")):
+        cursor.execute("UPDATE semester_catalog SET kind = %s WHERE semester = %s AND kind = %s",
+                       (new_kind, str(semester), old_kind))
+    cursor.execute("""
+        UPDATE semester_catalog
+        SET data_version = COALESCE((SELECT version FROM data_versions WHERE table_name = %s), 0)
+        WHERE semester = %s AND kind = %s
+    """, (table_name, str(semester), kind))
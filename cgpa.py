@@ -0,0 +1,259 @@
+import MySQLdb.cursors
+from analysis import SGPA_BANDS
+from cache import bump_data_version, create_version_table
+
+# Students are recomputed in cgpa_students this many USNs at a time
+REFRESH_BATCH_SIZE = 1000
+
+
+def credits_table_name(table_name):
+    """Name of the per-student credits table that belongs to a sem_N table."""
+    return f"{table_name}_credits"
+
+
+class CGPAEngine:
+    """Cumulative GPA across all uploaded semesters.
+
+    Every semester load also writes sem_N_credits (credits, credit-weighted
+    grade points and backlogs per USN), which is swapped together with
+    sem_N. refresh_semester copies it into cgpa_rollup, one row per
+    (usn, semester), and recomputes cgpa_students only for the USNs that
+    semester touches, so a student's CGPA is a primary-key read no matter
+    how many semesters exist.
+
+    CGPA is total grade points over total credits; subjects below the pass
+    mark earn no grade points and subjects below the fail mark count as
+    backlogs.
+    """
+
+    def __init__(self, mysql):
+        self.mysql = mysql
+
+    @staticmethod
+    def create_credits_table(cursor, table_name):
+        """Create an empty {table_name}_credits table."""
+        credits_table = credits_table_name(table_name)
+        cursor.execute(f"DROP TABLE IF EXISTS {credits_table}")
+        cursor.execute(f"""
+            CREATE TABLE {credits_table} (
+                usn VARCHAR(20) PRIMARY KEY,
+                student_name VARCHAR(100),
+                credits INT NOT NULL,
+                grade_points INT NOT NULL,
+                backlogs INT NOT NULL
+            )
+        """)
+
+    @staticmethod
+    def create_tables(cursor):
+        create_version_table(cursor)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS cgpa_rollup (
+                usn VARCHAR(20) NOT NULL,
+                semester VARCHAR(10) NOT NULL,
+                student_name VARCHAR(100),
+                credits INT NOT NULL,
+                grade_points INT NOT NULL,
+                backlogs INT NOT NULL,
+                PRIMARY KEY (usn, semester),
+                KEY idx_semester (semester)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS cgpa_students (
+                usn VARCHAR(20) PRIMARY KEY,
+                student_name VARCHAR(100),
+                semesters INT NOT NULL,
+                credits INT NOT NULL,
+                grade_points INT NOT NULL,
+                backlogs INT NOT NULL,
+                cgpa FLOAT,
+                KEY idx_cgpa (cgpa)
+            )
+        """)
+
+    def refresh_semester(self, semester_number):
+        """
+        Bring cgpa_rollup and cgpa_students in line with sem_N_credits.
+
+        Called after a semester is published or rolled back. A semester
+        without a credits table (uploaded before CGPA existed) is removed
+        from the rollup.
+
+        Returns:
+            (success, message)
+        """
+        semester = str(semester_number)
+        credits_table = credits_table_name(f"sem_{semester}")
+        cursor = self.mysql.connection.cursor()
+
+        try:
+            # DDL commits implicitly, so it runs before any data writes
+            self.create_tables(cursor)
+            bump_data_version(cursor, 'cgpa_students')
+
+            cursor.execute("SELECT usn FROM cgpa_rollup WHERE semester = %s", (semester,))
+            affected = {row[0] for row in cursor.fetchall()}
+            cursor.execute("DELETE FROM cgpa_rollup WHERE semester = %s", (semester,))
+
+            cursor.execute("SHOW TABLES LIKE %s", (credits_table,))
+            if cursor.fetchone() is not None:
+                cursor.execute(f"""
+                    INSERT INTO cgpa_rollup (usn, semester, student_name, credits, grade_points, backlogs)
+                    SELECT usn, %s, student_name, credits, grade_points, backlogs
+                    FROM {credits_table}
+                """, (semester,))
+                cursor.execute(f"SELECT usn FROM {credits_table}")
+                affected.update(row[0] for row in cursor.fetchall())
+
+            self._recompute_students(cursor, sorted(affected))
+            self.mysql.connection.commit()
+            return True, f"CGPA updated for {len(affected)} students"
+        except Exception as e:
+            self.mysql.connection.rollback()
+            return False, f'Error updating CGPA: {str(e)}'
+        finally:
+            cursor.close()
+
+    def refresh_students(self, semester_number, usns):
+        """
+        Copy the sem_N_credits rows of usns into cgpa_rollup and recompute their CGPA.
+
+        Called after a delta upload, which changes only those students'
+        rows, so the other students of the semester are left alone.
+
+        Returns:
+            (success, message)
+        """
+        semester = str(semester_number)
+        credits_table = credits_table_name(f"sem_{semester}")
+        usns = sorted(set(usns))
+        cursor = self.mysql.connection.cursor()
+
+        try:
+            self.create_tables(cursor)
+            bump_data_version(cursor, 'cgpa_students')
+            for start in range(0, len(usns), REFRESH_BATCH_SIZE):
+                batch = usns[start:start + REFRESH_BATCH_SIZE]
+                placeholders = ','.join(['%s'] * len(batch))
+                cursor.execute(f"""
+                    INSERT INTO cgpa_rollup (usn, semester, student_name, credits, grade_points, backlogs)
+                    SELECT usn, %s, student_name, credits, grade_points, backlogs
+                    FROM {credits_table}
+                    WHERE usn IN ({placeholders})
+                    ON DUPLICATE KEY UPDATE
+                        student_name = VALUES(student_name), credits = VALUES(credits),
+                        grade_points = VALUES(grade_points), backlogs = VALUES(backlogs)
+                """, [semester] + batch)
+            self._recompute_students(cursor, usns)
+            self.mysql.connection.commit()
+            return True, f"CGPA updated for {len(usns)} students"
+        except Exception as e:
+            self.mysql.connection.rollback()
+            return False, f'Error updating CGPA: {str(e)}'
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _recompute_students(cursor, usns):
+        """Rebuild the cgpa_students rows of usns from cgpa_rollup."""
+        for start in range(0, len(usns), REFRESH_BATCH_SIZE):
+            batch = usns[start:start + REFRESH_BATCH_SIZE]
+            placeholders = ','.join(['%s'] * len(batch))
+            cursor.execute(f"DELETE FROM cgpa_students WHERE usn IN ({placeholders})", batch)
+            cursor.execute(f"""
+                INSERT INTO cgpa_students (usn, student_name, semesters, credits, grade_points, backlogs, cgpa)
+                SELECT usn, MAX(student_name), COUNT(*), SUM(credits), SUM(grade_points), SUM(backlogs),
+                       ROUND(SUM(grade_points) / NULLIF(SUM(credits), 0), 2)
+                FROM cgpa_rollup
+                WHERE usn IN ({placeholders})
+                GROUP BY usn
+            """, batch)
+
+    def get_student_cgpa(self, usn):
+        """
+        CGPA of one student with the per-semester breakdown, or None if unknown.
+
+        Both tables are read by primary key in a single query.
+        """
+        cursor = self.mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            cursor.execute("""
+                SELECT s.usn, s.student_name, s.semesters, s.credits AS total_credits,
+                       s.grade_points AS total_grade_points, s.backlogs AS total_backlogs, s.cgpa,
+                       r.semester, r.credits, r.grade_points, r.backlogs
+                FROM cgpa_students s
+                JOIN cgpa_rollup r ON r.usn = s.usn
+                WHERE s.usn = %s
+                ORDER BY LENGTH(r.semester), r.semester
+            """, (usn,))
+            rows = cursor.fetchall()
+        except MySQLdb.Error as e:
+            print(f"Error reading CGPA: {str(e)}")
+            return None
+        finally:
+            cursor.close()
+
+        if not rows:
+            return None
+
+        first = rows[0]
+        return {
+            'usn': first['usn'],
+            'name': first['student_name'],
+            'cgpa': first['cgpa'],
+            'credits': first['total_credits'],
+            'grade_points': first['total_grade_points'],
+            'backlogs': first['total_backlogs'],
+            'semesters': [
+                {
+                    'semester': row['semester'],
+                    'credits': row['credits'],
+                    'grade_points': row['grade_points'],
+                    'backlogs': row['backlogs'],
+                    'sgpa': round(row['grade_points'] / row['credits'], 2) if row['credits'] else 0
+                }
+                for row in rows
+            ]
+        }
+
+    def get_class_cgpa(self, semester_number=None):
+        """
+        CGPA ranking and distribution of every student, or only of the
+        students enrolled in semester_number.
+        """
+        cursor = self.mysql.connection.cursor(MySQLdb.cursors.DictCursor)
+        try:
+            if semester_number is None:
+                cursor.execute("""
+                    SELECT usn, student_name, semesters, credits, backlogs, cgpa
+                    FROM cgpa_students
+                    ORDER BY cgpa DESC, usn
+                """)
+            else:
+                cursor.execute("""
+                    SELECT s.usn, s.student_name, s.semesters, s.credits, s.backlogs, s.cgpa
+                    FROM cgpa_rollup r
+                    JOIN cgpa_students s ON s.usn = r.usn
+                    WHERE r.semester = %s
+                    ORDER BY s.cgpa DESC, s.usn
+                """, (str(semester_number),))
+            students = list(cursor.fetchall())
+        except MySQLdb.Error as e:
+            print(f"Error reading class CGPA: {str(e)}")
+            return None
+        finally:
+            cursor.close()
+
+        cgpas = [student['cgpa'] for student in students if student['cgpa'] is not None]
+        return {
+            'semester': semester_number,
+            'total_students': len(students),
+            'average_cgpa': round(sum(cgpas) / len(cgpas), 2) if cgpas else 0,
+            'students_with_backlogs': sum(1 for student in students if student['backlogs'] > 0),
+            'cgpa_distribution': {
+                band: sum(1 for cgpa in cgpas if low <= cgpa <= high)
+                for band, low, high in SGPA_BANDS
+            },
+            'students': students
+        }
@@ -0,0 +1,232 @@
+import os
+import threading
+import time
+from collections import deque
+
+import MySQLdb
+from flask import current_app, g
+from werkzeug.local import LocalProxy
+
+from metrics import InstrumentedConnection, metrics
+
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection becomes free within the timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of MySQLdb connections.
+
+    Connections are opened lazily, up to max_size; min_size of them are
+    opened on first use and kept even when idle. With pre_ping, every
+    checkout pings the connection and replaces it if the server dropped it.
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=5.0, pre_ping=True):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.pre_ping = pre_ping
+        self._idle = deque()
+        self._size = 0
+        self._condition = threading.Condition()
+        self._filled = False
+
+        # Metrics
+        self.checkouts = 0
+        self.timeouts = 0
+        self.created = 0
+        self.ping_failures = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def acquire(self):
+        started = time.perf_counter()
+        with self._condition:
+            if not self._filled:
+                self._fill()
+            while not self._idle and self._size >= self.max_size:
+                remaining = self.timeout - (time.perf_counter() - started)
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"No database connection free after {self.timeout}s")
+                self._condition.wait(remaining)
+
+            conn = self._idle.popleft() if self._idle else None
+            if conn is None:
+                self._size += 1  # Reserve the slot before connecting outside the lock
+
+            waited = time.perf_counter() - started
+            self.checkouts += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+        try:
+            if conn is None:
+                return self._open()
+            if self.pre_ping:
+                try:
+                    conn.ping()
+                except MySQLdb.Error:
+                    with self._condition:
+                        self.ping_failures += 1
+                    self._close(conn)
+                    return self._open()
+            return conn
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, conn):
+        """Return a connection, discarding any uncommitted work."""
+        try:
+            conn.rollback()
+        except MySQLdb.Error:
+            self._close(conn)
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            return
+        with self._condition:
+            self._idle.append(conn)
+            self._condition.notify()
+
+    def close_all(self):
+        with self._condition:
+            while self._idle:
+                self._close(self._idle.popleft())
+                self._size -= 1
+
+    def stats(self):
+        with self._condition:
+            return {
+                'size': self._size,
+                'in_use': self._size - len(self._idle),
+                'idle': len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'created': self.created,
+                'ping_failures': self.ping_failures,
+                'total_wait_seconds': round(self.total_wait, 6),
+                'max_wait_seconds': round(self.max_wait, 6)
+            }
+
+    def _fill(self):
+        self._filled = True
+        while self._size < self.min_size:
+            self._idle.append(self._connect())
+            self._size += 1
+            self.created += 1
+
+    def _open(self):
+        conn = self._connect()
+        with self._condition:
+            self.created += 1
+        return conn
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except MySQLdb.Error:
+            pass
+
+
+class PooledMySQL:
+    """Drop-in replacement for flask_mysqldb.MySQL backed by a ConnectionPool.
+
+    mysql.connection checks a connection out for the current app context
+    (request or background job) and teardown returns it to the pool. The
+    pool is created on first use in each process, so connections opened
+    before a pre-fork server forks are never shared with the workers.
+    With MYSQL_INSTRUMENT, cursors are timed and counted by metrics.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('MYSQL_HOST', 'localhost')
+        app.config.setdefault('MYSQL_USER', None)
+        app.config.setdefault('MYSQL_PASSWORD', None)
+        app.config.setdefault('MYSQL_DB', None)
+        app.config.setdefault('MYSQL_PORT', 3306)
+        app.config.setdefault('MYSQL_UNIX_SOCKET', None)
+        app.config.setdefault('MYSQL_CONNECT_TIMEOUT', 10)
+        app.config.setdefault('MYSQL_CHARSET', 'utf8')
+        app.config.setdefault('MYSQL_CUSTOM_OPTIONS', None)
+        app.config.setdefault('MYSQL_POOL_MIN_SIZE', 1)
+        app.config.setdefault('MYSQL_POOL_MAX_SIZE', 10)
+        app.config.setdefault('MYSQL_POOL_TIMEOUT', 5.0)
+        app.config.setdefault('MYSQL_POOL_PRE_PING', True)
+        app.config.setdefault('MYSQL_INSTRUMENT', True)
+        app.teardown_appcontext(self.teardown)
+        app.extensions['mysql'] = self
+
+    @property
+    def pool(self):
+        with self._lock:
+            if self._pool is None or self._pool_pid != os.getpid():
+                config = self.app.config
+                self._pool = ConnectionPool(
+                    self._connect,
+                    min_size=config['MYSQL_POOL_MIN_SIZE'],
+                    max_size=config['MYSQL_POOL_MAX_SIZE'],
+                    timeout=config['MYSQL_POOL_TIMEOUT'],
+                    pre_ping=config['MYSQL_POOL_PRE_PING']
+                )
+                self._pool_pid = os.getpid()
+            return self._pool
+
+    @property
+    def connection(self):
+        if 'mysql_connection' not in g:
+            g.mysql_connection = self.pool.acquire()
+            if self.app.config['MYSQL_INSTRUMENT']:
+                g.mysql_instrumented = InstrumentedConnection(g.mysql_connection, metrics)
+        return g.get('mysql_instrumented', g.mysql_connection)
+
+    def teardown(self, exception):
+        g.pop('mysql_instrumented', None)
+        conn = g.pop('mysql_connection', None)
+        if conn is not None:
+            self.pool.release(conn)
+
+    def stats(self):
+        return self._pool.stats() if self._pool is not None else None
+
+    def _connect(self):
+        config = self.app.config
+        kwargs = {
+            'host': config['MYSQL_HOST'],
+            'port': config['MYSQL_PORT'],
+            'connect_timeout': config['MYSQL_CONNECT_TIMEOUT'],
+            'charset': config['MYSQL_CHARSET'],
+            'use_unicode': True
+        }
+        if config['MYSQL_USER']:
+            kwargs['user'] = config['MYSQL_USER']
+        if config['MYSQL_PASSWORD']:
+            kwargs['passwd'] = config['MYSQL_PASSWORD']
+        if config['MYSQL_DB']:
+            kwargs['db'] = config['MYSQL_DB']
+        if config['MYSQL_UNIX_SOCKET']:
+            kwargs['unix_socket'] = config['MYSQL_UNIX_SOCKET']
+        if config['MYSQL_CUSTOM_OPTIONS']:
+            kwargs.update(config['MYSQL_CUSTOM_OPTIONS'])
+        return MySQLdb.connect(**kwargs)
+
+
+# The PooledMySQL of the current app; every create_app() builds its own
+mysql = LocalProxy(lambda: current_app.extensions['mysql'])
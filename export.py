@@ -0,0 +1,166 @@
+import csv
+import io
+from itertools import islice
+import MySQLdb.cursors
+from analysis import STANDARD_COLUMNS
+from attendance import AttendanceAnalyzer
+from catalog import ATTENDANCE, PERFORMANCE
+
+# Rows fetched from the server-side cursor, and written per Parquet row group, at a time
+EXPORT_BATCH_SIZE = 5000
+
+EXPORT_KINDS = (PERFORMANCE, ATTENDANCE)
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+}
+
+
+class ParquetUnavailable(Exception):
+    """Raised when a Parquet export is requested but pyarrow is not installed."""
+
+
+class SemesterExporter:
+    """Streams a semester's results or attendance as CSV or Parquet.
+
+    Rows come from a server-side cursor in batches of batch_size and are
+    encoded batch by batch, so memory stays flat however large the table
+    is. Parquet needs the optional pyarrow package and is written one row
+    group per batch.
+    """
+
+    def __init__(self, mysql, batch_size=EXPORT_BATCH_SIZE):
+        self.mysql = mysql
+        self.batch_size = batch_size
+
+    def export(self, kind, semester, fmt):
+        """
+        Return a generator of encoded chunks (str for CSV, bytes for Parquet).
+
+        Raises:
+            ParquetUnavailable: If fmt is 'parquet' and pyarrow is missing
+        """
+        if fmt == 'parquet':
+            _import_pyarrow()  # Fail before the response starts
+            return self.iter_parquet(kind, semester)
+        return self.iter_csv(kind, semester)
+
+    def iter_csv(self, kind, semester):
+        columns, batches = self._batches(kind, semester)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for batch in batches:
+            writer.writerows(batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    def iter_parquet(self, kind, semester):
+        pa, pq = _import_pyarrow()
+        columns, batches = self._batches(kind, semester)
+        schema = pa.schema([(name, _arrow_type(pa, kind, name)) for name in columns])
+
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        try:
+            for batch in batches:
+                writer.write_table(pa.Table.from_pylist(
+                    [dict(zip(columns, row)) for row in batch], schema=schema))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    def _batches(self, kind, semester):
+        """Return (column names, generator of row-tuple lists)."""
+        if kind == ATTENDANCE:
+            return self._attendance_batches(semester)
+        return self._performance_batches(semester)
+
+    def _performance_batches(self, semester):
+        cursor = self.mysql.connection.cursor(MySQLdb.cursors.SSCursor)
+        try:
+            cursor.execute(f"SELECT * FROM sem_{semester} ORDER BY id")
+        except Exception:
+            cursor.close()
+            raise
+        columns = [desc[0] for desc in cursor.description]
+
+        def batches():
+            try:
+                while True:
+                    batch = cursor.fetchmany(self.batch_size)
+                    if not batch:
+                        break
+                    yield batch
+            finally:
+                cursor.close()
+
+        return columns, batches()
+
+    def _attendance_batches(self, semester):
+        records = AttendanceAnalyzer(self.mysql).iter_attendance_rows(semester)
+        dates = next(records)['dates']
+        columns = ['usn', 'student_name', *dates]
+
+        def batches():
+            try:
+                while True:
+                    batch = [tuple(record[column] for column in columns)
+                             for record in islice(records, self.batch_size)]
+                    if not batch:
+                        break
+                    yield batch
+            finally:
+                records.close()
+
+        return columns, batches()
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back through drain()."""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ParquetUnavailable("Parquet export requires the pyarrow package")
+    return pa, pq
+
+
+def _arrow_type(pa, kind, column):
+    if column == 'id':
+        return pa.int64()
+    if kind == ATTENDANCE or column in STANDARD_COLUMNS:
+        return pa.float64() if column == 'sgpa' else pa.string()
+    return pa.float64()  # Subject marks
@@ -0,0 +1,247 @@
+import json
+from collections import Counter
+import MySQLdb
+import numpy as np
+from analysis import SGPA_BANDS
+
+# MySQL error code of a missing table
+ER_NO_SUCH_TABLE = 1146
+
+
+class GradingScheme:
+    """A grading policy: how marks become grade points, SGPA, result and grade.
+
+    A subject mark >= grade_thresholds[i - 1] earns grade_points[i] (marks
+    below the first threshold earn grade_points[0]); SGPA is the
+    credit-weighted mean of the grade points, rounded to 2 places. A
+    student with any credited subject below fail_mark fails the semester,
+    gets SGPA 0 and the lowest grade; otherwise SGPA >= sgpa_thresholds[i - 1]
+    earns sgpa_grades[i]. Missing marks earn no grade points.
+    """
+
+    def __init__(self, grade_thresholds, grade_points, sgpa_thresholds, sgpa_grades, fail_mark):
+        self.grade_thresholds = np.array(grade_thresholds, dtype=float)
+        self.grade_points = np.array(grade_points, dtype=np.int64)
+        self.sgpa_thresholds = np.array(sgpa_thresholds, dtype=float)
+        self.sgpa_grades = np.array(sgpa_grades, dtype=object)
+        self.fail_mark = float(fail_mark)
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a scheme from its to_dict() form, e.g. a request body.
+
+        Raises:
+            ValueError: if the definition is incomplete or inconsistent
+        """
+        if not isinstance(data, dict):
+            raise ValueError("A grading scheme must be an object")
+        missing = [key for key in ('grade_thresholds', 'grade_points', 'sgpa_thresholds', 'sgpa_grades',
+                                   'fail_mark') if key not in data]
+        if missing:
+            raise ValueError(f"Grading scheme is missing {', '.join(missing)}")
+        try:
+            grade_thresholds = [float(value) for value in data['grade_thresholds']]
+            sgpa_thresholds = [float(value) for value in data['sgpa_thresholds']]
+            grade_points = [float(value) for value in data['grade_points']]
+            fail_mark = float(data['fail_mark'])
+        except (TypeError, ValueError):
+            raise ValueError("Grading scheme thresholds, grade points and fail mark must be numbers")
+        sgpa_grades = [str(grade) for grade in data['sgpa_grades']]
+
+        for name, thresholds in (('grade_thresholds', grade_thresholds), ('sgpa_thresholds', sgpa_thresholds)):
+            if any(low >= high for low, high in zip(thresholds, thresholds[1:])):
+                raise ValueError(f"{name} must be strictly increasing")
+        if len(grade_points) != len(grade_thresholds) + 1:
+            raise ValueError("grade_points needs one more entry than grade_thresholds")
+        if len(sgpa_grades) != len(sgpa_thresholds) + 1:
+            raise ValueError("sgpa_grades needs one more entry than sgpa_thresholds")
+        # CGPA credits tables store integer grade points
+        if any(point != int(point) or point < 0 for point in grade_points):
+            raise ValueError("grade_points must be whole numbers of at least 0")
+        if fail_mark < 0:
+            raise ValueError("fail_mark must be at least 0")
+        return cls(grade_thresholds, [int(point) for point in grade_points], sgpa_thresholds, sgpa_grades,
+                   fail_mark)
+
+    def to_dict(self):
+        return {
+            'grade_thresholds': [_number(value) for value in self.grade_thresholds.tolist()],
+            'grade_points': self.grade_points.tolist(),
+            'sgpa_thresholds': [_number(value) for value in self.sgpa_thresholds.tolist()],
+            'sgpa_grades': self.sgpa_grades.tolist(),
+            'fail_mark': _number(self.fail_mark)
+        }
+
+    def subject_grade_points(self, marks):
+        """Grade points of a marks array of any shape; missing marks earn 0."""
+        marks = np.asarray(marks, dtype=float)
+        grade_points = self.grade_points[np.searchsorted(self.grade_thresholds, marks, side='right')]
+        return np.where(np.isnan(marks), 0, grade_points)
+
+    def grade(self, marks, credits):
+        """
+        Grade a students x subjects marks matrix with one credits entry per subject.
+
+        Returns:
+            dict of arrays aligned with the students: sgpa, result ('Pass' or
+            'Fail'), overall_grade, grade_points (credit-weighted total) and
+            backlogs (subjects below the fail mark)
+        """
+        marks = np.asarray(marks, dtype=float)
+        credits = np.asarray(credits, dtype=np.int64)
+        students = len(marks)
+        grade_points = self.subject_grade_points(marks)
+        total_credits = int(credits.sum())
+        below_fail = marks < self.fail_mark
+        failed = below_fail.any(axis=1)
+        weighted = grade_points @ credits
+
+        if students and total_credits > 0 and not failed.all():
+            ratios, inverse = np.unique(weighted / total_credits, return_inverse=True)
+            # Python's round on the few distinct ratios keeps results identical to round()
+            sgpa = np.array([round(ratio, 2) for ratio in ratios.tolist()])[inverse.reshape(-1)]
+            sgpa[failed] = 0
+            overall_grade = self.sgpa_grades[np.searchsorted(self.sgpa_thresholds, sgpa, side='right')]
+        else:
+            sgpa = np.zeros(students, dtype=np.int64)
+            overall_grade = np.full(students, self.sgpa_grades[0], dtype=object)
+        overall_grade[failed] = self.sgpa_grades[0]  # Always the lowest grade if any subject is failed
+
+        return {
+            'sgpa': sgpa,
+            'result': np.where(failed, 'Fail', 'Pass').astype(object),
+            'overall_grade': overall_grade,
+            'grade_points': weighted,
+            'backlogs': below_fail.sum(axis=1)
+        }
+
+
+def _number(value):
+    """Whole floats as ints, so stored definitions read like the ones teachers write."""
+    return int(value) if float(value).is_integer() else value
+
+
+# The policy uploads used before schemes were configurable
+DEFAULT_SCHEME = GradingScheme(
+    grade_thresholds=[40, 50, 60, 70, 80, 90],
+    grade_points=[0, 5, 6, 7, 8, 9, 10],
+    sgpa_thresholds=[4.0, 5.0, 6.0, 7.0, 8.0, 9.0],
+    sgpa_grades=['F', 'C', 'C+', 'B', 'B+', 'A', 'A+'],
+    fail_mark=28
+)
+
+
+def create_grading_table(cursor):
+    """Create grading_schemes; commits implicitly, so call it before any data writes."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS grading_schemes (
+            semester VARCHAR(10) PRIMARY KEY,
+            definition TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def read_scheme(cursor, semester):
+    """The scheme stored for semester, or DEFAULT_SCHEME if it has none."""
+    cursor.execute("SELECT definition FROM grading_schemes WHERE semester = %s", (str(semester),))
+    row = cursor.fetchone()
+    return GradingScheme.from_dict(json.loads(row[0])) if row else DEFAULT_SCHEME
+
+
+def save_scheme(cursor, semester, scheme):
+    """Store scheme for semester inside the caller's transaction."""
+    cursor.execute("""
+        INSERT INTO grading_schemes (semester, definition) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE definition = VALUES(definition)
+    """, (str(semester), json.dumps(scheme.to_dict())))
+
+
+def get_scheme(mysql, semester):
+    """The grading scheme of a semester; DEFAULT_SCHEME until one is stored."""
+    cursor = mysql.connection.cursor()
+    try:
+        return read_scheme(cursor, semester)
+    except MySQLdb.Error as e:
+        # grading_schemes is created when the first scheme is saved
+        if e.args and e.args[0] == ER_NO_SUCH_TABLE:
+            return DEFAULT_SCHEME
+        raise
+    finally:
+        cursor.close()
+
+
+def stored_marks(df, subjects):
+    """
+    Credits and marks matrix of the credited subjects of a sem_N frame.
+
+    Args:
+        df: Rows of sem_N
+        subjects: Catalog subjects of the semester (see catalog.subject_columns)
+
+    Returns:
+        (credits, marks): credits per subject and the students x subjects marks
+    """
+    credited = [subject for subject in subjects if subject['credits'] is not None]
+    credits = np.array([subject['credits'] for subject in credited], dtype=np.int64)
+    marks = np.empty((len(df), len(credited)))
+    for j, subject in enumerate(credited):
+        marks[:, j] = df[subject['column'].lower()].to_numpy(dtype=float, na_value=np.nan)
+    return credits, marks
+
+
+def outcomes(graded):
+    """Pass/fail counts, average SGPA and grade and SGPA distributions of a grade() result."""
+    sgpa = np.asarray(graded['sgpa'], dtype=float)
+    students = len(sgpa)
+    passed = int((graded['result'] == 'Pass').sum())
+    return {
+        'total_students': students,
+        'passed_students': passed,
+        'failed_students': students - passed,
+        'pass_percentage': round(passed * 100.0 / students, 2) if students else 0.0,
+        'average_sgpa': round(float(sgpa.mean()), 2) if students else 0.0,
+        'grade_distribution': dict(sorted(Counter(graded['overall_grade'].tolist()).items())),
+        'sgpa_distribution': {
+            band: int(((sgpa >= low) & (sgpa <= high)).sum())
+            for band, low, high in SGPA_BANDS
+        }
+    }
+
+
+def compare_outcomes(baseline, proposed):
+    """
+    What changes for the same students between two grade() results.
+
+    Returns:
+        dict with the outcomes() of both, how many students change SGPA,
+        grade and result, and the grade transitions as {from: {to: count}}
+    """
+    baseline_sgpa = np.asarray(baseline['sgpa'], dtype=float)
+    proposed_sgpa = np.asarray(proposed['sgpa'], dtype=float)
+    grade_changed = baseline['overall_grade'] != proposed['overall_grade']
+    baseline_passed = baseline['result'] == 'Pass'
+    proposed_passed = proposed['result'] == 'Pass'
+
+    transitions = {}
+    pairs = Counter(zip(baseline['overall_grade'][grade_changed].tolist(),
+                        proposed['overall_grade'][grade_changed].tolist()))
+    for (before, after), count in sorted(pairs.items()):
+        transitions.setdefault(before, {})[after] = count
+
+    return {
+        'baseline': outcomes(baseline),
+        'proposed': outcomes(proposed),
+        'sgpa_changed': int((baseline_sgpa != proposed_sgpa).sum()),
+        'average_sgpa_change': round(float((proposed_sgpa - baseline_sgpa).mean()), 2) if len(baseline_sgpa) else 0.0,
+        'grade_changed': int(grade_changed.sum()),
+        'newly_failed': int((baseline_passed & ~proposed_passed).sum()),
+        'newly_passed': int((~baseline_passed & proposed_passed).sum()),
+        'grade_transitions': transitions
+    }
+
+
+def concat_graded(results):
+    """Join the grade() results of several semesters (at least one) into one."""
+    return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import threading
+from flask import current_app, make_response, request
+from jinja2 import meta
+
+try:
+    import brotli
+except ImportError:  # Optional: without it responses are gzip-compressed only
+    brotli = None
+
+COMPRESSIBLE_TYPES = {'text/html', 'application/json'}
+
+_template_digests = {}
+_template_lock = threading.Lock()
+
+
+def init_app(app):
+    """Compress HTML and JSON responses larger than COMPRESS_MIN_SIZE bytes."""
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_GZIP_LEVEL', 6)
+    # Brotli quality 11 is meant for static assets; 4-5 beats gzip -6 at similar CPU
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+    app.after_request(compress_response)
+
+
+def page_etag(template, *parts):
+    """
+    ETag of a response rendered from template (None for JSON) out of the data identified by parts.
+
+    The template source, with the templates it extends or includes, is part
+    of the tag, so a deploy that changes the page or its layout invalidates
+    copies rendered by the old templates.
+    """
+    key = repr((template_digest(template) if template else None,) + parts)
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def template_digest(name):
+    """
+    Digest of a template's source and of every template it extends, includes
+    or imports, computed once per process (on every call in debug mode).
+
+    Templates named by an expression cannot be followed; only literal names are.
+    """
+    digest = _template_digests.get(name)
+    if digest is None or current_app.debug:
+        env = current_app.jinja_env
+        md5 = hashlib.md5()
+        for template, source in sorted(_template_sources(env, name).items()):
+            md5.update(f"{template}\0{source}\0".encode())
+        digest = md5.hexdigest()[:12]
+        with _template_lock:
+            _template_digests[name] = digest
+    return digest
+
+
+def _template_sources(env, name):
+    """Source of template name and of the templates it references, transitively, by name."""
+    sources = {}
+    pending = [name]
+    while pending:
+        template = pending.pop()
+        if template in sources:
+            continue
+        source = env.loader.get_source(env, template)[0]
+        sources[template] = source
+        pending.extend(referenced for referenced in meta.find_referenced_templates(env.parse(source))
+                       if referenced is not None)
+    return sources
+
+
+def not_modified(etag, last_modified=None):
+    """
+    Return a 304 response if the client's copy is current, else None.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted
+    when the client sent no ETag. An etag of None (version unknown)
+    never matches.
+    """
+    if etag is None:
+        return None
+    if request.if_none_match:
+        matched = request.if_none_match.contains_weak(etag)
+    elif last_modified is not None and request.if_modified_since is not None:
+        matched = last_modified.replace(microsecond=0) <= request.if_modified_since
+    else:
+        matched = False
+    if not matched:
+        return None
+    return with_validators(current_app.response_class(status=304), etag, last_modified)
+
+
+def with_validators(response, etag, last_modified=None):
+    """Attach ETag/Last-Modified and make clients revalidate before reusing the response."""
+    response = make_response(response)
+    if etag is None:
+        return response
+    # Weak: the compressed and identity bodies are both valid for the tag
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Pages are per-session, so shared caches must not store them
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+
+def compress_response(response):
+    if (response.direct_passthrough or response.is_streamed or response.status_code in (204, 206, 304)
+            or response.status_code < 200 or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+
+    data = response.get_data()
+    config = current_app.config
+    if len(data) < config['COMPRESS_MIN_SIZE']:
+        return response
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding == 'br':
+        data = brotli.compress(data, quality=config['COMPRESS_BROTLI_QUALITY'])
+    elif encoding == 'gzip':
+        data = gzip.compress(data, compresslevel=config['COMPRESS_GZIP_LEVEL'], mtime=0)
+    else:
+        return response
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def choose_encoding(accept_encodings):
+    """'br' or 'gzip' as accepted by the client, preferring brotli when installed."""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
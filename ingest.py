@@ -0,0 +1,51 @@
+from itertools import islice
+from openpyxl import load_workbook
+import pandas as pd
+
+
+def iter_excel_chunks(file, chunk_size=5000, filename=None):
+    """Yield the first sheet of a workbook as DataFrames of at most chunk_size rows.
+
+    .xlsx workbooks are read row by row in openpyxl's read-only mode straight
+    from file (a path or a file-like object such as an upload stream), so
+    memory stays proportional to chunk_size. Legacy .xls files cannot be
+    streamed and are read whole with pandas, then sliced.
+
+    The header row gives the column names (blank headers become
+    'Unnamed: <i>' as with pd.read_excel) and fully blank rows are skipped.
+    At least one DataFrame, possibly empty, is yielded when the sheet has a
+    header row.
+    """
+    name = filename if filename is not None else str(file)
+    if name.lower().endswith('.xls'):
+        df = pd.read_excel(file)
+        for start in range(0, max(len(df), 1), chunk_size):
+            yield df.iloc[start:start + chunk_size].reset_index(drop=True)
+        return
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [value if value is not None else f'Unnamed: {i}' for i, value in enumerate(header)]
+
+        rows = (row for row in rows if any(value is not None for value in row))
+        yielded = False
+        while True:
+            chunk = [_fit_row(row, len(columns)) for row in islice(rows, chunk_size)]
+            if not chunk and yielded:
+                break
+            yield pd.DataFrame(chunk, columns=columns)
+            yielded = True
+            if len(chunk) < chunk_size:
+                break
+    finally:
+        workbook.close()
+
+
+def _fit_row(row, width):
+    """Trim or pad a worksheet row to the header width."""
+    row = tuple(row[:width])
+    return row + (None,) * (width - len(row))
@@ -0,0 +1,143 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Job:
+    """Status of one background upload, as reported by /jobs/<job_id>."""
+
+    def __init__(self, kind, semester):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.semester = semester
+        self.status = 'queued'
+        self.phase = 'queued'
+        self.rows_processed = 0
+        self.errors = []
+        self.message = None
+        self.redirect = None
+        self.phase_timings = {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._phase_started = time.perf_counter()
+
+    def update(self, phase, rows_processed=None):
+        """Progress callback handed to the loaders."""
+        if phase != self.phase:
+            self._end_phase()
+            self.phase = phase
+        if rows_processed is not None:
+            self.rows_processed = rows_processed
+
+    def _end_phase(self):
+        """Add the time spent in the current phase to phase_timings."""
+        now = time.perf_counter()
+        if self._phase_started is not None:
+            elapsed = now - self._phase_started
+            self.phase_timings[self.phase] = round(self.phase_timings.get(self.phase, 0) + elapsed, 4)
+        self._phase_started = now
+
+    def succeed(self, message, redirect=None):
+        self._end_phase()
+        self.message = message
+        self.redirect = redirect
+        self.phase = 'done'
+        self.status = 'succeeded'
+
+    def fail(self, message):
+        self._end_phase()
+        self.errors.append(message)
+        self.message = message
+        self.status = 'failed'
+
+    @property
+    def finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'semester': self.semester,
+            'status': self.status,
+            'phase': self.phase,
+            'rows_processed': self.rows_processed,
+            'errors': list(self.errors),
+            'phase_timings': dict(self.phase_timings),
+            'message': self.message,
+            'redirect': self.redirect if self.status == 'succeeded' else None,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at
+        }
+
+
+class JobQueue:
+    """Bounded in-process worker pool for uploads; no external broker needed.
+
+    At most max_workers jobs run at once and at most max_pending may be
+    queued or running; submit returns None when the queue is full. Finished
+    jobs are kept for polling until max_finished newer jobs have completed.
+    The pool is created on first use, so it is safe with pre-fork servers.
+    """
+
+    def __init__(self, max_workers=2, max_pending=16, max_finished=200):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self._executor = None
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def configure(self, max_workers=None, max_pending=None, max_finished=None):
+        with self._lock:
+            if max_workers is not None:
+                self.max_workers = max_workers
+            if max_pending is not None:
+                self.max_pending = max_pending
+            if max_finished is not None:
+                self.max_finished = max_finished
+
+    def submit(self, app, kind, semester, func, *args):
+        """Queue func(job, *args) to run inside an app context of app."""
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            if pending >= self.max_pending:
+                return None
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='upload-job')
+            job = Job(kind, semester)
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, app, job, func, args)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, app, job, func, args):
+        job.status = 'running'
+        job.started_at = time.time()
+        job.update('running')
+        try:
+            with app.app_context():
+                func(job, *args)
+            if not job.finished:
+                job.succeed('Done')
+        except Exception as e:
+            job.fail(f'Error processing file: {str(e)}')
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(len(finished) - self.max_finished, 0)]:
+            del self._jobs[job_id]
+
+
+upload_jobs = JobQueue()
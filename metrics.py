@@ -0,0 +1,260 @@
+import bisect
+import hmac
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from flask import Response, g, has_app_context, request
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the statements-per-request histogram buckets
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250)
+
+# Literals and numeric suffixes are stripped so `sem_3 WHERE usn = 'X'` repeats as one shape
+_STRING_LITERAL = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER = re.compile(r'\b\d+\b|(?<=_)\d+\b')
+_WHITESPACE = re.compile(r'\s+')
+_IN_LIST = re.compile(r'\bIN\s*\([^)]*\)', re.IGNORECASE)
+
+slow_query_log = logging.getLogger('slow_query')
+n_plus_one_log = logging.getLogger('n_plus_one')
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in the Prometheus model."""
+
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            label_text = _format_labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {cumulative}")
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = Counter()
+
+    def inc(self, labels, amount=1):
+        self._values[labels] += amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{{{_format_labels(self.label_names, labels)}}} {value}")
+        return lines
+
+
+class Metrics:
+    """Request and SQL metrics of one process, rendered in Prometheus text format.
+
+    init_app adds before/after request hooks that time every request and
+    a /metrics endpoint. InstrumentedConnection times every statement and
+    attributes it to the request whose cursor ran it (or to 'background'
+    outside one). A statement slower than SLOW_QUERY_MS is logged to the
+    'slow_query' logger. A request that runs the same statement shape
+    N_PLUS_ONE_THRESHOLD or more times is counted as an N+1 pattern and
+    logged to the 'n_plus_one' logger.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.slow_query_seconds = 0.2
+        self.n_plus_one_threshold = 5
+        self.token = None
+        self.gauges = []
+        self.request_duration = Histogram(
+            'http_request_duration_seconds', 'Request latency by endpoint.',
+            ('method', 'endpoint', 'status'), LATENCY_BUCKETS)
+        self.sql_duration = Histogram(
+            'sql_statement_duration_seconds', 'SQL statement latency by endpoint and verb.',
+            ('endpoint', 'verb'), LATENCY_BUCKETS)
+        self.sql_per_request = Histogram(
+            'sql_statements_per_request', 'SQL statements issued by one request.',
+            ('endpoint',), QUERY_COUNT_BUCKETS)
+        self.slow_statements = CounterMetric(
+            'sql_slow_statements_total', 'Statements slower than the slow query threshold.', ('endpoint',))
+        self.n_plus_one = CounterMetric(
+            'sql_n_plus_one_total', 'Requests that repeated one statement shape N_PLUS_ONE_THRESHOLD times.',
+            ('endpoint',))
+
+    def init_app(self, app):
+        app.config.setdefault('SLOW_QUERY_MS', 200)
+        app.config.setdefault('N_PLUS_ONE_THRESHOLD', 5)
+        self.slow_query_seconds = app.config['SLOW_QUERY_MS'] / 1000
+        self.n_plus_one_threshold = app.config['N_PLUS_ONE_THRESHOLD']
+        app.config.setdefault('METRICS_ENABLED', False)
+        app.config.setdefault('METRICS_TOKEN', None)
+        self.token = app.config['METRICS_TOKEN']
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        # Timings and the slow query log are always on; only the scrape endpoint is opt-in
+        if app.config['METRICS_ENABLED']:
+            app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+
+    def add_gauges(self, collect):
+        """Register collect() -> [(name, help, value)] to be reported as gauges on every scrape."""
+        self.gauges.append(collect)
+
+    def record_statements(self, endpoint, statements):
+        """Record (query, seconds) pairs run on behalf of endpoint."""
+        slow = [(query, seconds) for query, seconds in statements if seconds >= self.slow_query_seconds]
+        with self._lock:
+            for query, seconds in statements:
+                self.sql_duration.observe((endpoint, statement_verb(query)), seconds)
+            if slow:
+                self.slow_statements.inc((endpoint,), len(slow))
+        for query, seconds in slow:
+            slow_query_log.warning("%.1f ms [%s] %s", seconds * 1000, endpoint, _WHITESPACE.sub(' ', query).strip())
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for metric in (self.request_duration, self.sql_duration, self.sql_per_request,
+                           self.slow_statements, self.n_plus_one):
+                lines.extend(metric.render())
+        for collect in self.gauges:
+            for name, help_text, value in collect():
+                if value is None:
+                    continue
+                lines.extend([f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"])
+        return '\n'.join(lines) + '\n'
+
+    def _before_request(self):
+        g.request_started = time.perf_counter()
+        g.sql_statements = []
+
+    def _after_request(self, response):
+        started = g.pop('request_started', None)
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        endpoint = request.endpoint or 'unknown'
+        # Statements run after this point (e.g. by a streamed body) are not attributed
+        statements = g.pop('sql_statements')
+        shapes = Counter(statement_shape(query) for query, _ in statements)
+        repeated = [(shape, count) for shape, count in shapes.items() if count >= self.n_plus_one_threshold]
+
+        self.record_statements(endpoint, statements)
+        with self._lock:
+            self.request_duration.observe((request.method, endpoint, str(response.status_code)), elapsed)
+            self.sql_per_request.observe((endpoint,), len(statements))
+            if repeated:
+                self.n_plus_one.inc((endpoint,))
+        for shape, count in repeated:
+            n_plus_one_log.warning("%s ran %d times in one request: %s", endpoint, count, shape)
+        return response
+
+    def _metrics_view(self):
+        if self.token and not hmac.compare_digest(request.headers.get('Authorization', ''),
+                                                  f"Bearer {self.token}"):
+            return Response('Unauthorized\n', status=401, mimetype='text/plain',
+                            headers={'WWW-Authenticate': 'Bearer'})
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
+
+
+class InstrumentedCursor:
+    """Cursor proxy that times every execute/executemany.
+
+    Inside a request the (query, seconds) pairs are appended to the
+    request's list and recorded once in after_request, so a statement
+    costs two clock reads and an append. Elsewhere they are recorded
+    immediately under the 'background' endpoint.
+    """
+
+    def __init__(self, cursor, metrics, statements=None):
+        self._cursor = cursor
+        self._metrics = metrics
+        self._statements = statements
+
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(query, args)
+        finally:
+            self._record(query, time.perf_counter() - started)
+
+    def executemany(self, query, args):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(query, args)
+        finally:
+            self._record(query, time.perf_counter() - started)
+
+    def _record(self, query, seconds):
+        if self._statements is not None:
+            self._statements.append((query, seconds))
+        else:
+            self._metrics.record_statements('background', [(query, seconds)])
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class InstrumentedConnection:
+    """Connection proxy whose cursors are InstrumentedCursors."""
+
+    def __init__(self, connection, metrics):
+        self._connection = connection
+        self._metrics = metrics
+
+    def cursor(self, *args, **kwargs):
+        statements = g.get('sql_statements') if has_app_context() else None
+        return InstrumentedCursor(self._connection.cursor(*args, **kwargs), self._metrics, statements)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+@lru_cache(maxsize=1024)
+def statement_verb(query):
+    words = query.split(None, 1)
+    return words[0].upper() if words else 'UNKNOWN'
+
+
+@lru_cache(maxsize=1024)
+def statement_shape(query):
+    """Normalize a statement so repeats that differ only in literals or table numbers compare equal."""
+    shape = _STRING_LITERAL.sub('?', query)
+    shape = _IN_LIST.sub('IN (...)', shape)
+    shape = _NUMBER.sub('N', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+def _format_labels(names, values):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+metrics = Metrics()
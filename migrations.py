@@ -0,0 +1,214 @@
+from collections import Counter
+from utils import SEMESTER_INDEXES
+from analysis import STANDARD_COLUMNS
+from attendance import AttendanceAnalyzer, legacy_date_columns
+from bulk_loader import BulkLoader
+from cache import bump_data_version
+from catalog import (ATTENDANCE, ATTENDANCE_TABLE, PERFORMANCE, SEMESTER_TABLE, create_catalog_table,
+                     record_upload, semester_catalog, subject_columns)
+
+# Indexes of attendance_sem_N roster tables created before usn was indexed
+ATTENDANCE_INDEXES = [
+    ('uk_usn', 'UNIQUE KEY uk_usn (usn)'),
+]
+
+DUPLICATE_ENTRY = 1062
+
+
+def add_usn_indexes(mysql):
+    """
+    Add the usn/sgpa/result indexes to semester and attendance tables that lack them.
+
+    A unique usn index that fails because a table already holds duplicate
+    USNs is added as a plain index instead.
+
+    Returns:
+        List of (table_name, index_name, status) tuples
+    """
+    cursor = mysql.connection.cursor()
+    report = []
+
+    try:
+        cursor.execute("SHOW TABLES")
+        tables = [row[0] for row in cursor.fetchall()]
+
+        for table_name in tables:
+            if SEMESTER_TABLE.fullmatch(table_name):
+                indexes = SEMESTER_INDEXES
+            elif ATTENDANCE_TABLE.fullmatch(table_name):
+                indexes = ATTENDANCE_INDEXES
+            else:
+                continue
+
+            cursor.execute(f"SHOW INDEX FROM {table_name}")
+            existing = {row[2] for row in cursor.fetchall()}  # Key_name column
+
+            for index_name, index_sql in indexes:
+                fallback_name = index_name.replace('uk_', 'idx_')
+                if index_name in existing or fallback_name in existing:
+                    report.append((table_name, index_name, 'exists'))
+                    continue
+                try:
+                    cursor.execute(f"ALTER TABLE {table_name} ADD {index_sql}")
+                    report.append((table_name, index_name, 'added'))
+                except Exception as e:
+                    if index_sql.startswith('UNIQUE') and e.args and e.args[0] == DUPLICATE_ENTRY:
+                        cursor.execute(f"ALTER TABLE {table_name} ADD KEY {fallback_name} (usn)")
+                        report.append((table_name, fallback_name, 'added (duplicate USNs, not unique)'))
+                    else:
+                        report.append((table_name, index_name, f'failed: {str(e)}'))
+
+        return report
+    finally:
+        cursor.close()
+
+
+def build_catalog(mysql):
+    """
+    Add catalog rows for semester and attendance tables uploaded before the catalog existed.
+
+    Credits are not stored in sem_N, so backfilled subjects have credits None.
+
+    Returns:
+        List of (semester, kind, status) tuples
+    """
+    cursor = mysql.connection.cursor()
+    report = []
+
+    try:
+        create_catalog_table(cursor)
+        cursor.execute("SELECT semester, kind FROM semester_catalog")
+        cataloged = set(cursor.fetchall())
+        cursor.execute("SHOW TABLES")
+        tables = [row[0] for row in cursor.fetchall()]
+
+        for table_name in tables:
+            if SEMESTER_TABLE.fullmatch(table_name) and not table_name.endswith('_prev'):
+                semester, kind = table_name[len('sem_'):], PERFORMANCE
+            elif ATTENDANCE_TABLE.fullmatch(table_name):
+                semester, kind = table_name[len('attendance_sem_'):], ATTENDANCE
+            else:
+                continue
+            if (semester, kind) in cataloged:
+                report.append((semester, kind, 'exists'))
+                continue
+
+            subjects = None
+            if kind == PERFORMANCE:
+                cursor.execute(f"SHOW COLUMNS FROM {table_name}")
+                subjects = subject_columns([row[0] for row in cursor.fetchall()
+                                            if row[0] not in STANDARD_COLUMNS])
+            record_upload(cursor, semester, kind, table_name, subjects)
+            report.append((semester, kind, 'added'))
+
+        mysql.connection.commit()
+        return report
+    finally:
+        cursor.close()
+        semester_catalog.invalidate()
+
+
+def migrate_attendance_tables(mysql, bulk_loader=None):
+    """
+    Move attendance_sem_N tables of the old one-column-per-date format to the long format.
+
+    Each legacy roster is rebuilt with one row per USN: the student keeps
+    the position of their first row and the name of their last, and for
+    every date the last non-blank mark wins. Marks already uploaded in the
+    long format since are newer and take precedence. Rows without a USN
+    are dropped. The rebuilt roster, _dates and _marks tables replace the
+    live ones in one RENAME TABLE; the replaced tables are kept as
+    attendance_sem_N_legacy*.
+
+    Returns:
+        List of (table_name, status) tuples
+    """
+    bulk_loader = bulk_loader or BulkLoader()
+    cursor = mysql.connection.cursor()
+    report = []
+
+    try:
+        cursor.execute("SHOW TABLES")
+        tables = {row[0] for row in cursor.fetchall()}
+
+        for table_name in sorted(table for table in tables if ATTENDANCE_TABLE.fullmatch(table)):
+            date_columns = legacy_date_columns(cursor, table_name)
+            if not date_columns:
+                report.append((table_name, 'long format'))
+                continue
+            if f"{table_name}_legacy" in tables:
+                report.append((table_name, f'failed: {table_name}_legacy already exists'))
+                continue
+            try:
+                report.append((table_name, _migrate_attendance_table(mysql, cursor, bulk_loader, table_name,
+                                                                     date_columns, tables)))
+            except Exception as e:
+                mysql.connection.rollback()
+                report.append((table_name, f'failed: {str(e)}'))
+
+        return report
+    finally:
+        cursor.close()
+        semester_catalog.invalidate()
+
+
+def _migrate_attendance_table(mysql, cursor, bulk_loader, table_name, date_columns, tables):
+    semester = table_name[len('attendance_sem_'):]
+    migrated = f"{table_name}_migrated"
+    suffixes = ('', '_dates', '_marks')
+
+    column_list = ', '.join(f'`{column}`' for column in date_columns)
+    cursor.execute(f"SELECT usn, student_name, {column_list} FROM {table_name} ORDER BY id")
+    students = {}
+    marks = {}
+    rows = dropped = 0
+    for usn, name, *statuses in cursor.fetchall():
+        rows += 1
+        if usn is None or not str(usn).strip():
+            dropped += 1
+            continue
+        students[usn] = name
+        for class_date, status in zip(date_columns, statuses):
+            if status is not None and str(status).strip():
+                marks[(usn, class_date)] = str(status).strip().upper()[:1]
+
+    # Dates and marks uploaded in the long format after the legacy columns
+    dates = list(date_columns)
+    if f"{table_name}_dates" in tables and f"{table_name}_marks" in tables:
+        cursor.execute(f"SELECT class_no, class_date FROM {table_name}_dates ORDER BY class_no")
+        class_dates = dict(cursor.fetchall())
+        known = set(dates)
+        dates.extend(class_date for class_date in class_dates.values() if class_date not in known)
+        cursor.execute(f"SELECT usn, class_no, status FROM {table_name}_marks")
+        marks.update(((usn, class_dates[class_no]), status) for usn, class_no, status in cursor.fetchall()
+                     if class_no in class_dates and status is not None)
+    class_numbers = {class_date: class_no for class_no, class_date in enumerate(dates, start=1)}
+    present = Counter(usn for (usn, _), status in marks.items() if status == 'P')
+
+    # DDL commits implicitly, so the new tables are created before any data writes
+    for suffix in suffixes:
+        cursor.execute(f"DROP TABLE IF EXISTS {migrated}{suffix}")
+    success, message = AttendanceAnalyzer(mysql).create_attendance_table(f"{semester}_migrated")
+    if not success:
+        raise RuntimeError(message)
+
+    bulk_loader.insert(cursor, migrated, ['usn', 'student_name', 'classes_present'],
+                       [(usn, name, present[usn]) for usn, name in students.items()])
+    bulk_loader.insert(cursor, f"{migrated}_dates", ['class_no', 'class_date'],
+                       [(class_no, class_date) for class_date, class_no in class_numbers.items()])
+    bulk_loader.insert(cursor, f"{migrated}_marks", ['usn', 'class_no', 'status'],
+                       [(usn, class_numbers[class_date], status) for (usn, class_date), status in marks.items()])
+    # Version and catalog first: RENAME TABLE commits them together with the rows above
+    bump_data_version(cursor, table_name)
+    record_upload(cursor, semester, ATTENDANCE, table_name, row_count=len(students))
+
+    renames = []
+    for suffix in suffixes:
+        if f"{table_name}{suffix}" in tables:
+            renames.append(f"{table_name}{suffix} TO {table_name}_legacy{suffix}")
+        renames.append(f"{migrated}{suffix} TO {table_name}{suffix}")
+    cursor.execute("RENAME TABLE " + ", ".join(renames))
+    mysql.connection.commit()
+
+    return (f"migrated {len(students)} students and {len(dates)} dates "
+            f"({rows - dropped - len(students)} duplicate rows merged, {dropped} rows without USN dropped)")
@@ -0,0 +1,154 @@
+import numpy as np
+import pandas as pd
+from analysis import STANDARD_COLUMNS
+
+# Metric of the overall SGPA rank; subject ranks use the sem_N column name
+SGPA_METRIC = 'sgpa'
+
+
+def rank_table_name(table_name):
+    """Name of the rank table that belongs to a sem_N table."""
+    return f"{table_name}_ranks"
+
+
+def competition_ranks(values):
+    """
+    Rank values from highest to lowest.
+
+    Tie rule: equal values share the best rank of their group and the next
+    value skips ahead ("1224" competition ranking). The percentile is the
+    percentage of ranked students scoring at or below the value, so the top
+    score is at the 100th percentile and tied students share a percentile.
+    NaN values are not ranked.
+
+    Returns:
+        (ranks, percentiles, ranked): float arrays aligned with values (NaN
+        where unranked) and the number of ranked values
+    """
+    values = np.asarray(values, dtype=float)
+    ranked_mask = ~np.isnan(values)
+    ordered = np.sort(values[ranked_mask])
+    ranked = len(ordered)
+
+    ranks = np.full(len(values), np.nan)
+    percentiles = np.full(len(values), np.nan)
+    if ranked:
+        # O(log n) per student: the sorted array gives how many score at or below
+        at_or_below = np.searchsorted(ordered, values[ranked_mask], side='right')
+        ranks[ranked_mask] = ranked - at_or_below + 1
+        percentiles[ranked_mask] = np.round(at_or_below * 100.0 / ranked, 2)
+    return ranks, percentiles, ranked
+
+
+def create_rank_table(cursor, table_name):
+    """Create an empty {table_name}_ranks table."""
+    rank_table = rank_table_name(table_name)
+    cursor.execute(f"DROP TABLE IF EXISTS {rank_table}")
+    cursor.execute(f"""
+        CREATE TABLE {rank_table} (
+            usn VARCHAR(20) NOT NULL,
+            metric VARCHAR(64) NOT NULL,
+            class_rank INT NOT NULL,
+            percentile DOUBLE NOT NULL,
+            ranked INT NOT NULL,
+            PRIMARY KEY (usn, metric)
+        )
+    """)
+
+
+def fetch_rank_scores(cursor, table_name):
+    """
+    usn and the ranked scores (sgpa and every subject) of table_name in id order.
+
+    Names, results and grades are not read, so this is the narrowest frame
+    write_rank_table accepts.
+    """
+    cursor.execute(f"SHOW COLUMNS FROM {table_name}")
+    metrics = [SGPA_METRIC] + [row[0] for row in cursor.fetchall() if row[0] not in STANDARD_COLUMNS]
+    cursor.execute(f"SELECT usn, {', '.join(f'`{metric}`' for metric in metrics)} FROM {table_name} ORDER BY id")
+    return pd.DataFrame(list(cursor.fetchall()), columns=['usn'] + metrics)
+
+
+def write_rank_table(cursor, table_name, df, bulk_loader):
+    """
+    Rank every student of table_name by SGPA and by each subject.
+
+    df holds the rows of table_name; the ranks are written inside the
+    caller's transaction with bulk_loader.
+    """
+    metrics = [SGPA_METRIC] + [col for col in df.columns if col not in STANDARD_COLUMNS]
+    usns = df['usn'].to_numpy(dtype=object)
+
+    rows = []
+    for metric in metrics:
+        values = df[metric].to_numpy(dtype=float)
+        ranks, percentiles, ranked = competition_ranks(values)
+        rows.extend(
+            (usns[i], metric, int(ranks[i]), float(percentiles[i]), ranked)
+            for i in np.flatnonzero(~np.isnan(ranks))
+            if usns[i] is not None
+        )
+
+    cursor.execute(f"DELETE FROM {rank_table_name(table_name)}")
+    bulk_loader.insert(cursor, rank_table_name(table_name),
+                       ['usn', 'metric', 'class_rank', 'percentile', 'ranked'], rows)
+
+
+def update_rank_table(cursor, table_name, old_df, new_df, bulk_loader):
+    """
+    Rewrite only the rank rows that a delta upload changed.
+
+    old_df holds the rows of table_name before the delta and new_df the
+    rows after it: the rows of old_df in the same positions, some of them
+    updated, followed by the students the delta added. A student's rank
+    moves only when a changed score crosses theirs, so the shift is
+    counted against the few changed scores instead of re-ranking the
+    class; when the number of ranked students changes, every percentile
+    does and the whole metric is rewritten. Students who lost a score are
+    deleted.
+
+    Returns:
+        The number of rank rows written or deleted
+    """
+    rank_table = rank_table_name(table_name)
+    metrics = [SGPA_METRIC] + [col for col in new_df.columns if col not in STANDARD_COLUMNS]
+    usns = new_df['usn'].to_numpy(dtype=object)
+    has_usn = np.array([usn is not None for usn in usns], dtype=bool)
+    old_count = len(old_df)
+
+    rows = []
+    removed = []
+    for metric in metrics:
+        values = new_df[metric].to_numpy(dtype=float)
+        old_values = np.full(len(new_df), np.nan)
+        if metric in old_df.columns:
+            old_values[:old_count] = old_df[metric].to_numpy(dtype=float)
+        is_ranked = ~np.isnan(values)
+        was_ranked = ~np.isnan(old_values)
+        touched = (values != old_values) & (is_ranked | was_ranked)
+        ranked = int(is_ranked.sum())
+
+        if ranked != int(was_ranked.sum()):
+            changed = is_ranked
+        else:
+            # Scores at or below each student, after minus before, counting only the changed scores
+            shift = (np.searchsorted(np.sort(values[touched & is_ranked]), values, side='right')
+                     - np.searchsorted(np.sort(old_values[touched & was_ranked]), values, side='right'))
+            changed = is_ranked & (touched | (shift != 0))
+        changed &= has_usn
+
+        at_or_below = np.searchsorted(np.sort(values[is_ranked]), values[changed], side='right')
+        rows.extend(zip(
+            usns[changed].tolist(),
+            [metric] * len(at_or_below),
+            (ranked - at_or_below + 1).tolist(),
+            np.round(at_or_below * 100.0 / ranked, 2).tolist(),
+            [ranked] * len(at_or_below)
+        ))
+        removed.extend((usn, metric) for usn in usns[was_ranked & ~is_ranked & has_usn].tolist())
+
+    if removed:
+        cursor.executemany(f"DELETE FROM {rank_table} WHERE usn = %s AND metric = %s", removed)
+    bulk_loader.insert(cursor, rank_table, ['usn', 'metric', 'class_rank', 'percentile', 'ranked'], rows,
+                       update_columns=['class_rank', 'percentile', 'ranked'])
+    return len(rows) + len(removed)
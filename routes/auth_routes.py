@@ -1,35 +1,38 @@
-from flask import Blueprint, render_template, request, redirect, session, flash, url_for, current_app, jsonify
+from flask import (Blueprint, render_template, request, redirect, session, flash, url_for, current_app, jsonify,
+                   Response, stream_with_context)
 import MySQLdb.cursors
-import pandas as pd
-import os
-from werkzeug.utils import secure_filename
+import io
+import json
 import re
-from utils import StudentPerformanceUtils
-from analysis import StudentAnalysis
-from student_analysis import StudentAnalyzer
-from attendance import AttendanceAnalyzer
-
+from werkzeug.local import LocalProxy
+from catalog import ATTENDANCE, PERFORMANCE, semester_catalog
+from cache import analysis_cache, get_data_version
+from bulk_loader import BulkLoader
+from db import mysql
+from jobs import upload_jobs
+from http_cache import not_modified, page_etag, with_validators
 
+# The analysis, upload and export modules pull in pandas, numpy and openpyxl, so
+# views import them when first called; sign-in and dashboards never load them.
 
 
 auth_bp = Blueprint('auth', __name__)
 ALLOWED_EXTENSIONS = {'xls', 'xlsx'}
 
-# Initialize MySQL and Bcrypt
-mysql = None
-bcrypt = None
-
-def init_mysql(app_mysql):
-    global mysql
-    mysql = app_mysql
-
-def init_bcrypt(app_bcrypt):
-    global bcrypt
-    bcrypt = app_bcrypt
+# The current app's Bcrypt (see create_app); mysql is its PooledMySQL
+bcrypt = LocalProxy(lambda: current_app.extensions['bcrypt'])
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def semester_validators(template, semester, kind, version, *parts):
+    """(etag, last_modified) of a response built from one semester upload at version; template is None for JSON."""
+    if version is None:
+        return None, None
+    entry = semester_catalog.get(mysql, semester, kind)
+    last_modified = entry['uploaded_at'] if entry and entry['data_version'] == version else None
+    return page_etag(template, kind, semester, version, *parts), last_modified
+
 @auth_bp.route('/signup', methods=['GET', 'POST'])
 def signup():
     if request.method == 'POST' and 'username' in request.form and 'password' in request.form and 'role' in request.form:
@@ -64,37 +67,21 @@ def signin():
         username = request.form['username']
         password = request.form['password']
 
-        print("🟡 [DEBUG] Username submitted:", username)
-        print("🟡 [DEBUG] Password submitted (plaintext):", password)
-
         cursor = mysql.connection.cursor(MySQLdb.cursors.DictCursor)
         cursor.execute('SELECT * FROM users WHERE username = %s', (username,))
         account = cursor.fetchone()
 
-        if account:
-            print("🟢 [DEBUG] Account found in DB:", account)
-            print("🟢 [DEBUG] Stored hashed password:", account['password'])
-
-            password_match = bcrypt.check_password_hash(account['password'], password)
-            print("🟢 [DEBUG] Password match result:", password_match)
-
-            if password_match:
-                session['loggedin'] = True
-                session['id'] = account['id']
-                session['username'] = account['username']
-                session['role'] = account['role']
-
-                print("✅ [DEBUG] Login successful. Role:", account['role'])
-
-                # Redirect based on stored role in database
-                if account['role'] == 'Student':
-                    return redirect(url_for('auth.student_dashboard'))
-                elif account['role'] == 'Teacher':
-                    return redirect(url_for('auth.teacher_dashboard'))
-            else:
-                print("❌ [DEBUG] Password incorrect")
-        else:
-            print("❌ [DEBUG] No account found for username:", username)
+        if account and bcrypt.check_password_hash(account['password'], password):
+            session['loggedin'] = True
+            session['id'] = account['id']
+            session['username'] = account['username']
+            session['role'] = account['role']
+
+            # Redirect based on stored role in database
+            if account['role'] == 'Student':
+                return redirect(url_for('auth.student_dashboard'))
+            elif account['role'] == 'Teacher':
+                return redirect(url_for('auth.teacher_dashboard'))
 
         msg = 'Incorrect username/password!'
         return render_template('signin.html', msg=msg)
@@ -128,6 +115,7 @@ def check_semester(semester):
     if 'loggedin' not in session or session.get('role') != 'Student':
         return jsonify({'status': 'error', 'message': 'Unauthorized access'})
     
+    from student_analysis import StudentAnalyzer
     analyzer = StudentAnalyzer(mysql)
     has_data = analyzer.check_semester_data(semester)
     return jsonify({'status': 'success', 'has_data': has_data})
@@ -138,22 +126,36 @@ def student_analysis(semester):
         flash("Please log in as a Student.")
         return redirect(url_for('auth.signin'))
 
+    usn = request.form.get('usn') if request.method == 'POST' else request.args.get('usn')
+    if usn is None:
+        return render_template('student_usn_form.html', semester=semester)
+    if not usn:
+        flash("Please enter your USN")
+        return redirect(url_for('auth.student_analysis', semester=semester))
     if request.method == 'POST':
-        usn = request.form.get('usn')
-        if not usn:
-            flash("Please enter your USN")
-            return redirect(url_for('auth.student_analysis', semester=semester))
+        # The report is served by GET so browsers can revalidate it and reload it safely
+        return redirect(url_for('auth.student_analysis', semester=semester, usn=usn))
 
-        analyzer = StudentAnalyzer(mysql)
-        student_data = analyzer.get_student_data(semester, usn)
+    version = get_data_version(mysql, f"sem_{semester}")
+    etag, last_modified = semester_validators('student_analysis.html', semester, PERFORMANCE, version, usn)
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
 
-        if not student_data:
-            flash("No data found for the given USN")
-            return redirect(url_for('auth.student_analysis', semester=semester))
+    from student_analysis import StudentAnalyzer
+    analyzer = StudentAnalyzer(mysql)
+    student_data = analysis_cache.get_or_compute(
+        ('student', semester, usn),
+        version,
+        lambda: analyzer.get_student_data(semester, usn)
+    )
 
-        return render_template('student_analysis.html', student_data=student_data)
+    if not student_data:
+        flash("No data found for the given USN")
+        return redirect(url_for('auth.student_analysis', semester=semester))
 
-    return render_template('student_usn_form.html', semester=semester)
+    return with_validators(render_template('student_analysis.html', student_data=student_data),
+                           etag, last_modified)
 
 @auth_bp.route('/analysis/<semester>')
 def analysis(semester):
@@ -161,15 +163,27 @@ def analysis(semester):
         flash("Please log in as a Teacher.")
         return redirect(url_for('auth.signin'))
     
+    # A client holding the page of the current upload gets a 304 without any analysis or rendering
+    version = get_data_version(mysql, f"sem_{semester}")
+    etag, last_modified = semester_validators('analysis.html', semester, PERFORMANCE, version)
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
+
+    from analysis import StudentAnalysis
     analyzer = StudentAnalysis(mysql)
-    analysis_data = analyzer.get_semester_analysis(semester)
-    print(analysis_data)
+    analysis_data = analysis_cache.get_or_compute(
+        ('analysis', semester),
+        version,
+        lambda: analyzer.get_semester_analysis(semester)
+    )
 
     if analysis_data:
         try:
-            return render_template('analysis.html', analysis=analysis_data, semester=semester)
-        except Exception as e:
-            print(f"Template rendering error: {str(e)}")
+            return with_validators(render_template('analysis.html', analysis=analysis_data, semester=semester),
+                                   etag, last_modified)
+        except Exception:
+            current_app.logger.exception("Error rendering the analysis of semester %s", semester)
             flash("Error rendering analysis template.")
             return redirect(url_for('auth.teacher_dashboard'))
     else:
@@ -187,49 +201,238 @@ def upload_file():
 
     file = request.files['file']
     semester = request.form['semester']
+    # 'replace' reloads the whole semester; 'delta' upserts corrected or late rows by USN
+    mode = request.form.get('mode', 'replace')
     
     if file.filename == '':
         return jsonify({'status': 'error', 'message': 'No file selected'})
+    if mode not in ('replace', 'delta'):
+        return jsonify({'status': 'error', 'message': 'Unknown upload mode'})
 
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        
-        try:
-            file.save(filepath)
-
-            df = pd.read_excel(filepath, engine='openpyxl')
-
-            utils = StudentPerformanceUtils(mysql)
-            df = utils.calculate_sgpa(df)
-
-            columns = [(col, 'FLOAT') if 'Marks' in col else (col, 'VARCHAR(100)') for col in df.columns]
-            success, table_name = utils.create_semester_table(semester, columns)
-            if not success:
-                return jsonify({'status': 'error', 'message': f'Error creating table: {table_name}'})
-            
-            success, message = utils.insert_semester_data(table_name, df)
-            if not success:
-                return jsonify({'status': 'error', 'message': f'Error inserting data: {message}'})
-
-            # Add a small delay to ensure data is committed
-            from time import sleep
-            sleep(1)
-            
-            return jsonify({
-                'status': 'success', 
-                'message': 'Data processed successfully!',
-                'redirect': url_for('auth.analysis', semester=semester)
-            })
-            
-        except Exception as e:
-            return jsonify({'status': 'error', 'message': f'Error processing file: {str(e)}'})
-        finally:
-            if os.path.exists(filepath):
-                os.remove(filepath)
+        # The workbook is parsed by a background worker; the request only buffers the upload
+        job = upload_jobs.submit(
+            current_app._get_current_object(), 'performance', semester, run_semester_upload,
+            io.BytesIO(file.read()), semester, file.filename,
+            url_for('auth.analysis', semester=semester), mode
+        )
+        return job_accepted(job)
                 
     return jsonify({'status': 'error', 'message': 'Allowed file types are xlsx, xls'})
 
+def run_semester_upload(job, stream, semester, filename, redirect_url, mode='replace'):
+    from utils import StudentPerformanceUtils
+    utils = StudentPerformanceUtils(mysql, BulkLoader.from_config(current_app.config))
+    if mode == 'delta':
+        success, message = utils.apply_semester_delta(stream, semester, filename=filename, progress=job.update)
+    else:
+        success, message = utils.load_semester_file(
+            stream, semester, current_app.config['INGEST_CHUNK_SIZE'], filename=filename, progress=job.update
+        )
+    if not success:
+        job.fail(message)
+        return
+    job.succeed('Corrections applied successfully!' if mode == 'delta' else 'Data processed successfully!',
+                redirect_url)
+
+def job_accepted(job):
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Too many uploads in progress, please try again shortly'})
+    return jsonify({
+        'status': 'accepted',
+        'message': 'Upload accepted',
+        'job_id': job.id,
+        'status_url': url_for('auth.job_status', job_id=job.id)
+    })
+
+@auth_bp.route('/rollback_semester/<semester>', methods=['POST'])
+def rollback_semester(semester):
+    if 'loggedin' not in session or session.get('role') != 'Teacher':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'})
+
+    from utils import StudentPerformanceUtils
+    utils = StudentPerformanceUtils(mysql)
+    success, message = utils.rollback_semester_table(semester)
+    if not success:
+        return jsonify({'status': 'error', 'message': message})
+    return jsonify({
+        'status': 'success',
+        'message': 'Previous semester data restored',
+        'redirect': url_for('auth.analysis', semester=semester)
+    })
+
+@auth_bp.route('/grading_scheme/<semester>')
+def grading_scheme(semester):
+    if 'loggedin' not in session or session.get('role') != 'Teacher':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'})
+
+    from grading import get_scheme
+    return jsonify({'status': 'success', 'semester': semester, 'scheme': get_scheme(mysql, semester).to_dict()})
+
+def grading_request():
+    """
+    (semesters, scheme, baseline) of a JSON re-grade or what-if request.
+
+    semester is a semester number or 'all'; scheme and baseline are
+    GradingScheme definitions and may be omitted (None).
+
+    Raises:
+        ValueError: with a message for the response
+    """
+    from grading import GradingScheme
+    data = request.get_json(silent=True) or {}
+    semester = str(data.get('semester') or '')
+    if not semester:
+        raise ValueError('Missing semester information')
+    if semester == 'all':
+        semesters = semester_catalog.semesters(mysql, PERFORMANCE)
+    elif semester_catalog.exists(mysql, semester, PERFORMANCE):
+        semesters = [semester]
+    else:
+        raise ValueError(f'No results uploaded for semester {semester}')
+    scheme = GradingScheme.from_dict(data['scheme']) if data.get('scheme') is not None else None
+    baseline = GradingScheme.from_dict(data['baseline']) if data.get('baseline') is not None else None
+    return semesters, scheme, baseline
+
+@auth_bp.route('/regrade', methods=['POST'])
+def regrade():
+    """Re-grade one semester or 'all' from the stored marks, saving the scheme if one is given."""
+    if 'loggedin' not in session or session.get('role') != 'Teacher':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'})
+
+    try:
+        semesters, scheme, _ = grading_request()
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+    if not semesters:
+        return jsonify({'status': 'error', 'message': 'No semesters to re-grade'})
+
+    redirect_url = url_for('auth.analysis', semester=semesters[0]) if len(semesters) == 1 else None
+    job = upload_jobs.submit(
+        current_app._get_current_object(), 'regrade', ','.join(semesters), run_regrade,
+        semesters, scheme, redirect_url
+    )
+    return job_accepted(job)
+
+def run_regrade(job, semesters, scheme, redirect_url):
+    from utils import StudentPerformanceUtils
+    utils = StudentPerformanceUtils(mysql, BulkLoader.from_config(current_app.config))
+    success, message = utils.regrade_semesters(semesters, scheme, progress=job.update)
+    if not success:
+        job.fail(message)
+        return
+    job.succeed(message, redirect_url)
+
+@auth_bp.route('/grading_what_if', methods=['POST'])
+def grading_what_if():
+    """Compare the outcomes of a scheme with the stored (or a baseline) scheme without writing."""
+    if 'loggedin' not in session or session.get('role') != 'Teacher':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'})
+
+    try:
+        semesters, scheme, baseline = grading_request()
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)})
+    if scheme is None:
+        return jsonify({'status': 'error', 'message': 'Missing grading scheme'})
+
+    from utils import StudentPerformanceUtils
+    comparison = StudentPerformanceUtils(mysql).compare_grading(semesters, scheme, baseline)
+    if comparison is None:
+        return jsonify({'status': 'error', 'message': 'No results to compare'})
+    return jsonify({'status': 'success', 'comparison': comparison})
+
+@auth_bp.route('/cgpa/<usn>')
+def student_cgpa(usn):
+    if 'loggedin' not in session or session.get('role') not in ('Student', 'Teacher'):
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'})
+
+    from cgpa import CGPAEngine
+    engine = CGPAEngine(mysql)
+    cgpa = analysis_cache.get_or_compute(
+        ('cgpa', usn),
+        get_data_version(mysql, 'cgpa_students'),
+        lambda: engine.get_student_cgpa(usn)
+    )
+    if not cgpa:
+        return jsonify({'status': 'error', 'message': 'No CGPA data found for the given USN'})
+    return jsonify({'status': 'success', 'cgpa': cgpa})
+
+@auth_bp.route('/class_cgpa')
+def class_cgpa():
+    if 'loggedin' not in session or session.get('role') != 'Teacher':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'})
+
+    semester = request.args.get('semester')
+    from cgpa import CGPAEngine
+    engine = CGPAEngine(mysql)
+    cgpa = analysis_cache.get_or_compute(
+        ('class_cgpa', semester),
+        get_data_version(mysql, 'cgpa_students'),
+        lambda: engine.get_class_cgpa(semester)
+    )
+    if cgpa is None:
+        return jsonify({'status': 'error', 'message': 'Error retrieving CGPA data'})
+    return jsonify({'status': 'success', 'cgpa': cgpa})
+
+@auth_bp.route('/jobs/<job_id>')
+def job_status(job_id):
+    if 'loggedin' not in session or session.get('role') != 'Teacher':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'})
+
+    job = upload_jobs.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Unknown job'}), 404
+    return jsonify({'status': 'success', 'job': job.to_dict()})
+
+@auth_bp.route('/cache_stats')
+def cache_stats():
+    if 'loggedin' not in session or session.get('role') != 'Teacher':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'})
+
+    return jsonify({'status': 'success', 'cache': analysis_cache.stats()})
+
+@auth_bp.route('/db_stats')
+def db_stats():
+    if 'loggedin' not in session or session.get('role') != 'Teacher':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'})
+
+    return jsonify({'status': 'success', 'pool': mysql.stats()})
+
+@auth_bp.route('/catalog')
+def catalog():
+    if 'loggedin' not in session or session.get('role') != 'Teacher':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'})
+
+    kind = request.args.get('type', PERFORMANCE)
+    return jsonify({
+        'status': 'success',
+        'semesters': [semester_catalog.get(mysql, semester, kind)
+                      for semester in semester_catalog.semesters(mysql, kind)]
+    })
+
+@auth_bp.route('/export/<semester>')
+def export(semester):
+    if 'loggedin' not in session or session.get('role') != 'Teacher':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'})
+
+    from export import EXPORT_FORMATS, EXPORT_KINDS, ParquetUnavailable, SemesterExporter
+    kind = request.args.get('kind', PERFORMANCE)
+    fmt = request.args.get('format', 'csv')
+    if kind not in EXPORT_KINDS or fmt not in EXPORT_FORMATS:
+        return jsonify({'status': 'error', 'message': 'Unsupported export kind or format'}), 400
+    if not semester_catalog.exists(mysql, semester, kind):
+        return jsonify({'status': 'error', 'message': 'No data for this semester'}), 404
+
+    try:
+        chunks = SemesterExporter(mysql).export(kind, semester, fmt)
+    except ParquetUnavailable as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+
+    filename = f"{kind}_sem_{semester}.{fmt}"
+    return Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
 @auth_bp.route('/teacher')
 def teacher():
     return render_template('teacher.html')
@@ -240,13 +443,65 @@ def attendance(semester):
         flash("Please log in as a Teacher.")
         return redirect(url_for('auth.signin'))
     
+    # Rows are loaded page by page from attendance_rows by the template, so the page
+    # itself only changes with the template and page size
+    page_size = current_app.config['ATTENDANCE_PAGE_SIZE']
+    etag = page_etag('attendance.html', semester, page_size)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    return with_validators(render_template(
+        'attendance.html', semester=semester,
+        rows_url=url_for('auth.attendance_rows', semester=semester),
+        page_size=page_size
+    ), etag)
+
+@auth_bp.route('/attendance/<semester>/rows')
+def attendance_rows(semester):
+    if 'loggedin' not in session or session.get('role') != 'Teacher':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'})
+
+    try:
+        limit = int(request.args.get('limit', current_app.config['ATTENDANCE_PAGE_SIZE']))
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'limit must be an integer'}), 400
+    from_date = request.args.get('from')
+    to_date = request.args.get('to')
+    from attendance import AttendanceAnalyzer
     analyzer = AttendanceAnalyzer(mysql)
-    attendance_data = analyzer.get_attendance_data(semester)
-    
-    if attendance_data:
-        return render_template('attendance.html', data=attendance_data, semester=semester)
-    else:
-        return render_template('attendance.html', data=None, semester=semester)
+
+    if request.args.get('stream'):
+        # NDJSON: a {"dates": [...]} line, then one line per student as it is fetched
+        rows = analyzer.iter_attendance_rows(semester, from_date, to_date)
+        try:
+            header = next(rows)
+        except ValueError:
+            return jsonify({'status': 'error', 'message': 'Unknown class date'}), 400
+        except MySQLdb.Error:
+            return jsonify({'status': 'error', 'message': 'No attendance data for this semester'}), 404
+
+        def generate():
+            yield json.dumps(header) + '\n'
+            for row in rows:
+                yield json.dumps(row) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    after = request.args.get('after')
+    version = get_data_version(mysql, f"attendance_sem_{semester}")
+    etag, last_modified = semester_validators(None, semester, ATTENDANCE, version,
+                                              after, limit, from_date, to_date)
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
+
+    try:
+        page = analyzer.get_attendance_page(semester, after, limit, from_date, to_date)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'Unknown class date'}), 400
+    if page is None:
+        return jsonify({'status': 'error', 'message': 'No attendance data for this semester'}), 404
+    return with_validators(jsonify({'status': 'success', **page}), etag, last_modified)
 
 @auth_bp.route('/upload_attendance', methods=['POST'])
 def upload_attendance():
@@ -263,39 +518,32 @@ def upload_attendance():
         return jsonify({'status': 'error', 'message': 'No file selected'})
 
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-        
-        try:
-            file.save(filepath)
-            analyzer = AttendanceAnalyzer(mysql)
-            success, message = analyzer.process_attendance_file(filepath, semester)
-            
-            if success:
-                return jsonify({
-                    'status': 'success', 
-                    'message': message,
-                    'redirect': url_for('auth.attendance', semester=semester)
-                })
-            else:
-                return jsonify({'status': 'error', 'message': message})
-            
-        except Exception as e:
-            return jsonify({'status': 'error', 'message': f'Error processing file: {str(e)}'})
-        finally:
-            if os.path.exists(filepath):
-                os.remove(filepath)
+        job = upload_jobs.submit(
+            current_app._get_current_object(), 'attendance', semester, run_attendance_upload,
+            io.BytesIO(file.read()), semester, file.filename,
+            url_for('auth.attendance', semester=semester)
+        )
+        return job_accepted(job)
                 
     return jsonify({'status': 'error', 'message': 'Allowed file types are xlsx, xls'})
 
+def run_attendance_upload(job, stream, semester, filename, redirect_url):
+    from attendance import AttendanceAnalyzer
+    analyzer = AttendanceAnalyzer(mysql, BulkLoader.from_config(current_app.config))
+    success, message = analyzer.process_attendance_file(
+        stream, semester, current_app.config['INGEST_CHUNK_SIZE'], filename=filename, progress=job.update
+    )
+    if not success:
+        job.fail(message)
+        return
+    job.succeed(message, redirect_url)
+
 @auth_bp.route('/check_attendance/<semester>')
 def check_attendance(semester):
     if 'loggedin' not in session or session.get('role') != 'Student':
         return jsonify({'status': 'error', 'message': 'Unauthorized access'})
     
-    analyzer = AttendanceAnalyzer(mysql)
-    data = analyzer.get_attendance_data(semester)
-    has_data = data is not None
+    has_data = semester_catalog.exists(mysql, semester, ATTENDANCE)
     return jsonify({'status': 'success', 'has_data': has_data})
 
 @auth_bp.route('/student_attendance/<semester>', methods=['GET', 'POST'])
@@ -310,6 +558,7 @@ def student_attendance(semester):
             flash("Please enter your USN")
             return redirect(url_for('auth.student_attendance', semester=semester))
 
+        from attendance import AttendanceAnalyzer
         analyzer = AttendanceAnalyzer(mysql)
         attendance_data = analyzer.get_attendance_data(semester, usn)
 
@@ -327,12 +576,7 @@ def check_teacher_semester(semester):
         return jsonify({'status': 'error', 'message': 'Unauthorized access'})
 
     table_type = request.args.get('type', 'performance')
-    table_name = f"sem_{semester}" if table_type == 'performance' else f"attendance_sem_{semester}"
-
-    cursor = mysql.connection.cursor()
-    cursor.execute(f"SHOW TABLES LIKE '{table_name}'")
-    has_data = cursor.fetchone() is not None
-    cursor.close()
+    has_data = semester_catalog.exists(mysql, semester, PERFORMANCE if table_type == 'performance' else ATTENDANCE)
 
     return jsonify({
         'status': 'success',
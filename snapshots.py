@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import threading
+import uuid
+
+
+class SnapshotStore:
+    """Immutable columnar snapshots of uploaded tables, one per data version.
+
+    A snapshot is a directory <root>/<table_name>/v<version>/ holding one
+    .npy file per array and a meta.json. Arrays are opened with
+    np.load(mmap_mode='r'), so every worker process shares the same pages
+    and numeric columns are used in place without parsing rows. MySQL
+    stays the system of record: snapshots are written after an upload
+    commits, under the data version that upload bumped, and rebuilt from
+    MySQL when missing. A reader only opens the snapshot of the current
+    data version, so it never sees data older than that version.
+
+    With root None (the default) the store is disabled: reads return None
+    and writes are ignored. numpy and pandas are imported on first use, so
+    configuring the store at startup does not load them.
+    """
+
+    def __init__(self, root=None, keep_versions=2):
+        self.root = root
+        self.keep_versions = keep_versions
+        self._lock = threading.Lock()
+
+    def configure(self, root=None, keep_versions=None):
+        with self._lock:
+            self.root = root
+            if keep_versions is not None:
+                self.keep_versions = keep_versions
+            if root and not os.path.exists(root):
+                os.makedirs(root)
+
+    @property
+    def enabled(self):
+        return bool(self.root)
+
+    def write(self, table_name, version, arrays, meta=None):
+        """
+        Write arrays (name -> ndarray) and meta as the snapshot of table_name at version.
+
+        The snapshot is staged in a temporary directory and renamed into
+        place, so readers never see a partial one. An existing snapshot of
+        the same version is kept as is.
+        """
+        if not self.enabled or version is None:
+            return
+        import numpy as np
+        table_dir = os.path.join(self.root, table_name)
+        path = self._path(table_name, version)
+        if os.path.exists(path):
+            return
+
+        tmp_path = os.path.join(table_dir, f".tmp-{uuid.uuid4().hex}")
+        try:
+            os.makedirs(tmp_path)
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_path, f"{name}.npy"), array, allow_pickle=False)
+            with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+                json.dump({**(meta or {}), 'version': version, 'arrays': list(arrays)}, f)
+            os.rename(tmp_path, path)
+        except OSError as e:
+            # Another worker may have published the same version first
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.exists(path):
+                print(f"Error writing snapshot of {table_name}: {str(e)}")
+            return
+        self._prune(table_name)
+
+    def read(self, table_name, version):
+        """Return (arrays, meta) of table_name at version, memory-mapped, or None if absent."""
+        if not self.enabled or version is None:
+            return None
+        import numpy as np
+        path = self._path(table_name, version)
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+            arrays = {
+                name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r', allow_pickle=False)
+                for name in meta['arrays']
+            }
+        except (OSError, ValueError) as e:
+            if os.path.exists(path):
+                print(f"Error reading snapshot of {table_name}: {str(e)}")
+            return None
+        return arrays, meta
+
+    def write_frame(self, table_name, version, df):
+        """Snapshot a DataFrame: numeric columns as-is, text columns as fixed-width unicode plus a NULL mask."""
+        import numpy as np
+        import pandas as pd
+        arrays = {}
+        columns = []
+        for i, column in enumerate(df.columns):
+            key = f"c{i}"
+            series = df[column]
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                arrays[key] = series.to_numpy(dtype=np.int64 if pd.api.types.is_integer_dtype(series) else float)
+            else:
+                nulls = series.isna().to_numpy()
+                arrays[key] = np.array(['' if null else str(value) for value, null in zip(series, nulls)], dtype=str)
+                arrays[f"{key}_null"] = nulls
+            columns.append(column)
+        self.write(table_name, version, arrays, {'columns': columns})
+
+    def read_frame(self, table_name, version):
+        """Rebuild the DataFrame written by write_frame, or None if there is no snapshot."""
+        snapshot = self.read(table_name, version)
+        if snapshot is None:
+            return None
+        import numpy as np
+        import pandas as pd
+        arrays, meta = snapshot
+        data = {}
+        for i, column in enumerate(meta['columns']):
+            values = arrays[f"c{i}"]
+            nulls = arrays.get(f"c{i}_null")
+            if nulls is not None:
+                values = np.where(nulls, None, values.astype(object))
+            data[column] = values
+        return pd.DataFrame(data, columns=meta['columns'])
+
+    def _path(self, table_name, version):
+        return os.path.join(self.root, table_name, f"v{int(version)}")
+
+    def _prune(self, table_name):
+        """Keep the keep_versions newest snapshots; open memory maps of removed ones stay valid."""
+        table_dir = os.path.join(self.root, table_name)
+        versions = sorted(
+            (int(name[1:]) for name in os.listdir(table_dir) if name.startswith('v') and name[1:].isdigit()),
+            reverse=True
+        )
+        for version in versions[self.keep_versions:]:
+            shutil.rmtree(self._path(table_name, version), ignore_errors=True)
+
+
+snapshot_store = SnapshotStore()
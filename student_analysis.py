@@ -1,24 +1,19 @@
-from flask_mysqldb import MySQL
 import MySQLdb.cursors
-import pandas as pd
-import plotly.express as px
-import json
+from catalog import PERFORMANCE, semester_catalog
+from ranks import SGPA_METRIC, rank_table_name
 
 class StudentAnalyzer:
     def __init__(self, mysql):
         self.mysql = mysql
 
     def check_semester_data(self, semester):
-        cursor = self.mysql.connection.cursor()
-        cursor.execute(f"SHOW TABLES LIKE 'sem_{semester}'")
-        result = cursor.fetchone() is not None
-        cursor.close()
-        return result
+        return semester_catalog.exists(self.mysql, semester, PERFORMANCE)
 
     def get_student_data(self, semester, usn):
         cursor = self.mysql.connection.cursor(MySQLdb.cursors.DictCursor)
         cursor.execute(f"SELECT * FROM sem_{semester} WHERE usn = %s", (usn,))
         data = cursor.fetchone()
+        ranks = self.get_student_ranks(cursor, semester, usn) if data else {}
         cursor.close()
         
         if not data:
@@ -27,6 +22,7 @@ class StudentAnalyzer:
         # Filter subject columns
         subject_data = {k.replace('_', ' ').title(): v for k, v in data.items() 
                        if k not in ['id', 'student_name', 'usn', 'sgpa', 'result', 'overall_grade']}
+        subject_ranks = {k.replace('_', ' ').title(): ranks[k] for k in data if k in ranks and k != SGPA_METRIC}
 
         return {
             'student_info': {
@@ -34,7 +30,30 @@ class StudentAnalyzer:
                 'usn': data['usn'],
                 'sgpa': data['sgpa'],
                 'result': data['result'],
-                'overall_grade': data['overall_grade']
+                'overall_grade': data['overall_grade'],
+                'rank': ranks.get(SGPA_METRIC)
             },
-            'subject_data': subject_data
+            'subject_data': subject_data,
+            'subject_ranks': subject_ranks
+        }
+
+    @staticmethod
+    def get_student_ranks(cursor, semester, usn):
+        """
+        Precomputed ranks of one student, as {metric: {'rank', 'percentile', 'out_of'}}.
+
+        One primary-key read of sem_N_ranks; see ranks.competition_ranks for
+        the tie rule. Semesters uploaded before ranks existed return {}.
+        """
+        try:
+            cursor.execute(f"""
+                SELECT metric, class_rank, percentile, ranked
+                FROM {rank_table_name(f'sem_{semester}')}
+                WHERE usn = %s
+            """, (usn,))
+        except MySQLdb.Error:
+            return {}
+        return {
+            row['metric']: {'rank': row['class_rank'], 'percentile': row['percentile'], 'out_of': row['ranked']}
+            for row in cursor.fetchall()
         }
\ No newline at end of file
@@ -0,0 +1,143 @@
+import io
+
+import pandas as pd
+import pytest
+from attendance import AttendanceAnalyzer
+from attendance_matrix import AttendanceMatrix
+from bulk_loader import BulkLoader
+
+
+class StoreCursor:
+    """Stand-in cursor over one attendance semester held in dicts.
+
+    Answers the statements process_attendance_file issues; everything
+    else (DDL, catalog writes) is accepted and ignored.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.result = []
+
+    def execute(self, query, args=None):
+        query = ' '.join(query.split())
+        store = self.store
+        if query.startswith('SHOW COLUMNS FROM attendance_sem_1 LIKE'):
+            self.result = [('classes_present',)]
+        elif query.startswith('SHOW COLUMNS FROM'):
+            self.result = [(column,) for column in ('id', 'usn', 'student_name', 'classes_present')]
+        elif query.startswith('SELECT class_date, class_no FROM'):
+            self.result = [(date, class_no) for class_no, date in store['dates'].items()]
+        elif query.startswith('SELECT usn, student_name FROM'):
+            self.result = [(usn, store['roster'][usn]) for usn in args if usn in store['roster']]
+        elif query.startswith('SELECT usn, class_no, status FROM'):
+            self.result = [(usn, class_no, status) for (usn, class_no), status in store['marks'].items()
+                           if usn in args and class_no in args]
+        elif query.startswith('INSERT INTO data_versions'):
+            store['version'] += 1
+        elif query.startswith('SELECT version FROM data_versions'):
+            self.result = [(store['version'],)]
+        elif query.startswith('SELECT COUNT(*) FROM'):
+            self.result = [(len(store['roster']),)]
+        else:
+            self.result = []
+
+    def fetchall(self):
+        return list(self.result)
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+    def close(self):
+        pass
+
+
+class StoreConnection:
+    def __init__(self, store):
+        self.store = store
+        self.committed = False
+        self.rolled_back = False
+
+    def cursor(self, *args):
+        return StoreCursor(self.store)
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+class StoreMySQL:
+    def __init__(self, store):
+        self.connection = StoreConnection(store)
+
+
+class MarksLoader(BulkLoader):
+    """BulkLoader that keeps the rows upserted into each table instead of writing them."""
+
+    def __init__(self):
+        super().__init__()
+        self.rows = {}
+
+    def insert(self, cursor, table_name, columns, rows, **kwargs):
+        rows = list(rows)
+        self.rows.setdefault(table_name, []).extend(rows)
+        return len(rows)
+
+
+def upload(store, sheet):
+    mysql, loader = StoreMySQL(store), MarksLoader()
+    workbook = io.BytesIO()
+    pd.DataFrame(sheet).to_excel(workbook, index=False, engine='openpyxl')
+    workbook.seek(0)
+    result = AttendanceAnalyzer(mysql, loader).process_attendance_file(workbook, 1, filename='sheet.xlsx')
+    return result, mysql.connection, loader
+
+
+def stored_semester(marks):
+    return {
+        'dates': {1: '2024-01-08', 2: '2024-01-09'},
+        'roster': {'1BM21CS0001': 'An Nguyen', '1BM21CS0002': 'Binh Tran'},
+        'marks': marks,
+        'version': 3
+    }
+
+
+def test_mark_change_that_keeps_presence_is_kept():
+    store = stored_semester({('1BM21CS0001', 1): 'P', ('1BM21CS0001', 2): 'A',
+                             ('1BM21CS0002', 1): 'P', ('1BM21CS0002', 2): 'P'})
+    (success, message), connection, loader = upload(store, {
+        'USN': ['1BM21CS0001', '1BM21CS0002'],
+        'Student Name': ['An Nguyen', 'Binh Tran'],
+        '2024-01-08': ['P', 'P'],
+        '2024-01-09': ['L', 'P'],
+    })
+
+    assert success and message == "Attendance data processed successfully"
+    assert connection.committed and not connection.rolled_back
+    assert loader.rows['attendance_sem_1_marks'] == [('1BM21CS0001', 2, 'L')]
+    assert store['version'] == 4
+
+
+def test_identical_sheet_rolls_back_without_bumping_the_version():
+    store = stored_semester({('1BM21CS0001', 1): 'P', ('1BM21CS0001', 2): 'A',
+                             ('1BM21CS0002', 1): 'P', ('1BM21CS0002', 2): 'P'})
+    (success, message), connection, loader = upload(store, {
+        'USN': ['1BM21CS0001', '1BM21CS0002'],
+        'Student Name': ['An Nguyen', 'Binh Tran'],
+        '2024-01-08': ['P', 'P'],
+        '2024-01-09': ['A', 'P'],
+    })
+
+    assert success and message == "Attendance is already up to date"
+    assert connection.rolled_back
+    assert loader.rows['attendance_sem_1_marks'] == []
+    assert store['version'] == 3
+
+
+def test_class_range_rejects_an_unknown_date():
+    matrix = AttendanceMatrix.from_present_marks([('1BM21CS0001', 'An Nguyen')], ['2024-01-08', '2024-01-09'],
+                                                 [('1BM21CS0001', 1)])
+    assert matrix.class_range('2024-01-09', '2024-01-09') == (1, 2)
+    with pytest.raises(ValueError, match='Unknown class date: 2024-02-30'):
+        matrix.class_range('2024-01-08', '2024-02-30')
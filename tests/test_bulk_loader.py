@@ -0,0 +1,59 @@
+import MySQLdb
+import pytest
+from bulk_loader import BulkLoader
+
+
+class UniqueKeyCursor:
+    """Stand-in cursor for a table with a unique first column.
+
+    executemany raises on a duplicate key like MySQL; LOAD DATA LOCAL
+    skips the duplicate rows with a warning and reports the rows loaded.
+    """
+
+    def __init__(self):
+        self.keys = set()
+        self.rowcount = 0
+        self.warnings = []
+        self.result = None
+
+    def executemany(self, query, rows):
+        for row in rows:
+            self._add(row, strict=True)
+
+    def execute(self, query, args=None):
+        if query.startswith('SHOW WARNINGS'):
+            self.result = self.warnings[0] if self.warnings else None
+            self.rowcount = len(self.warnings)
+            return
+        with open(args[0], encoding='utf-8') as f:
+            rows = [tuple(line.rstrip('\n').split(',')) for line in f]
+        self.rowcount = sum(self._add(row, strict=False) for row in rows)
+
+    def fetchone(self):
+        return self.result
+
+    def _add(self, row, strict):
+        if row[0] in self.keys:
+            message = f"Duplicate entry '{row[0]}' for key 'uk_usn'"
+            if strict:
+                raise MySQLdb.IntegrityError(1062, message)
+            self.warnings.append(('Warning', 1062, message))
+            return 0
+        self.keys.add(row[0])
+        return 1
+
+
+@pytest.mark.parametrize('use_load_data', [False, True])
+def test_duplicate_key_is_rejected_by_both_paths(use_load_data):
+    loader = BulkLoader(use_load_data=use_load_data)
+    rows = [('1BM21CS0001', 'An'), ('1BM21CS0002', 'Binh'), ('1BM21CS0001', 'Chi')]
+    with pytest.raises(MySQLdb.IntegrityError):
+        loader.insert(UniqueKeyCursor(), 'sem_1', ['usn', 'student_name'], rows)
+
+
+@pytest.mark.parametrize('use_load_data', [False, True])
+def test_unique_rows_load_through_both_paths(use_load_data):
+    cursor = UniqueKeyCursor()
+    rows = [('1BM21CS0001', 'An'), ('1BM21CS0002', 'Binh')]
+    assert BulkLoader(use_load_data=use_load_data).insert(cursor, 'sem_1', ['usn', 'student_name'], rows) == 2
+    assert len(cursor.keys) == 2
@@ -0,0 +1,56 @@
+import pytest
+from flask import Flask
+from catalog import ATTENDANCE, PERFORMANCE, SemesterCatalog
+
+TABLES = ['sem_1', 'sem_1_prev', 'sem_1_summary', 'sem_2', 'attendance_sem_1', 'attendance_sem_1_marks']
+
+
+class TablesCursor:
+    """Stand-in cursor for a database with upload tables and a missing or empty semester_catalog."""
+
+    def __init__(self, catalog_exists):
+        self.catalog_exists = catalog_exists
+        self.result = []
+
+    def execute(self, query, args=None):
+        query = ' '.join(query.split())
+        if 'FROM semester_catalog' in query:
+            if not self.catalog_exists:
+                raise RuntimeError("Table 'semester_catalog' doesn't exist")
+            self.result = []
+        elif query == 'SHOW TABLES LIKE %s':
+            prefix = args[0].replace('\\_', '_').rstrip('%')
+            self.result = [(table,) for table in TABLES if table.startswith(prefix)]
+        elif query.startswith('SHOW COLUMNS FROM'):
+            self.result = [(column,) for column in ('id', 'student_name', 'usn', 'Maths', 'Physics', 'sgpa',
+                                                     'result', 'overall_grade')]
+
+    def fetchall(self):
+        return list(self.result)
+
+    def close(self):
+        pass
+
+
+class TablesConnection:
+    def __init__(self, catalog_exists):
+        self.catalog_exists = catalog_exists
+
+    def cursor(self):
+        return TablesCursor(self.catalog_exists)
+
+
+class TablesMySQL:
+    def __init__(self, catalog_exists):
+        self.connection = TablesConnection(catalog_exists)
+
+
+@pytest.mark.parametrize('catalog_exists', [False, True])
+def test_semesters_are_discovered_without_catalog_rows(catalog_exists):
+    mysql = TablesMySQL(catalog_exists)
+    catalog = SemesterCatalog()
+
+    with Flask(__name__).app_context():
+        assert catalog.semesters(mysql, PERFORMANCE) == ['1', '2']
+        assert catalog.semesters(mysql, ATTENDANCE) == ['1']
+        assert [subject['column'] for subject in catalog.get(mysql, 2)['subjects']] == ['Maths', 'Physics']
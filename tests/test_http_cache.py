@@ -0,0 +1,23 @@
+from flask import Flask
+from jinja2 import DictLoader
+from http_cache import template_digest
+
+
+def test_template_digest_follows_extends_and_includes():
+    templates = {
+        'page.html': '{% extends "base.html" %}{% block body %}{% include "row.html" %}{% endblock %}',
+        'base.html': '<body>{% block body %}{% endblock %}</body>',
+        'row.html': '<tr></tr>',
+    }
+    app = Flask(__name__)
+    app.debug = True  # Recompute on every call instead of reusing the per-process digest
+    app.jinja_loader = DictLoader(templates)
+
+    with app.app_context():
+        digests = [template_digest('page.html')]
+        for name, source in (('base.html', '<main>{% block body %}{% endblock %}</main>'),
+                             ('row.html', '<tr><td></td></tr>')):
+            templates[name] = source
+            digests.append(template_digest('page.html'))
+
+    assert len(set(digests)) == 3
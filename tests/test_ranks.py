@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+import pytest
+from ranks import SGPA_METRIC, competition_ranks, update_rank_table, write_rank_table
+
+
+class RecordingLoader:
+    """Stand-in for BulkLoader that keeps the rows of the last insert."""
+
+    def __init__(self):
+        self.rows = []
+
+    def insert(self, cursor, table_name, columns, rows, **kwargs):
+        self.rows = list(rows)
+        return len(self.rows)
+
+
+class RecordingCursor:
+    """Stand-in cursor that keeps the (usn, metric) pairs deleted by executemany."""
+
+    def __init__(self):
+        self.deleted = []
+
+    def execute(self, query, args=None):
+        pass
+
+    def executemany(self, query, rows):
+        self.deleted = list(rows)
+
+
+def semester_frame(rng, students, subjects=('maths', 'physics')):
+    """Rows of a sem_N table with tied, missing and failed scores."""
+    sgpa = rng.choice([0.0, 6.5, 7.25, 8.0, 9.1, np.nan], size=students)
+    df = pd.DataFrame({
+        'id': np.arange(1, students + 1),
+        'student_name': [f"Student {i}" for i in range(students)],
+        'usn': [f"1BM21CS{i:04d}" for i in range(students)],
+        'sgpa': sgpa,
+        'result': np.where(sgpa > 0, 'Pass', 'Fail').astype(object),
+        'overall_grade': np.where(sgpa > 0, 'B', 'F').astype(object),
+    })
+    for subject in subjects:
+        marks = rng.integers(20, 100, size=students).astype(float)
+        marks[rng.random(students) < 0.1] = np.nan
+        df[subject] = marks
+    return df
+
+
+def rank_rows(df):
+    loader = RecordingLoader()
+    write_rank_table(RecordingCursor(), 'sem_1', df, loader)
+    return {(usn, metric): row for usn, metric, *row in loader.rows}
+
+
+def test_ties_share_the_best_rank_and_the_next_rank_skips():
+    ranks, _, ranked = competition_ranks([9.5, 8.0, 8.0, 7.0])
+    assert ranks.tolist() == [1, 2, 2, 4]
+    assert ranked == 4
+
+
+def test_nan_is_unranked_and_not_counted():
+    ranks, percentiles, ranked = competition_ranks([8.0, np.nan, 9.0, 8.0, np.nan])
+    assert ranked == 3
+    assert np.isnan(ranks[[1, 4]]).all()
+    assert np.isnan(percentiles[[1, 4]]).all()
+    assert ranks[[0, 2, 3]].tolist() == [2, 1, 2]
+    # Denominator is the 3 ranked students, not all 5
+    assert percentiles[[0, 2, 3]].tolist() == [66.67, 100.0, 66.67]
+
+
+def test_percentiles_count_students_at_or_below():
+    _, percentiles, _ = competition_ranks([10.0, 9.0, 9.0, 7.0])
+    assert percentiles.tolist() == [100.0, 75.0, 75.0, 25.0]
+
+
+def test_write_rank_table_ranks_sgpa_and_subjects():
+    df = pd.DataFrame({
+        'id': [1, 2, 3, 4],
+        'student_name': ['A', 'B', 'C', 'D'],
+        'usn': ['U1', 'U2', 'U3', 'U4'],
+        'sgpa': [9.0, 8.0, 8.0, np.nan],
+        'result': ['Pass', 'Pass', 'Pass', 'Fail'],
+        'overall_grade': ['A+', 'A', 'A', 'F'],
+        'maths': [70.0, 90.0, 80.0, 60.0],
+    })
+    rows = rank_rows(df)
+    assert rows[('U1', SGPA_METRIC)] == [1, 100.0, 3]
+    assert rows[('U2', SGPA_METRIC)] == [2, 66.67, 3]
+    assert rows[('U3', SGPA_METRIC)] == [2, 66.67, 3]
+    assert ('U4', SGPA_METRIC) not in rows
+    assert rows[('U4', 'maths')] == [4, 25.0, 4]
+
+
+@pytest.mark.parametrize('seed', range(400))
+def test_incremental_update_matches_full_rewrite(seed):
+    rng = np.random.default_rng(seed)
+    students = int(rng.integers(2, 60))
+    old_df = semester_frame(rng, students)
+
+    # A delta updates some students in place and appends a few new ones
+    new_df = old_df.copy()
+    updated = rng.choice(students, size=int(rng.integers(1, min(students, 6) + 1)), replace=False)
+    delta = semester_frame(rng, len(updated) + int(rng.integers(0, 3)))
+    for column in ('sgpa', 'maths', 'physics'):
+        new_df.loc[updated, column] = delta[column].to_numpy()[:len(updated)]
+    added = delta.iloc[len(updated):].copy()
+    added['id'] = np.arange(students + 1, students + 1 + len(added))
+    added['usn'] = [f"1BM21CS9{i:03d}" for i in range(len(added))]
+    new_df = pd.concat([new_df, added], ignore_index=True)
+
+    stored = rank_rows(old_df)
+    cursor, loader = RecordingCursor(), RecordingLoader()
+    update_rank_table(cursor, 'sem_1', old_df, new_df, loader)
+    for key in cursor.deleted:
+        del stored[key]
+    for usn, metric, *row in loader.rows:
+        stored[(usn, metric)] = row
+
+    assert stored == rank_rows(new_df)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+from utils import StudentPerformanceUtils
+
+
+def reference_grade_point(marks):
+    """The per-mark grade point lookup calculate_sgpa replaced."""
+    if marks >= 90:
+        return 10
+    elif marks >= 80:
+        return 9
+    elif marks >= 70:
+        return 8
+    elif marks >= 60:
+        return 7
+    elif marks >= 50:
+        return 6
+    elif marks >= 40:
+        return 5
+    else:
+        return 0
+
+
+def reference_overall_grade(sgpa):
+    if sgpa == 0:
+        return 'F'
+    elif sgpa >= 9.0:
+        return 'A+'
+    elif sgpa >= 8.0:
+        return 'A'
+    elif sgpa >= 7.0:
+        return 'B+'
+    elif sgpa >= 6.0:
+        return 'B'
+    elif sgpa >= 5.0:
+        return 'C+'
+    elif sgpa >= 4.0:
+        return 'C'
+    else:
+        return 'F'
+
+
+def reference_sgpa(df):
+    """The row-by-row calculate_sgpa the vectorized one must reproduce exactly."""
+    subject_credits = {
+        column: credits for column, (subject, credits) in
+        ((col, StudentPerformanceUtils.extract_subject_credits(col)) for col in df.columns[2:])
+        if credits is not None
+    }
+
+    sgpa_values = []
+    result_values = []
+    overall_grade_values = []
+    for index, row in df.iterrows():
+        subject_failures = [subject for subject in subject_credits if row[subject] < 28]
+        total_credits = sum(subject_credits.values())
+        total_grade_points = sum(reference_grade_point(row[subject]) * subject_credits[subject]
+                                 for subject in subject_credits)
+        sgpa = round(total_grade_points / total_credits, 2) if total_credits > 0 else 0
+
+        if subject_failures:
+            result = 'Fail'
+            overall_grade = 'F'
+            sgpa = 0
+        else:
+            result = 'Pass'
+            overall_grade = reference_overall_grade(sgpa)
+
+        sgpa_values.append(sgpa)
+        result_values.append(result)
+        overall_grade_values.append(overall_grade)
+
+    df['SGPA'] = sgpa_values
+    df['Result'] = result_values
+    df['Overall Grade'] = overall_grade_values
+    return df
+
+
+def random_sheet(rng):
+    """A result sheet with blank marks, marks on and around the thresholds and varied credits."""
+    students = int(rng.integers(1, 80))
+    subjects = int(rng.integers(1, 9))
+    sheet = pd.DataFrame({
+        'Student Name': [f"Student {i}" for i in range(students)],
+        'USN': [f"1BM21CS{i:04d}" for i in range(students)],
+    })
+    edge_marks = np.array([0, 27, 27.5, 28, 39.99, 40, 49.5, 50, 60, 70, 80, 89.99, 90, 100])
+    fail_rate = rng.choice([0.0, 0.02, 0.3])
+    for j in range(subjects):
+        marks = rng.uniform(28, 100, size=students).round(int(rng.integers(0, 3)))
+        edges = rng.random(students) < 0.2
+        marks[edges] = rng.choice(edge_marks, size=int(edges.sum()))
+        marks[rng.random(students) < fail_rate] = rng.uniform(0, 28)
+        marks[rng.random(students) < 0.05] = np.nan
+        # A few subjects carry no credits suffix and are not graded
+        header = f"Subject {j}({int(rng.integers(1, 5))})" if rng.random() < 0.9 else f"Subject {j}"
+        sheet[header] = marks
+    return sheet
+
+
+@pytest.mark.parametrize('seed', range(300))
+def test_vectorized_sgpa_matches_row_loop(seed):
+    sheet = random_sheet(np.random.default_rng(seed))
+    expected = reference_sgpa(sheet.copy())
+    actual = StudentPerformanceUtils(None).calculate_sgpa(sheet.copy())
+    assert_frame_equal(actual, expected, check_exact=True)
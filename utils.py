@@ -1,15 +1,40 @@
-from flask_mysqldb import MySQL
-import MySQLdb
 import re
+import numpy as np
 import pandas as pd
+from bulk_loader import BulkLoader
+from cache import bump_data_version, create_version_table, get_data_version
+from ingest import iter_excel_chunks
+from snapshots import snapshot_store
+from analysis import StudentAnalysis, summary_table_names
+from cgpa import CGPAEngine, credits_table_name
+from grading import (DEFAULT_SCHEME, compare_outcomes, concat_graded, create_grading_table, get_scheme,
+                     read_scheme, save_scheme, stored_marks)
+from ranks import create_rank_table, fetch_rank_scores, rank_table_name, update_rank_table, write_rank_table
+from catalog import (PERFORMANCE, create_catalog_table, record_upload, retire_upload,
+                     semester_catalog, subject_columns, swap_with_previous)
+
+# Secondary indexes of every sem_N table, as (index name, index definition)
+SEMESTER_INDEXES = [
+    ('uk_usn', 'UNIQUE KEY uk_usn (usn)'),
+    ('idx_sgpa', 'KEY idx_sgpa (sgpa)'),
+    ('idx_result_sgpa', 'KEY idx_result_sgpa (result, sgpa)'),
+]
 
 class StudentPerformanceUtils:
-    def __init__(self, mysql):
+    # Sheets are graded with the semester's stored scheme (grading.get_scheme), DEFAULT_SCHEME until one is saved
+
+    def __init__(self, mysql, bulk_loader=None):
         self.mysql = mysql
+        self.bulk_loader = bulk_loader or BulkLoader()
 
     def create_semester_table(self, semester_number, columns):
+        """Create an empty staging table for a semester reload.
+
+        Rows are loaded into sem_N_staging and published with
+        publish_semester_table, so the live sem_N table is never dropped.
+        """
         cursor = self.mysql.connection.cursor()
-        table_name = f"sem_{semester_number}"
+        table_name = f"sem_{semester_number}_staging"
         used_columns = set()
 
         try:
@@ -38,17 +63,17 @@ class StudentPerformanceUtils:
                     create_table_sql += f",\n            {valid_column} FLOAT"
                     used_columns.add(valid_column)
             
+            # Indexes for per-student lookups and top-performer queries
+            for _, index_sql in SEMESTER_INDEXES:
+                create_table_sql += f",\n            {index_sql}"
+            
             create_table_sql += "\n        )"
             
             cursor.execute(create_table_sql)
+            StudentAnalysis.create_summary_tables(cursor, table_name)
+            CGPAEngine.create_credits_table(cursor, table_name)
+            create_rank_table(cursor, table_name)
             self.mysql.connection.commit()
-            
-            # Debug: Print table structure
-            cursor.execute(f"DESCRIBE {table_name}")
-            print(f"Table structure for {table_name}:")
-            for row in cursor.fetchall():
-                print(row)
-                
             return True, table_name
             
         except Exception as e:
@@ -56,49 +81,569 @@ class StudentPerformanceUtils:
         finally:
             cursor.close()
 
-    def insert_semester_data(self, table_name, df):
+    def load_semester_file(self, file, semester_number, chunk_size=5000, filename=None, progress=None):
         """
-        Insert data from DataFrame into the semester table.
+        Stream a result sheet into its semester table.
+
+        The workbook is read chunk by chunk; SGPA and CGPA credits are computed
+        and the rows are inserted per chunk into staging tables, all inside one
+        transaction. The staging tables then replace sem_N in one atomic swap.
+        The whole class is never held in memory; the snapshot of the new
+        version is built by its first reader (see StudentAnalysis.snapshot_frame).
 
         Args:
-            table_name: Name of the table to insert data into
-            df: Pandas DataFrame containing the data
+            file: Path or file-like object of the uploaded workbook
+            semester_number: Semester the sheet belongs to
+            chunk_size: Number of sheet rows processed at a time
+            filename: Original file name, used to detect legacy .xls files
+            progress: Optional callback progress(phase, rows_processed)
+
+        Returns:
+            (success, table_name or error message)
+        """
+        progress = progress or (lambda phase, rows_processed=None: None)
+        progress('parsing')
+        chunks = iter_excel_chunks(file, chunk_size, filename)
+        first_chunk = next(chunks, None)
+        if first_chunk is None:
+            return False, "The uploaded sheet is empty"
+        if 'USN' not in first_chunk.columns or 'Student Name' not in first_chunk.columns:
+            return False, "Missing USN or Student Name columns"
+
+        scheme = get_scheme(self.mysql, semester_number)
+        first_chunk = self.calculate_sgpa(first_chunk, scheme)
+        columns = [(col, 'FLOAT') if 'Marks' in col else (col, 'VARCHAR(100)') for col in first_chunk.columns]
+        progress('creating_table')
+        success, table_name = self.create_semester_table(semester_number, columns)
+        if not success:
+            return False, f'Error creating table: {table_name}'
+
+        cursor = self.mysql.connection.cursor()
+        try:
+            progress('inserting', 0)
+            rows_processed = self._insert_chunk(cursor, table_name, first_chunk, scheme)
+            progress('inserting', rows_processed)
+            for chunk in chunks:
+                rows_processed += self._insert_chunk(cursor, table_name, self.calculate_sgpa(chunk, scheme), scheme)
+                progress('inserting', rows_processed)
+            # Summaries and ranks are written in the same transaction as the rows. The
+            # staging table is summarized chunk_size rows at a time and ranked from its
+            # scores only, so memory stays bounded by the chunk size, not the class.
+            progress('summarizing', rows_processed)
+            StudentAnalysis(self.mysql).write_summary_tables(cursor, table_name, chunk_size=chunk_size)
+            progress('ranking', rows_processed)
+            write_rank_table(cursor, table_name, fetch_rank_scores(cursor, table_name), self.bulk_loader)
+            progress('committing', rows_processed)
+            self.mysql.connection.commit()
+        except Exception as e:
+            self.mysql.connection.rollback()
+            try:
+                for staging_table in self._table_family(table_name):
+                    cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+            except Exception:
+                pass  # A leftover staging table is dropped by the next reload
+            return False, f'Error inserting data: {str(e)}'
+        finally:
+            cursor.close()
+
+        progress('swapping', rows_processed)
+        return self.publish_semester_table(semester_number, subject_columns(first_chunk.columns[2:-3]))
+
+    def publish_semester_table(self, semester_number, subjects=None, snapshot=None):
         """
+        Atomically replace sem_N and its summary tables with the staging ones.
+
+        The replaced tables are kept as sem_N_prev* for rollback_semester_table.
+        The data version is bumped only after the swap, so a cached analysis
+        can never be stored under the new version with the old rows. The
+        catalog row (with subjects, see catalog.subject_columns) is written in
+        the same transaction as the version, and the CGPA rollup is refreshed
+        from the published credits table afterwards. RENAME TABLE commits
+        implicitly, so that transaction cannot include the swap; it is
+        retried once, and if it still fails the error says the swap has
+        already happened. snapshot, the rows of the staging table, is written
+        to the snapshot store under the new version once it has committed.
+        """
+        table_name = f"sem_{semester_number}"
+        live = self._table_family(table_name)
+        staging = self._table_family(f"{table_name}_staging")
+        previous = self._table_family(f"{table_name}_prev")
         cursor = self.mysql.connection.cursor()
+        swapped = False
+
+        def stamp():
+            version = bump_data_version(cursor, table_name)
+            retire_upload(cursor, semester_number, PERFORMANCE)
+            record_upload(cursor, semester_number, PERFORMANCE, table_name, subjects)
+            return version
 
         try:
-            # Prepare column names
-            columns = ['student_name', 'usn']
-            subject_columns = []
+            create_catalog_table(cursor)
+            create_version_table(cursor)
+            existing = self._existing_tables(cursor, table_name)
+            for previous_table in previous:
+                cursor.execute(f"DROP TABLE IF EXISTS {previous_table}")
 
-            # Process subject columns
-            for col in df.columns[2:-3]:  # Exclude student_name, usn, and last 3 columns
-                subject_name = re.sub(r'\(\d+\)', '', col).strip()
-                valid_column = re.sub(r'[^a-zA-Z0-9_]', '_', subject_name)
-                subject_columns.append(valid_column)
-
-            columns.extend(subject_columns)
-            columns.extend(['sgpa', 'result', 'overall_grade'])
-
-            # Create the insert query
-            placeholders = ','.join(['%s'] * len(columns))
-            insert_query = f"INSERT INTO {table_name} ({','.join(columns)}) VALUES ({placeholders})"
-
-            # Prepare and execute batch insert
-            values = []
-            for _, row in df.iterrows():
-                row_data = [row['Student Name'], row['USN']]
-                row_data.extend(row[df.columns[2:-3]])
-                row_data.extend([row['SGPA'], row['Result'], row['Overall Grade']])
-                values.append(tuple(row_data))
-
-            cursor.executemany(insert_query, values)
+            renames = []
+            for live_table, staging_table, previous_table in zip(live, staging, previous):
+                if live_table in existing:
+                    renames.append(f"{live_table} TO {previous_table}")
+                renames.append(f"{staging_table} TO {live_table}")
+            cursor.execute("RENAME TABLE " + ", ".join(renames))
+            swapped = True
+            version = self._commit_after_swap(stamp)
+        except Exception as e:
+            if swapped:
+                return False, (f'Error publishing table: {table_name} now holds the new upload, but its data '
+                               f'version and catalog row still describe the previous one ({str(e)}); '
+                               f'upload the file again to finish publishing it')
+            return False, f'Error publishing table: {str(e)}'
+        finally:
+            cursor.close()
+            semester_catalog.invalidate()
+
+        if snapshot is not None:
+            snapshot_store.write_frame(table_name, version, snapshot)
+        self._refresh_cgpa(semester_number)
+        return True, table_name
+
+    def rollback_semester_table(self, semester_number):
+        """Swap sem_N* with sem_N_prev*, undoing (or redoing) the last reload."""
+        table_name = f"sem_{semester_number}"
+        live = self._table_family(table_name)
+        previous = self._table_family(f"{table_name}_prev")
+        swap = self._table_family(f"{table_name}_swap")
+        cursor = self.mysql.connection.cursor()
+        swapped = False
+
+        def stamp():
+            bump_data_version(cursor, table_name)
+            swap_with_previous(cursor, semester_number, PERFORMANCE, table_name)
+
+        try:
+            create_catalog_table(cursor)
+            create_version_table(cursor)
+            existing = self._existing_tables(cursor, table_name)
+            if previous[0] not in existing:
+                return False, "No previous version to roll back to"
+
+            renames = []
+            for live_table, previous_table, swap_table in zip(live, previous, swap):
+                if live_table in existing and previous_table in existing:
+                    renames.extend([f"{live_table} TO {swap_table}",
+                                    f"{previous_table} TO {live_table}",
+                                    f"{swap_table} TO {previous_table}"])
+                elif live_table in existing:
+                    renames.append(f"{live_table} TO {previous_table}")
+                elif previous_table in existing:
+                    renames.append(f"{previous_table} TO {live_table}")
+            cursor.execute("RENAME TABLE " + ", ".join(renames))
+            swapped = True
+            self._commit_after_swap(stamp)
+        except Exception as e:
+            if swapped:
+                return False, (f'Error rolling back table: {table_name} and {previous[0]} were swapped, but '
+                               f'their data version and catalog rows were not ({str(e)}); upload the '
+                               f'semester again to bring them back in line')
+            return False, f'Error rolling back table: {str(e)}'
+        finally:
+            cursor.close()
+            semester_catalog.invalidate()
+
+        self._refresh_cgpa(semester_number)
+        return True, table_name
+
+    def apply_semester_delta(self, file, semester_number, filename=None, progress=None):
+        """
+        Upsert corrected or late marks into a published semester.
+
+        The sheet needs a USN column, filled in on every row, and may hold
+        Student Name and any of the semester's subject columns (with or
+        without the credits suffix).
+        Students already in sem_N keep their stored values for columns the
+        sheet omits or leaves blank; unknown USNs are added. SGPA, result,
+        grade and CGPA credits are recomputed for the students in the sheet
+        only, and the summaries, ranks and CGPA rollup are updated for them
+        incrementally instead of being rebuilt from the whole class.
+
+        The live tables are updated in place, so rollback_semester_table
+        still returns to the table replaced by the last full upload.
+
+        Returns:
+            (success, table_name or error message)
+        """
+        progress = progress or (lambda phase, rows_processed=None: None)
+        table_name = f"sem_{semester_number}"
+        entry = semester_catalog.get(self.mysql, semester_number, PERFORMANCE)
+        if entry is None:
+            return False, "Upload the full result sheet of this semester before applying corrections"
+        subjects = entry['subjects']
+        scheme = get_scheme(self.mysql, semester_number)
+
+        progress('parsing')
+        chunks = list(iter_excel_chunks(file, filename=filename))
+        if not chunks:
+            return False, "The uploaded sheet is empty"
+        sheet = pd.concat(chunks, ignore_index=True)
+        if 'USN' not in sheet.columns:
+            return False, "Missing USN column"
+        sheet = sheet.dropna(how='all')
+        if sheet.empty:
+            return False, "The uploaded sheet has no students"
+        missing_usn = int((sheet['USN'].isna() | (sheet['USN'].astype(str).str.strip() == '')).sum())
+        if missing_usn:
+            return False, f"Rows without a USN in the sheet: {missing_usn}"
+        duplicated = sheet['USN'][sheet['USN'].duplicated()].unique().tolist()
+        if duplicated:
+            return False, f"Duplicate USNs in the sheet: {', '.join(map(str, duplicated[:10]))}"
+
+        # Sheet header of each subject the sheet corrects, by sem_N column
+        known = {subject['column'].lower() for subject in subjects}
+        sheet_headers = {}
+        for header in sheet.columns:
+            if header in ('USN', 'Student Name'):
+                continue
+            column = subject_columns([header])[0]['column'].lower()
+            if column not in known:
+                return False, f"Unknown subject column: {header}"
+            sheet_headers[column] = header
+
+        cursor = self.mysql.connection.cursor()
+        try:
+            progress('loading', 0)
+            # DDL commits implicitly, so it runs before the version bump and the writes
+            create_version_table(cursor)
+            StudentAnalysis.upgrade_summary_tables(cursor, table_name)
+            previous_version = get_data_version(self.mysql, table_name)
+            df = snapshot_store.read_frame(table_name, previous_version)
+            version = bump_data_version(cursor, table_name)
+            if df is None or version != previous_version + 1:
+                # No snapshot, or another upload committed in between: read the rows under the version lock
+                df = StudentAnalysis.fetch_table(cursor, table_name)
+
+            usns = sheet['USN'].tolist()
+            placeholders = ','.join(['%s'] * len(usns))
+            cursor.execute(f"SELECT * FROM {table_name} WHERE usn IN ({placeholders}) FOR UPDATE", usns)
+            old_rows = pd.DataFrame(list(cursor.fetchall()), columns=[desc[0] for desc in cursor.description])
+            # Stored rows aligned with the sheet; students not in sem_N yet get NaN
+            stored = old_rows.set_index('usn').reindex(usns)
+
+            # Merge the sheet into the stored rows in the upload layout, so SGPA is computed as on a full upload
+            headers = [f"{subject['name']}({subject['credits']})" if subject['credits'] is not None
+                       else subject['name'] for subject in subjects]
+            names = (sheet['Student Name'].to_numpy(dtype=object, copy=True) if 'Student Name' in sheet.columns
+                     else np.full(len(sheet), None, dtype=object))
+            blank = pd.isna(names)
+            names[blank] = stored['student_name'].to_numpy(dtype=object)[blank]
+            names[pd.isna(names)] = None
+            merged = pd.DataFrame({'Student Name': names, 'USN': usns})
+            for subject, header in zip(subjects, headers):
+                column = subject['column'].lower()
+                previous = stored[column].to_numpy(dtype=float)
+                if column in sheet_headers:
+                    marks = pd.to_numeric(sheet[sheet_headers[column]], errors='coerce').to_numpy(dtype=float)
+                    merged[header] = np.where(np.isnan(marks), previous, marks)
+                else:
+                    merged[header] = previous
+            merged = self.calculate_sgpa(merged, scheme)
+
+            progress('upserting', len(merged))
+            columns = ['student_name', 'usn'] + [subject['column'] for subject in subjects] + \
+                ['sgpa', 'result', 'overall_grade']
+            self.bulk_loader.insert(
+                cursor, table_name, columns,
+                self.bulk_loader.frame_rows(merged, ['Student Name', 'USN'] + headers + ['SGPA', 'Result', 'Overall Grade']),
+                update_columns=[column for column in columns if column != 'usn']
+            )
+            self.bulk_loader.insert(
+                cursor, credits_table_name(table_name),
+                ['usn', 'student_name', 'credits', 'grade_points', 'backlogs'],
+                self.bulk_loader.frame_rows(self.calculate_credits(merged, scheme),
+                                            ['USN', 'Student Name', 'Credits', 'Grade Points', 'Backlogs']),
+                update_columns=['student_name', 'credits', 'grade_points', 'backlogs']
+            )
+
+            # The delta rows as sem_N rows; added students get the ids their inserts were assigned
+            ids = {usn: row_id for usn, row_id in zip(old_rows['usn'], old_rows['id'])}
+            added = [usn for usn in usns if usn not in ids]
+            if added:
+                placeholders = ','.join(['%s'] * len(added))
+                cursor.execute(f"SELECT usn, id FROM {table_name} WHERE usn IN ({placeholders})", added)
+                ids.update(cursor.fetchall())
+            new_rows = pd.DataFrame({
+                'id': [ids[usn] for usn in usns],
+                'student_name': merged['Student Name'].to_numpy(dtype=object),
+                'usn': merged['USN'].to_numpy(dtype=object),
+                'sgpa': merged['SGPA'].to_numpy(dtype=float),
+                'result': merged['Result'].to_numpy(dtype=object),
+                'overall_grade': merged['Overall Grade'].to_numpy(dtype=object),
+                **{subject['column'].lower(): merged[header].to_numpy(dtype=float)
+                   for subject, header in zip(subjects, headers)}
+            })[df.columns]
+
+            # Patch the class: updated students in place, added ones appended in id order. Rows
+            # without a USN can repeat (NULL is not unique), so they stay out of the lookup.
+            keyed = np.flatnonzero(df['usn'].notna().to_numpy())
+            found = pd.Index(df['usn'].to_numpy(dtype=object)[keyed]).get_indexer(new_rows['usn'])
+            positions = np.append(keyed, -1)[found]
+            updated = positions >= 0
+            appended = np.flatnonzero(~updated)[np.argsort(new_rows['id'].to_numpy()[~updated], kind='stable')]
+            patched = {}
+            for column in df.columns:
+                old_values = df[column].to_numpy()
+                new_values = new_rows[column].to_numpy()
+                if old_values.dtype.kind not in 'fiu' or new_values.dtype.kind not in 'fiu':
+                    old_values, new_values = old_values.astype(object), new_values.astype(object)
+                values = np.concatenate([old_values, new_values[appended]])
+                values[positions[updated]] = new_values[updated]
+                patched[column] = values
+            new_df = pd.DataFrame(patched, columns=df.columns)
+
+            progress('summarizing', len(merged))
+            StudentAnalysis(self.mysql).apply_summary_delta(cursor, table_name, old_rows[df.columns], new_rows, new_df)
+            progress('ranking', len(merged))
+            update_rank_table(cursor, table_name, df, new_df, self.bulk_loader)
+            record_upload(cursor, semester_number, PERFORMANCE, table_name, subjects, row_count=len(new_df))
+            progress('committing', len(merged))
             self.mysql.connection.commit()
-            return True, "Data inserted successfully"
         except Exception as e:
-            return False, str(e)
+            self.mysql.connection.rollback()
+            return False, f'Error applying corrections: {str(e)}'
         finally:
             cursor.close()
+            semester_catalog.invalidate()
+
+        snapshot_store.write_frame(table_name, version, new_df)
+        self._refresh_cgpa(semester_number, usns)
+        return True, table_name
+
+    def regrade_semester(self, semester_number, scheme=None, progress=None):
+        """
+        Recompute SGPA, result and grade of a published semester from its stored marks.
+
+        With a scheme it is saved as the semester's grading scheme in the
+        same transaction, so later uploads grade with it too; without one
+        the stored scheme is applied again. The whole class is graded in
+        one vectorized pass; only students whose SGPA, result or grade
+        changed are rewritten in sem_N. The credits table and summaries are
+        rewritten, ranks are updated incrementally and the CGPA rollup is
+        refreshed afterwards.
+
+        Returns:
+            (success, message)
+        """
+        progress = progress or (lambda phase, rows_processed=None: None)
+        table_name = f"sem_{semester_number}"
+        entry = semester_catalog.get(self.mysql, semester_number, PERFORMANCE)
+        if entry is None:
+            return False, f"Semester {semester_number} has no results to re-grade"
+        subjects = entry['subjects']
+
+        cursor = self.mysql.connection.cursor()
+        try:
+            progress('loading')
+            # DDL commits implicitly, so it runs before the version bump and the writes
+            create_grading_table(cursor)
+            create_version_table(cursor)
+            StudentAnalysis.upgrade_summary_tables(cursor, table_name)
+            previous_version = get_data_version(self.mysql, table_name)
+            df = snapshot_store.read_frame(table_name, previous_version)
+            version = bump_data_version(cursor, table_name)
+            if df is None or version != previous_version + 1:
+                df = StudentAnalysis.fetch_table(cursor, table_name)
+            if scheme is None:
+                scheme = read_scheme(cursor, semester_number)
+            else:
+                save_scheme(cursor, semester_number, scheme)
+
+            progress('grading', len(df))
+            credits, marks = stored_marks(df, subjects)
+            graded = scheme.grade(marks, credits)
+            new_df = df.copy()
+            new_df['sgpa'] = np.asarray(graded['sgpa'], dtype=float)
+            new_df['result'] = graded['result']
+            new_df['overall_grade'] = graded['overall_grade']
+
+            # sgpa is a FLOAT column, so compare at its precision
+            old_sgpa = df['sgpa'].to_numpy(dtype=np.float32, na_value=np.nan)
+            new_sgpa = new_df['sgpa'].to_numpy(dtype=np.float32)
+            changed = np.flatnonzero(
+                (old_sgpa != new_sgpa)
+                | (df['result'].to_numpy(dtype=object) != graded['result'])
+                | (df['overall_grade'].to_numpy(dtype=object) != graded['overall_grade'])
+            )
+
+            progress('updating', len(changed))
+            self.bulk_loader.insert(
+                cursor, table_name, ['id', 'sgpa', 'result', 'overall_grade'],
+                self.bulk_loader.frame_rows(new_df.iloc[changed], ['id', 'sgpa', 'result', 'overall_grade']),
+                update_columns=['sgpa', 'result', 'overall_grade']
+            )
+            has_usn = df['usn'].notna().to_numpy()
+            cursor.execute(f"DELETE FROM {credits_table_name(table_name)}")
+            self.bulk_loader.insert(
+                cursor, credits_table_name(table_name),
+                ['usn', 'student_name', 'credits', 'grade_points', 'backlogs'],
+                self.bulk_loader.frame_rows(pd.DataFrame({
+                    'usn': df['usn'].to_numpy(dtype=object)[has_usn],
+                    'student_name': df['student_name'].to_numpy(dtype=object)[has_usn],
+                    'credits': np.full(int(has_usn.sum()), int(credits.sum()), dtype=np.int64),
+                    'grade_points': graded['grade_points'][has_usn],
+                    'backlogs': graded['backlogs'][has_usn]
+                }), ['usn', 'student_name', 'credits', 'grade_points', 'backlogs'])
+            )
+
+            progress('summarizing', len(df))
+            StudentAnalysis(self.mysql).write_summary_tables(cursor, table_name, new_df)
+            progress('ranking', len(df))
+            update_rank_table(cursor, table_name, df, new_df, self.bulk_loader)
+            record_upload(cursor, semester_number, PERFORMANCE, table_name, subjects, row_count=len(new_df))
+            progress('committing', len(df))
+            self.mysql.connection.commit()
+        except Exception as e:
+            self.mysql.connection.rollback()
+            return False, f'Error re-grading semester {semester_number}: {str(e)}'
+        finally:
+            cursor.close()
+            semester_catalog.invalidate()
+
+        snapshot_store.write_frame(table_name, version, new_df)
+        self._refresh_cgpa(semester_number)
+        return True, f"Semester {semester_number}: {len(changed)} of {len(df)} students re-graded"
+
+    def regrade_semesters(self, semester_numbers=None, scheme=None, progress=None):
+        """
+        Re-grade several semesters (all published ones by default), one transaction each.
+
+        Stops at the first failure; the semesters before it stay re-graded.
+
+        Returns:
+            (success, message)
+        """
+        progress = progress or (lambda phase, rows_processed=None: None)
+        if semester_numbers is None:
+            semester_numbers = semester_catalog.semesters(self.mysql, PERFORMANCE)
+        if not semester_numbers:
+            return False, "No semesters to re-grade"
+
+        messages = []
+        for done, semester_number in enumerate(semester_numbers):
+            success, message = self.regrade_semester(
+                semester_number, scheme, lambda phase, rows_processed=None: progress(phase, done)
+            )
+            if not success:
+                return False, message
+            messages.append(message)
+        return True, '; '.join(messages)
+
+    def compare_grading(self, semester_numbers, scheme, baseline=None):
+        """
+        What-if: outcomes of grading semesters with scheme instead of baseline.
+
+        Nothing is written. baseline defaults to each semester's stored
+        scheme; the marks come from the semester snapshots (see
+        StudentAnalysis.snapshot_frame). Semesters that are not published
+        are skipped.
+
+        Returns:
+            {'semesters': [{'semester', **compare_outcomes()}, ...],
+             'overall': compare_outcomes() of all the students together},
+            or None if no semester could be read
+        """
+        analysis = StudentAnalysis(self.mysql)
+        cursor = self.mysql.connection.cursor()
+        results = []
+        try:
+            for semester_number in semester_numbers:
+                entry = semester_catalog.get(self.mysql, semester_number, PERFORMANCE)
+                if entry is None:
+                    continue
+                df = analysis.snapshot_frame(cursor, f"sem_{semester_number}")
+                credits, marks = stored_marks(df, entry['subjects'])
+                semester_baseline = baseline or get_scheme(self.mysql, semester_number)
+                results.append((str(semester_number), semester_baseline.grade(marks, credits),
+                                scheme.grade(marks, credits)))
+        except Exception as e:
+            print(f"Error comparing grading schemes: {str(e)}")
+            return None
+        finally:
+            cursor.close()
+
+        if not results:
+            return None
+        return {
+            'semesters': [{'semester': semester, **compare_outcomes(before, after)}
+                          for semester, before, after in results],
+            'overall': compare_outcomes(concat_graded([before for _, before, _ in results]),
+                                        concat_graded([after for _, _, after in results]))
+        }
+
+    def _refresh_cgpa(self, semester_number, usns=None):
+        """Update the CGPA rollup after sem_N (or only the rows of usns) changed; `flask refresh-cgpa` retries a failure."""
+        engine = CGPAEngine(self.mysql)
+        if usns is None:
+            success, message = engine.refresh_semester(semester_number)
+        else:
+            success, message = engine.refresh_students(semester_number, usns)
+        if not success:
+            print(f"CGPA refresh of semester {semester_number} failed: {message}")
+
+    @staticmethod
+    def _table_family(table_name):
+        """A sem_N table and the tables derived from it, which are always swapped together."""
+        return [table_name, *summary_table_names(table_name), credits_table_name(table_name),
+                rank_table_name(table_name)]
+
+    @staticmethod
+    def _existing_tables(cursor, table_name):
+        cursor.execute("SHOW TABLES LIKE %s", (f"{table_name}%",))
+        return {row[0] for row in cursor.fetchall()}
+
+    def _commit_after_swap(self, stamp):
+        """
+        Run stamp (the version and catalog writes of a swap) and commit, retrying once.
+
+        RENAME TABLE has already committed the swap, so a failure here leaves
+        the tables ahead of their version and catalog rows; the caller
+        reports that state if the retry fails as well.
+        """
+        try:
+            result = stamp()
+        except Exception:
+            self.mysql.connection.rollback()
+            result = stamp()
+        self.mysql.connection.commit()
+        return result
+
+    def _insert_chunk(self, cursor, table_name, df, scheme=DEFAULT_SCHEME):
+        """Insert a graded chunk of the sheet into sem_N and its credits table; returns the row count."""
+        credits = self.calculate_credits(df, scheme)
+        self.bulk_loader.insert(
+            cursor, credits_table_name(table_name),
+            ['usn', 'student_name', 'credits', 'grade_points', 'backlogs'],
+            self.bulk_loader.frame_rows(credits, ['USN', 'Student Name', 'Credits', 'Grade Points', 'Backlogs'])
+        )
+        return self._insert_rows(cursor, table_name, df)
+
+    def _insert_rows(self, cursor, table_name, df):
+        """Insert a DataFrame that already has SGPA, Result and Overall Grade columns."""
+        # Prepare column names
+        columns = ['student_name', 'usn']
+        subject_columns = []
+
+        # Process subject columns
+        for col in df.columns[2:-3]:  # Exclude student_name, usn, and last 3 columns
+            subject_name = re.sub(r'\(\d+\)', '', col).strip()
+            valid_column = re.sub(r'[^a-zA-Z0-9_]', '_', subject_name)
+            subject_columns.append(valid_column)
+
+        columns.extend(subject_columns)
+        columns.extend(['sgpa', 'result', 'overall_grade'])
+
+        # Values are built column by column and sent in chunks
+        source_columns = ['Student Name', 'USN'] + list(df.columns[2:-3]) + ['SGPA', 'Result', 'Overall Grade']
+        rows = self.bulk_loader.frame_rows(df, source_columns)
+        return self.bulk_loader.insert(cursor, table_name, columns, rows)
 
     @staticmethod
     def extract_subject_credits(column_name):
@@ -111,123 +656,68 @@ class StudentPerformanceUtils:
         return None, None
 
     @staticmethod
-    def get_grade_point(marks):
+    def get_grade_point(marks, scheme=DEFAULT_SCHEME):
         """Calculate grade point based on marks."""
-        if marks >= 90:
-            return 10
-        elif marks >= 80:
-            return 9
-        elif marks >= 70:
-            return 8
-        elif marks >= 60:
-            return 7
-        elif marks >= 50:
-            return 6
-        elif marks >= 40:
-            return 5
-        else:
-            return 0  # Fail
+        return int(scheme.subject_grade_points(marks))
 
     @staticmethod
-    def calculate_overall_grade(sgpa):
+    def calculate_overall_grade(sgpa, scheme=DEFAULT_SCHEME):
         """Calculate overall student grade based on SGPA."""
         if sgpa == 0:  # For failed students
-            return 'F'
-        elif sgpa >= 9.0:
-            return 'A+'
-        elif sgpa >= 8.0:
-            return 'A'
-        elif sgpa >= 7.0:
-            return 'B+'
-        elif sgpa >= 6.0:
-            return 'B'
-        elif sgpa >= 5.0:
-            return 'C+'
-        elif sgpa >= 4.0:
-            return 'C'
-        else:
-            return 'F'
+            return scheme.sgpa_grades[0]
+        return scheme.sgpa_grades[np.searchsorted(scheme.sgpa_thresholds, sgpa, side='right')]
+
+    def _grade_matrix(self, df):
+        """
+        Gather every credited subject column of df.
 
-    def calculate_sgpa(self, df):
-        """Calculate SGPA, Result, and Overall Grade for each student in the DataFrame."""
+        Returns:
+            (credits, marks): credits per subject and the students x subjects marks matrix
+        """
         subject_credits = {
             column: credits for column, (subject, credits) in 
             ((col, self.extract_subject_credits(col)) for col in df.columns[2:]) if credits is not None
         }
+        subjects = list(subject_credits)
+        credits = np.array([subject_credits[subject] for subject in subjects], dtype=np.int64)
+        marks = df[subjects].to_numpy(dtype=float).reshape(len(df), len(subjects))
+        return credits, marks
 
-        sgpa_values = []
-        result_values = []
-        overall_grade_values = []
-
-        for index, row in df.iterrows():
-            # Check if student fails in any subject
-            subject_failures = [
-                subject for subject in subject_credits 
-                if row[subject] < 28  # Fail threshold is 28 marks
-            ]
-
-            # Calculate SGPA first
-            total_credits = sum(subject_credits.values())
-            total_grade_points = sum(self.get_grade_point(row[subject]) * subject_credits[subject] 
-                                   for subject in subject_credits)
-            sgpa = round(total_grade_points / total_credits, 2) if total_credits > 0 else 0
-
-            # Determine result and grade based on both SGPA and subject failures
-            if subject_failures:
-                result = 'Fail'
-                overall_grade = 'F'  # Always F if any subject is failed
-                sgpa = 0  # Set SGPA to 0 if failed in any subject
-            else:
-                result = 'Pass'
-                overall_grade = self.calculate_overall_grade(sgpa)
-
-            sgpa_values.append(sgpa)
-            result_values.append(result)
-            overall_grade_values.append(overall_grade)
+    def calculate_sgpa(self, df, scheme=DEFAULT_SCHEME):
+        """Calculate SGPA, Result, and Overall Grade for each student in the DataFrame.
 
-        # Add SGPA, Result, and Overall Grade columns
-        df['SGPA'] = sgpa_values
-        df['Result'] = result_values
-        df['Overall Grade'] = overall_grade_values
+        Marks are gathered into one matrix and graded by scheme (see
+        grading.GradingScheme), so the whole sheet is processed with a
+        handful of array operations.
+        """
+        if len(df) == 0:
+            df['SGPA'] = []
+            df['Result'] = []
+            df['Overall Grade'] = []
+            return df
 
+        credits, marks = self._grade_matrix(df)
+        graded = scheme.grade(marks, credits)
+        df['SGPA'] = graded['sgpa']
+        df['Result'] = graded['result']
+        df['Overall Grade'] = graded['overall_grade']
         return df
 
-    def get_semester_analysis(self, semester_number):
+    def calculate_credits(self, df, scheme=DEFAULT_SCHEME):
         """
-        Get analysis data for a specific semester.
-        Returns statistics about performance, grade distribution, etc.
-        """
-        cursor = self.mysql.connection.cursor(MySQLdb.cursors.DictCursor)
-        table_name = f"sem_{semester_number}"
+        Per-student inputs of the CGPA rollup.
 
-        try:
-            # Get basic statistics
-            cursor.execute(f"""
-                SELECT 
-                    COUNT(*) as total_students,
-                    COUNT(CASE WHEN result = 'Pass' THEN 1 END) as passed_students,
-                    COUNT(CASE WHEN result = 'Fail' THEN 1 END) as failed_students,
-                    AVG(sgpa) as average_sgpa,
-                    MAX(sgpa) as highest_sgpa,
-                    MIN(sgpa) as lowest_sgpa
-                FROM {table_name}
-            """)
-            stats = cursor.fetchone()
-
-            # Get grade distribution
-            cursor.execute(f"""
-                SELECT overall_grade, COUNT(*) as count
-                FROM {table_name}
-                GROUP BY overall_grade
-                ORDER BY overall_grade
-            """)
-            grade_distribution = cursor.fetchall()
-
-            return {
-                'statistics': stats,
-                'grade_distribution': grade_distribution
-            }
-        except Exception as e:
-            return None
-        finally:
-            cursor.close()
+        Returns:
+            DataFrame with USN, Student Name, Credits (total credits of the
+            semester), Grade Points (credit-weighted) and Backlogs (subjects
+            below the fail mark)
+        """
+        credits, marks = self._grade_matrix(df)
+        graded = scheme.grade(marks, credits)
+        return pd.DataFrame({
+            'USN': df['USN'].to_numpy(dtype=object),
+            'Student Name': df['Student Name'].to_numpy(dtype=object),
+            'Credits': np.full(len(df), int(credits.sum()), dtype=np.int64),
+            'Grade Points': graded['grade_points'],
+            'Backlogs': graded['backlogs']
+        })